@@ -0,0 +1,65 @@
+import secrets
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.db import get_session
+from app.core.logging_config import (
+    disable_user_debug,
+    enable_user_debug,
+    logging_snapshot,
+    set_module_level,
+)
+from app.services.master_data import master_data
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+def require_admin_token(x_admin_token: str = Header(default="")) -> None:
+    """X-Admin-Token ヘッダーを検証（ADMIN_API_TOKEN 未設定時は管理APIごと無効）"""
+    expected = get_settings().admin_api_token
+    if not expected:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not secrets.compare_digest(x_admin_token, expected):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token")
+
+
+@router.get("/master-data", dependencies=[Depends(require_admin_token)])
+async def get_master_data_status() -> dict:
+    return master_data.snapshot()
+
+
+@router.post("/master-data/reload", dependencies=[Depends(require_admin_token)])
+async def reload_master_data(session: AsyncSession = Depends(get_session)) -> dict:
+    """マスタデータ（planning_axes / axis_steps）をDBから読み込み直す"""
+    await master_data.reload(session)
+    return master_data.snapshot()
+
+
+@router.get("/logging", dependencies=[Depends(require_admin_token)])
+async def get_logging_status() -> dict:
+    return logging_snapshot()
+
+
+@router.put("/logging/levels/{logger_name}", dependencies=[Depends(require_admin_token)])
+async def update_logging_level(logger_name: str, level: str) -> dict:
+    """ロガー単位のレベルを変更する（例: app.api.dashboard を DEBUG に）"""
+    try:
+        set_module_level(logger_name, level)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return logging_snapshot()
+
+
+@router.put("/logging/debug-users/{user_id}", dependencies=[Depends(require_admin_token)])
+async def add_debug_user(user_id: int) -> dict:
+    """指定ユーザーのリクエストだけ app.* の DEBUG ログを出力する"""
+    enable_user_debug(user_id)
+    return logging_snapshot()
+
+
+@router.delete("/logging/debug-users/{user_id}", dependencies=[Depends(require_admin_token)])
+async def remove_debug_user(user_id: int) -> dict:
+    disable_user_debug(user_id)
+    return logging_snapshot()
@@ -12,6 +12,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import get_settings
 from app.core.db import get_session
+from app.core.logging_config import current_user_id
 from app.core.security import (
     create_access_token,
     create_refresh_token,
@@ -219,6 +220,7 @@ async def get_current_user(
         )
     except ValueError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    current_user_id.set(user.id)
     return UserInfo(id=user.id, email=user.email, display_name=user.display_name)
 
 
@@ -246,4 +248,5 @@ async def get_current_user_optional(
         )
     except ValueError:
         return None
+    current_user_id.set(user.id)
     return UserInfo(id=user.id, email=user.email, display_name=user.display_name)
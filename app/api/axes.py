@@ -1,16 +1,21 @@
+from datetime import datetime
+
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.auth import get_current_user
 from app.core.db import get_session
-from app.models.axis import AxisAnswer, AxisScore, AxisStep, PlanningAxis
+from app.core.upsert import upsert_stmt
+from app.core.user_version import bump_user_versions
+from app.models.axis import AxisAnswer, AxisScore
 from app.schemas.auth import UserInfo
 from app.schemas.axes import (
     AxisDetailResponse,
     AxisListResponse,
     AxisUpdateRequest,
 )
+from app.services.master_data import master_data
 
 router = APIRouter(prefix="/axes", tags=["axes"])
 
@@ -20,31 +25,23 @@ async def list_axes(
     session: AsyncSession = Depends(get_session),
     current_user: UserInfo = Depends(get_current_user),
 ) -> AxisListResponse:
-    axes_result = await session.execute(select(PlanningAxis))
-    steps_result = await session.execute(select(AxisStep))
-    axes = axes_result.scalars().all()
-    steps = steps_result.scalars().all()
-
-    axis_steps_map: dict[int, list[AxisStep]] = {}
-    for step in steps:
-        axis_steps_map.setdefault(step.axis_id, []).append(step)
-
+    data = await master_data.get(session)
     items = []
-    for axis in axes:
+    for axis in data.axes:
         items.append(
             {
                 "code": axis.code,
                 "name": axis.name,
-                "description": axis.description or "",
+                "description": axis.description,
                 "steps": [
                     {
                         "level": s.level,
                         "code": s.code,
                         "title": s.title,
-                        "description": s.description or "",
+                        "description": s.description,
                         "display_order": s.display_order,
                     }
-                    for s in sorted(axis_steps_map.get(axis.id, []), key=lambda x: x.display_order)
+                    for s in data.steps_for(axis.id)
                 ],
             }
         )
@@ -57,8 +54,7 @@ async def get_axis_detail(
     session: AsyncSession = Depends(get_session),
     current_user: UserInfo = Depends(get_current_user),
 ) -> AxisDetailResponse:
-    axis_result = await session.execute(select(PlanningAxis).where(PlanningAxis.code == axis_code))
-    axis = axis_result.scalar_one_or_none()
+    axis = (await master_data.get(session)).axis_by_code(axis_code)
     if not axis:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Axis not found")
 
@@ -92,30 +88,27 @@ async def update_axis_answers(
     session: AsyncSession = Depends(get_session),
     current_user: UserInfo = Depends(get_current_user),
 ) -> AxisDetailResponse:
-    axis_result = await session.execute(select(PlanningAxis).where(PlanningAxis.code == axis_code))
-    axis = axis_result.scalar_one_or_none()
+    axis = (await master_data.get(session)).axis_by_code(axis_code)
     if not axis:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Axis not found")
 
-    answer_result = await session.execute(
-        select(AxisAnswer).where(
-            AxisAnswer.axis_id == axis.id,
-            AxisAnswer.user_id == current_user.id,
-            AxisAnswer.level == payload.level,
+    # 既存の回答があれば更新、なければ作成を1文で行う（同時送信でも一意制約で失敗しない）
+    await session.execute(
+        upsert_stmt(
+            session,
+            AxisAnswer,
+            {
+                "user_id": current_user.id,
+                "axis_id": axis.id,
+                "level": payload.level,
+                "answers_json": payload.answers,
+                "updated_at": datetime.utcnow(),
+            },
+            conflict_columns=["user_id", "axis_id", "level"],
+            update_columns=["answers_json", "updated_at"],
         )
     )
-    existing = answer_result.scalar_one_or_none()
-    if existing:
-        existing.answers_json = payload.answers
-    else:
-        session.add(
-            AxisAnswer(
-                user_id=current_user.id,
-                axis_id=axis.id,
-                level=payload.level,
-                answers_json=payload.answers,
-            )
-        )
+    await bump_user_versions(session, [current_user.id])
     await session.commit()
 
     # Reload answers
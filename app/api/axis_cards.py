@@ -0,0 +1,500 @@
+"""
+質問カードAPI（8軸共通）
+AXIS_CONFIG のレジストリから軸ごとに同じルート（/api/{api_path}/status・/chat・/chat/ticket・/chat/stream・/summary）をマウントする
+- SSE認証: 短命ticket方式（マインドマップと同じ。送信するメッセージは ticket に紐づける）
+軸ごとの違い（質問定義・プロンプト・回答テーブル）は AxisCard にまとめ、処理本体は全軸で共有する
+"""
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator, List, Optional
+
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from openai.types.chat import ChatCompletionMessageParam
+from sqlalchemy import Select, bindparam, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.auth import get_current_user
+from app.config.mindmap_nodes import AXIS_CONFIG
+from app.core.db import get_session
+from app.core.etag import not_modified, user_etag
+from app.core.stream_tickets import TicketStore
+from app.schemas.auth import UserInfo
+from app.schemas.axis_card import (
+    CardChatRequest,
+    CardChatResponse,
+    CardStatusListResponse,
+    CardStatusResponse,
+    CardSummaryRequest,
+    CardSummaryResponse,
+    ChatMessage,
+    ChatTicketResponse,
+)
+from app.services.ai_client import _chat_completion, _chat_completion_stream, is_stream_error
+from app.services.answer_progress import AXIS_ANSWER_MODELS, refresh_axis_progress
+from app.services.card_chat import (
+    append_messages,
+    chat_response_fields,
+    load_axis_histories,
+    load_history,
+    upsert_answer,
+)
+from app.services.chat_context import ChatContext, build_chat_context, schedule_summary_refresh
+from app.services.llm_scheduler import LLMQueueFullError
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT_NOTES = (
+    "・ユーザーの考えや意図を正確に反映してください。"
+    "・具体的で実用的な内容にしてください。"
+    "・前向きなトーンを保ってください。"
+)
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+}
+
+# /chat/stream 用のワンタイムticket（送信するメッセージを payload に保持する）
+chat_tickets = TicketStore(ttl_seconds=60)
+
+# テーブル未作成・DB未接続とみなすエラーメッセージ（AIの応答だけ返して保存はスキップする）
+_MISSING_DB_MARKERS = ("doesn't exist", "Table", "Can't connect")
+
+
+@dataclass(frozen=True)
+class AxisCard:
+    """1軸分の質問カード定義（起動時に AXIS_CONFIG から1回だけ組み立てる）"""
+    code: str
+    api_path: str
+    name: str
+    questions: dict
+    model: Any
+    chat_prompt: str
+    summary_role: str
+    summary_focus: Optional[str]
+    # 組み立て済みのステートメント（値は bindparam で渡す）
+    status_stmt: Select
+
+    def summary_prompt(self, card_title: str) -> str:
+        return (
+            f"あなたは飲食店開業の{self.summary_role}です。"
+            f"以下の会話内容を基に、『{card_title}』についての要約を200〜300文字で作成してください。"
+            "【重要】"
+            f"{self.summary_focus or ''}"
+            f"{SUMMARY_PROMPT_NOTES}"
+        )
+
+
+def _axis_card(code: str, config: dict) -> AxisCard:
+    model = AXIS_ANSWER_MODELS[code]
+    return AxisCard(
+        code=code,
+        api_path=config["api_path"],
+        name=config["name"],
+        questions=config["questions"],
+        model=model,
+        chat_prompt=config["chat_prompt"],
+        summary_role=config["summary_role"],
+        summary_focus=config["summary_focus"],
+        # 同じセッションで Core の upsert をした後でも最新の値を読む
+        status_stmt=(
+            select(model)
+            .where(model.user_id == bindparam("user_id"))
+            .execution_options(populate_existing=True)
+        ),
+    )
+
+
+AXIS_CARDS: dict[str, AxisCard] = {
+    code: _axis_card(code, config) for code, config in AXIS_CONFIG.items()
+}
+
+
+def _is_missing_db(e: Exception) -> bool:
+    error_msg = str(e)
+    return any(marker in error_msg for marker in _MISSING_DB_MARKERS)
+
+
+def get_card(axis: AxisCard, card_id: str) -> dict:
+    """カード定義（存在しなければ 404）"""
+    card = axis.questions.get(card_id)
+    if card is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Card ID '{card_id}' not found",
+        )
+    return card
+
+
+async def _prepare_chat(
+    axis: AxisCard, session: AsyncSession, user_id: int, request: CardChatRequest
+) -> tuple[list[dict], ChatContext]:
+    """会話履歴とプロンプトを用意する（/chat と /chat/stream で共用）"""
+    card_data = get_card(axis, request.card_id)
+
+    # 会話履歴はサーバーに保存済みのものを使う（送信された history は未保存の場合のみ参照）
+    history = await load_history(session, user_id, axis.code, request.card_id, request.history)
+
+    # チャット履歴を構築（トークン予算を超える古いやり取りはカードごとの要約に置き換える）
+    context = await build_chat_context(
+        session,
+        user_id,
+        axis.code,
+        request.card_id,
+        system_prompt=axis.chat_prompt,
+        history=history,
+        user_message=request.user_message,
+        initial_question=card_data["initial_question"],
+    )
+    return history, context
+
+
+async def _save_turn(
+    axis: AxisCard,
+    session: AsyncSession,
+    user_id: int,
+    card_id: str,
+    context: ChatContext,
+    history: list[dict],
+    user_message: str,
+    assistant_message: str,
+    truncated: bool = False,
+) -> list[dict]:
+    """1往復を card_chat_messages に追記して更新後の履歴を返す（未保存の過去分があれば合わせて追記）
+
+    テーブルが存在しない場合は保存をスキップし、id なしの履歴を返す
+    """
+    updated_history = history + [
+        {"id": None, "role": "user", "content": user_message},
+        {"id": None, "role": "assistant", "content": assistant_message, "truncated": truncated},
+    ]
+    try:
+        saved_history = await append_messages(session, user_id, axis.code, card_id, updated_history)
+        await refresh_axis_progress(session, user_id, axis.code)
+        await session.commit()
+    except Exception as e:
+        if not _is_missing_db(e):
+            raise
+        logger.warning(f"データベースエラー（チャット履歴は保存されません。create_all_tables.py を実行してください）: {e}")
+        return updated_history
+    # 古くなったやり取りの要約はバックグラウンドで更新（応答は待たせない）
+    schedule_summary_refresh(context, saved_history)
+    return saved_history
+
+
+# ============================================================
+# Handlers（全軸共通）
+# ============================================================
+async def card_status(
+    axis: AxisCard,
+    request: Request,
+    response: Response,
+    current_user: UserInfo,
+    session: AsyncSession,
+):
+    """ユーザーの全カードの進捗（完了フラグ、サマリー）を返却"""
+    etag = await user_etag(session, current_user.id)
+    if cached := not_modified(request, response, etag):
+        return cached
+    try:
+        result = await session.execute(axis.status_stmt, {"user_id": current_user.id})
+        answers = result.scalars().all()
+    except Exception as e:
+        # テーブルが存在しない場合など、DBエラーが発生した場合は空のリストを返す
+        logger.warning(f"{axis.model.__tablename__} へのアクセスエラー（create_all_tables.py を実行してください）: {e}")
+        answers = []
+
+    # カードIDをキーにした辞書を作成
+    answer_dict = {answer.card_id: answer for answer in answers}
+    # 会話履歴は card_chat_messages から1クエリで取得（未移行のカードは chat_history を使う）
+    card_histories = (await load_axis_histories(session, current_user.id, [axis.code]))[axis.code]
+
+    # 全カードIDに対してステータスを構築
+    statuses: List[CardStatusResponse] = []
+    for card_id in axis.questions.keys():
+        answer = answer_dict.get(card_id)
+        chat_history = None
+        history = card_histories.get(card_id) or (answer.chat_history if answer else None)
+        if history:
+            chat_history = [
+                ChatMessage(
+                    role=msg.get("role", ""),
+                    content=msg.get("content", ""),
+                    id=msg.get("id"),
+                    truncated=msg.get("truncated", False),
+                )
+                for msg in history
+            ]
+        statuses.append(
+            CardStatusResponse(
+                card_id=card_id,
+                is_completed=answer.is_completed if answer else False,
+                summary=answer.summary if answer else None,
+                chat_history=chat_history,
+            )
+        )
+
+    return CardStatusListResponse(statuses=statuses)
+
+
+async def card_chat(
+    axis: AxisCard,
+    request: CardChatRequest,
+    current_user: UserInfo,
+    session: AsyncSession,
+) -> CardChatResponse:
+    """指定されたカードの「AI質問」に基づきOpenAIと会話する"""
+    history, context = await _prepare_chat(axis, session, current_user.id, request)
+    messages: List[ChatCompletionMessageParam] = context.messages
+
+    # OpenAI APIを呼び出し
+    try:
+        assistant_response = await _chat_completion(messages, max_tokens=2000)
+    except LLMQueueFullError:
+        # 混雑時は 503 + Retry-After をそのまま返す
+        raise
+    except Exception as e:
+        logger.error(f"OpenAI API呼び出しエラー: axis={axis.code}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"AI API呼び出しに失敗しました: {str(e)}",
+        )
+
+    if not assistant_response:
+        logger.error(f"OpenAI APIからの応答が空です: axis={axis.code}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="AIからの応答が空でした。時間をおいて再試行してください。",
+        )
+
+    # DBに保存（テーブルが存在しない場合でもAIの応答は返す）
+    updated_history = await _save_turn(
+        axis, session, current_user.id, request.card_id, context, history,
+        request.user_message, assistant_response,
+    )
+
+    return CardChatResponse(
+        assistant_message=assistant_response,
+        **chat_response_fields(updated_history, request.last_message_id),
+    )
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def card_chat_events(
+    axis: AxisCard,
+    request: CardChatRequest,
+    user_id: int,
+    session: AsyncSession,
+) -> AsyncGenerator[str, None]:
+    """チャット応答をSSEで生成（保存はストリーム終了時に1回）
+
+    クライアントが途中で切断した場合は、そこまでの応答を truncated として保存する
+    （まだ何も受け取っていなければ保存しない）。上流が失敗した場合は error を送り、保存しない
+    """
+    try:
+        history, context = await _prepare_chat(axis, session, user_id, request)
+    except Exception as e:
+        logger.error(f"チャットの準備に失敗しました: axis={axis.code}: {e}")
+        yield _sse("error", {"error": str(e), "code": "INTERNAL_ERROR"})
+        return
+
+    chunks: list[str] = []
+
+    async def save(truncated: bool) -> list[dict]:
+        # 切断（キャンセル）されても保存は最後まで行う
+        with anyio.CancelScope(shield=True):
+            return await _save_turn(
+                axis, session, user_id, request.card_id, context, history,
+                request.user_message, "".join(chunks), truncated=truncated,
+            )
+
+    try:
+        async for chunk in _chat_completion_stream(context.messages, max_tokens=2000):
+            if chunk and is_stream_error(chunk):
+                # 失敗の通知を応答として保存しない（/chat が 500 を返すのと同じ扱い）
+                logger.error(f"チャットのストリーミングに失敗しました: axis={axis.code}: {chunk}")
+                yield _sse("error", {"error": "AI API呼び出しに失敗しました", "code": "INTERNAL_ERROR"})
+                return
+            if chunk:
+                chunks.append(chunk)
+                yield _sse("delta", {"delta": chunk})
+    except LLMQueueFullError as e:
+        logger.warning(f"Chat stream rejected: axis={axis.code}: queue full")
+        yield _sse("error", {"error": e.detail, "code": "BUSY", "retry_after": e.retry_after})
+        return
+    except Exception as e:
+        logger.error(f"チャットのストリーミングに失敗しました: axis={axis.code}: {e}")
+        yield _sse("error", {"error": str(e), "code": "INTERNAL_ERROR"})
+        return
+    except BaseException:
+        # クライアントの切断（CancelledError / GeneratorExit）
+        if not chunks:
+            logger.info(f"Chat stream disconnected before any reply: axis={axis.code} card={request.card_id}")
+            raise
+        try:
+            await save(truncated=True)
+            logger.info(f"Chat stream disconnected, partial reply saved: axis={axis.code} card={request.card_id}")
+        except Exception as e:
+            logger.error(f"途中までの応答の保存に失敗しました: axis={axis.code}: {e}")
+        raise
+
+    if not chunks:
+        yield _sse("error", {"error": "AIからの応答が空でした。時間をおいて再試行してください。", "code": "EMPTY"})
+        return
+
+    try:
+        saved_history = await save(truncated=False)
+    except Exception as e:
+        logger.error(f"チャット履歴の保存に失敗しました: axis={axis.code}: {e}")
+        yield _sse("error", {"error": str(e), "code": "INTERNAL_ERROR"})
+        return
+
+    done = CardChatResponse(
+        assistant_message="".join(chunks),
+        **chat_response_fields(saved_history, request.last_message_id),
+    )
+    yield _sse("done", done.model_dump())
+
+
+async def card_summary(
+    axis: AxisCard,
+    request: CardSummaryRequest,
+    current_user: UserInfo,
+    session: AsyncSession,
+) -> CardSummaryResponse:
+    """会話内容を要約してDBに保存し、完了フラグをTrueにする"""
+    card_data = get_card(axis, request.card_id)
+
+    # チャット履歴をテキストに変換（送信されなければサーバーに保存済みの履歴を使う）
+    chat_history = [{"role": msg.role, "content": msg.content} for msg in request.chat_history]
+    if not chat_history:
+        chat_history = await load_history(session, current_user.id, axis.code, request.card_id)
+    chat_text = "\n".join(f"{msg['role']}: {msg['content']}" for msg in chat_history)
+
+    messages: List[ChatCompletionMessageParam] = [
+        {"role": "system", "content": axis.summary_prompt(card_data["title"])},
+        {"role": "user", "content": f"会話内容:\n{chat_text}"},
+    ]
+
+    try:
+        summary = await _chat_completion(messages, max_tokens=2000, use_cache=True)
+    except LLMQueueFullError:
+        raise
+    except Exception as e:
+        logger.error(f"サマリー生成API呼び出しエラー: axis={axis.code}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"サマリー生成に失敗しました: {str(e)}",
+        )
+
+    if not summary:
+        logger.error(f"サマリー生成APIからの応答が空です: axis={axis.code}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="サマリーの生成に失敗しました。時間をおいて再試行してください。",
+        )
+
+    # DBに保存（既存のレコードがあれば更新、なければ作成を1文で行う）
+    # 会話は card_chat_messages に保存済み（chat_history は書き換えない）
+    # テーブルが存在しない場合でもサマリーは返す（保存はスキップ）
+    try:
+        await upsert_answer(
+            session, current_user.id, axis.code, request.card_id, summary=summary, is_completed=True
+        )
+        await refresh_axis_progress(session, current_user.id, axis.code)
+        await session.commit()
+    except Exception as e:
+        if not _is_missing_db(e):
+            raise
+        logger.warning(f"データベースエラー（サマリーは保存されません。create_all_tables.py を実行してください）: {e}")
+
+    return CardSummaryResponse(summary=summary)
+
+
+# ============================================================
+# Routers
+# ============================================================
+def build_axis_router(axis: AxisCard) -> APIRouter:
+    """1軸分のルーターを作る（パス・タグは従来の軸別ルーターと同じ）"""
+    router = APIRouter(prefix=f"/api/{axis.api_path}", tags=[axis.api_path])
+
+    @router.get("/status", response_model=CardStatusListResponse, name=f"{axis.code}_status")
+    async def get_status(
+        request: Request,
+        response: Response,
+        current_user: UserInfo = Depends(get_current_user),
+        session: AsyncSession = Depends(get_session),
+    ) -> CardStatusListResponse:
+        """ユーザーの全カードの進捗（完了フラグ、サマリー）を返却"""
+        return await card_status(axis, request, response, current_user, session)
+
+    @router.post("/chat", response_model=CardChatResponse, name=f"{axis.code}_chat")
+    async def post_chat(
+        request: CardChatRequest,
+        current_user: UserInfo = Depends(get_current_user),
+        session: AsyncSession = Depends(get_session),
+    ) -> CardChatResponse:
+        """指定されたカードの「AI質問」に基づきOpenAIと会話する"""
+        return await card_chat(axis, request, current_user, session)
+
+    @router.post("/chat/ticket", response_model=ChatTicketResponse, name=f"{axis.code}_chat_ticket")
+    async def create_chat_ticket(
+        request: CardChatRequest,
+        current_user: UserInfo = Depends(get_current_user),
+    ) -> ChatTicketResponse:
+        """
+        チャットSSE接続用のワンタイムticketを発行（送信するメッセージは ticket に紐づけて保持）
+
+        - 認証: Bearer 必須
+        - TTL: 60秒
+        - 1回利用で無効化
+        """
+        get_card(axis, request.card_id)
+        ticket = chat_tickets.issue(current_user.id, axis.code, payload=request)
+        return ChatTicketResponse(ticket=ticket, expires_in=chat_tickets.ttl_seconds)
+
+    @router.get("/chat/stream", name=f"{axis.code}_chat_stream")
+    async def stream_chat(
+        ticket: str = Query(..., description="ワンタイムticket"),
+        session: AsyncSession = Depends(get_session),
+    ) -> StreamingResponse:
+        """
+        /chat のストリーミング版（EventSource互換・text/event-stream）
+
+        SSEイベント:
+        - delta: 応答のチャンク
+        - done: 完了（保存済み。/chat の応答と同じ形）
+        - error: エラー
+        """
+        data = chat_tickets.redeem(ticket, axis.code)
+        if data is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid or expired ticket",
+            )
+        return StreamingResponse(
+            card_chat_events(axis, data["payload"], data["user_id"], session),
+            media_type="text/event-stream",
+            headers=SSE_HEADERS,
+        )
+
+    @router.post("/summary", response_model=CardSummaryResponse, name=f"{axis.code}_summary")
+    async def post_summary(
+        request: CardSummaryRequest,
+        current_user: UserInfo = Depends(get_current_user),
+        session: AsyncSession = Depends(get_session),
+    ) -> CardSummaryResponse:
+        """会話内容を要約してDBに保存し、完了フラグをTrueにする"""
+        return await card_summary(axis, request, current_user, session)
+
+    return router
+
+
+routers: list[APIRouter] = [build_axis_router(axis) for axis in AXIS_CARDS.values()]
@@ -0,0 +1,136 @@
+"""
+ログイン直後の初期表示データを1往復で返すAPI
+/dashboard・/api/mindmap/state・/api/{axis}/status（8軸分）をまとめ、
+認証1回・同一セッション・*_answers の読み込み1回で組み立てる
+"""
+import logging
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from pydantic import BaseModel
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.auth import get_current_user
+from app.api.dashboard import build_dashboard
+from app.api.mindmap import MindmapStateResponse, build_mindmap_state
+from app.config.mindmap_nodes import AXIS_CONFIG
+from app.core.db import get_read_session
+from app.core.etag import not_modified, user_etag
+from app.schemas.auth import UserInfo
+from app.schemas.axis_card import CardStatusResponse, ChatMessage
+from app.schemas.dashboard import DashboardResponse
+from app.services.answer_progress import (
+    AXIS_ANSWER_MODELS,
+    CardProgress,
+    axis_progress_from_cards,
+    fetch_card_progress,
+)
+from app.services.card_chat import load_axis_histories
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/bootstrap", tags=["bootstrap"])
+
+# fields で指定できる項目（statuses.chat_history は statuses にチャット履歴を含める）
+BOOTSTRAP_FIELDS = ("dashboard", "mindmap", "statuses", "statuses.chat_history")
+
+
+class BootstrapResponse(BaseModel):
+    """fields で指定しなかった項目は null"""
+    dashboard: Optional[DashboardResponse] = None
+    mindmap: Optional[MindmapStateResponse] = None
+    statuses: Optional[Dict[str, List[CardStatusResponse]]] = None
+
+
+def parse_fields(fields: Optional[str]) -> set[str]:
+    """カンマ区切りの fields を検証（省略時はすべて）"""
+    if not fields:
+        return set(BOOTSTRAP_FIELDS)
+    selected = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = selected - set(BOOTSTRAP_FIELDS)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}",
+        )
+    if "statuses.chat_history" in selected:
+        selected.add("statuses")
+    return selected
+
+
+def build_statuses(
+    progress: dict[str, dict[str, CardProgress]],
+    with_history: bool,
+    histories: Optional[dict[str, dict[str, list[dict]]]] = None,
+) -> dict[str, list[CardStatusResponse]]:
+    """histories は card_chat_messages の履歴（未移行のカードは *_answers.chat_history を使う）"""
+    histories = histories or {}
+    statuses: dict[str, list[CardStatusResponse]] = {}
+    for axis_code, config in AXIS_CONFIG.items():
+        if axis_code not in AXIS_ANSWER_MODELS:
+            continue
+        cards = progress.get(axis_code, {})
+        items = []
+        for card_id in config["questions"].keys():
+            card = cards.get(card_id)
+            chat_history = None
+            history = histories.get(axis_code, {}).get(card_id) or (card.chat_history if card else None)
+            if with_history and history:
+                chat_history = [
+                    ChatMessage(
+                        role=msg.get("role", ""),
+                        content=msg.get("content", ""),
+                        id=msg.get("id"),
+                        truncated=msg.get("truncated", False),
+                    )
+                    for msg in history
+                ]
+            items.append(
+                CardStatusResponse(
+                    card_id=card_id,
+                    is_completed=card.is_completed if card else False,
+                    summary=card.summary if card else None,
+                    chat_history=chat_history,
+                )
+            )
+        statuses[axis_code] = items
+    return statuses
+
+
+@router.get("", response_model=BootstrapResponse)
+async def get_bootstrap(
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(
+        None,
+        description="カンマ区切りで dashboard / mindmap / statuses / statuses.chat_history を指定（省略時はすべて）",
+    ),
+    session: AsyncSession = Depends(get_read_session),
+    current_user: UserInfo = Depends(get_current_user),
+) -> BootstrapResponse:
+    """ダッシュボード・マインドマップ・全軸のカード状況をまとめて返す"""
+    selected = parse_fields(fields)
+    etag = await user_etag(session, current_user.id, sorted(selected))
+    if cached := not_modified(request, response, etag):
+        return cached
+
+    # 8軸のカード状況を1クエリで取得し、3つの応答で共用する
+    with_history = "statuses.chat_history" in selected
+    try:
+        progress = await fetch_card_progress(session, current_user.id, with_history=with_history)
+    except SQLAlchemyError as e:
+        logger.warning(f"質問カードの回答状況の取得に失敗: {e}")
+        progress = {code: {} for code in AXIS_ANSWER_MODELS}
+
+    result = BootstrapResponse()
+    if "dashboard" in selected:
+        result.dashboard = await build_dashboard(
+            session, current_user, card_progress=axis_progress_from_cards(progress)
+        )
+    if "mindmap" in selected:
+        result.mindmap = build_mindmap_state(progress)
+    if "statuses" in selected:
+        histories = await load_axis_histories(session, current_user.id) if with_history else None
+        result.statuses = build_statuses(progress, with_history, histories)
+    return result
@@ -6,7 +6,7 @@ import logging
 import traceback
 from datetime import datetime, timezone
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -15,7 +15,7 @@ logger = logging.getLogger(__name__)
 from app.api.auth import get_current_user
 from app.config.deep_dive_data import DEEP_DIVE_DATA
 from app.core.db import get_session
-from app.models.axis import PlanningAxis
+from app.core.etag import not_modified, user_etag
 from app.models.deep_dive import DeepDiveChatLog, DeepDiveProgress, DeepDiveStatus
 from app.schemas.auth import UserInfo
 from app.schemas.deep_dive import (
@@ -28,6 +28,7 @@ from app.schemas.deep_dive import (
     DeepDiveStep,
 )
 from app.services.ai_client import answer_question, generate_deep_dive_summary
+from app.services.master_data import master_data
 
 router = APIRouter(prefix="/deep-dive", tags=["deep-dive"])
 
@@ -43,8 +44,7 @@ async def get_deep_dive_list_test(
     logger.info(f"TEST: GET /deep-dive/test/{axis_code}/list")
     try:
         # 軸の存在確認と名前取得
-        result = await session.execute(select(PlanningAxis).where(PlanningAxis.code == axis_code))
-        axis = result.scalar_one_or_none()
+        axis = (await master_data.get(session)).axis_by_code(axis_code)
         if not axis:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Axis not found")
 
@@ -106,6 +106,8 @@ async def get_deep_dive_list_test(
 @router.get("/{axis_code}/list", response_model=DeepDiveListResponse)
 async def get_deep_dive_list(
     axis_code: str,
+    request: Request,
+    response: Response,
     session: AsyncSession = Depends(get_session),
     current_user: UserInfo = Depends(get_current_user),  # 認証必須
 ) -> DeepDiveListResponse:
@@ -113,14 +115,16 @@ async def get_deep_dive_list(
     指定された軸の深掘りカード一覧と進捗を取得
     パフォーマンス最適化: DB一括取得 + メモリ内マージ方式
     """
+    etag = await user_etag(session, current_user.id)
+    if cached := not_modified(request, response, etag):
+        return cached
     try:
         logger.info(f"GET /deep-dive/{axis_code}/list - User ID: {current_user.id}")
         
         # ステップ1: 軸の存在確認と名前取得
         logger.debug(f"Fetching axis: {axis_code}")
         try:
-            result = await session.execute(select(PlanningAxis).where(PlanningAxis.code == axis_code))
-            axis = result.scalar_one_or_none()
+            axis = (await master_data.get(session)).axis_by_code(axis_code)
         except Exception as db_error:
             logger.error(f"データベースエラー（PlanningAxis取得）: {db_error}", exc_info=True)
             raise HTTPException(
@@ -1,13 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.auth import get_current_user
 from app.core.db import get_session
-from app.models.axis import PlanningAxis
 from app.schemas.auth import UserInfo
 from app.schemas.deep_questions import DeepMessage, DeepQuestionRequest, DeepThreadResponse
 from app.services.deep_questions import add_message, list_messages
+from app.services.master_data import master_data
 
 router = APIRouter(prefix="/deep_questions", tags=["deep_questions"])
 
@@ -15,8 +14,7 @@ router = APIRouter(prefix="/deep_questions", tags=["deep_questions"])
 async def _resolve_axis_code(
     session: AsyncSession, axis_code: str | None
 ) -> tuple[str, str]:
-    result = await session.execute(select(PlanningAxis).order_by(PlanningAxis.display_order))
-    axes = list(result.scalars())
+    axes = (await master_data.get(session)).axes
     if not axes:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No axes defined")
     if axis_code:
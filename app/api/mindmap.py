@@ -7,12 +7,11 @@ from __future__ import annotations
 
 import json
 import logging
-import secrets
-from datetime import datetime, timedelta
+from datetime import datetime
 from enum import Enum
 from typing import AsyncGenerator
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy import select
@@ -26,62 +25,34 @@ from app.config.mindmap_nodes import (
     parse_node_id,
 )
 from app.core.db import get_session
-from app.models.concept_answer import ConceptAnswer
-from app.models.funding_plan_answer import FundingPlanAnswer
-from app.models.interior_exterior_answer import InteriorExteriorAnswer
-from app.models.location_answer import LocationAnswer
-from app.models.marketing_answer import MarketingAnswer
-from app.models.menu_answer import MenuAnswer
-from app.models.operation_answer import OperationAnswer
-from app.models.revenue_forecast_answer import RevenueForecastAnswer
+from app.core.etag import not_modified, user_etag
+from app.core.stream_tickets import TicketStore
 from app.schemas.auth import UserInfo
 from app.services.ai_client import _chat_completion_stream
+from app.services.answer_progress import (
+    AXIS_ANSWER_MODELS,
+    CardProgress,
+    fetch_card_progress,
+    refresh_axis_progress,
+)
+from app.services.card_chat import load_history, upsert_answer
+from app.services.llm_scheduler import LLMQueueFullError
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/mindmap", tags=["mindmap"])
 
 
-# ============================================================
-# 軸コード → Answerモデル マッピング
-# ============================================================
-AXIS_ANSWER_MODELS = {
-    "concept": ConceptAnswer,
-    "revenue_forecast": RevenueForecastAnswer,
-    "funds": FundingPlanAnswer,
-    "operation": OperationAnswer,
-    "location": LocationAnswer,
-    "interior_exterior": InteriorExteriorAnswer,
-    "marketing": MarketingAnswer,
-    "menu": MenuAnswer,
-}
-
-
 # ============================================================
 # Ticket管理（メモリ保存）
 # ============================================================
-_tickets: dict[str, dict] = {}
 TICKET_TTL_SECONDS = 60
-
-
-def _cleanup_expired_tickets() -> None:
-    """期限切れticketを削除"""
-    now = datetime.utcnow()
-    expired = [k for k, v in _tickets.items() if v["expires_at"] < now]
-    for k in expired:
-        del _tickets[k]
+_tickets = TicketStore(ttl_seconds=TICKET_TTL_SECONDS)
 
 
 def _create_ticket(user_id: int, node_id: str) -> str:
     """ワンタイムticketを発行"""
-    _cleanup_expired_tickets()
-    ticket = secrets.token_urlsafe(32)
-    _tickets[ticket] = {
-        "user_id": user_id,
-        "node_id": node_id,
-        "expires_at": datetime.utcnow() + timedelta(seconds=TICKET_TTL_SECONDS),
-    }
-    return ticket
+    return _tickets.issue(user_id, node_id)
 
 
 def _validate_ticket(ticket: str, node_id: str) -> int | None:
@@ -91,15 +62,8 @@ def _validate_ticket(ticket: str, node_id: str) -> int | None:
     Returns:
         int | None: 有効な場合はuser_id、無効な場合はNone
     """
-    _cleanup_expired_tickets()
-    data = _tickets.pop(ticket, None)
-    if not data:
-        return None
-    if data["expires_at"] < datetime.utcnow():
-        return None
-    if data["node_id"] != node_id:
-        return None
-    return data["user_id"]
+    data = _tickets.redeem(ticket, node_id)
+    return data["user_id"] if data else None
 
 
 # ============================================================
@@ -182,19 +146,32 @@ async def _get_chat_history_from_db(
     if card_id is None:
         return None  # 軸ノードはサマリー対象外
 
-    answer = await _get_answer_model_instance(db, user_id, axis_code, card_id)
-    if answer and answer.chat_history:
-        return answer.chat_history
-    return None
+    if axis_code not in AXIS_ANSWER_MODELS:
+        return None
+
+    # card_chat_messages を優先し、未移行のカードは chat_history を使う
+    history = await load_history(db, user_id, axis_code, card_id)
+    return history or None
 
 
-def _derive_status(answer) -> MindmapNodeStatus:
-    """回答レコードからstatusを導出"""
+def _derive_status(answer, has_history: bool = False) -> MindmapNodeStatus:
+    """回答レコードからstatusを導出（has_history: card_chat_messages に会話があるか）"""
     if answer is None:
         return MindmapNodeStatus.NOT_STARTED
     if answer.is_completed:
         return MindmapNodeStatus.COMPLETED
-    if answer.chat_history and len(answer.chat_history) > 0:
+    if has_history or (answer.chat_history and len(answer.chat_history) > 0):
+        return MindmapNodeStatus.IN_PROGRESS
+    return MindmapNodeStatus.NOT_STARTED
+
+
+def _derive_card_status(card: CardProgress | None) -> MindmapNodeStatus:
+    """集計済みのカード進捗からstatusを導出（_derive_status と同じ判定）"""
+    if card is None:
+        return MindmapNodeStatus.NOT_STARTED
+    if card.is_completed:
+        return MindmapNodeStatus.COMPLETED
+    if card.has_history:
         return MindmapNodeStatus.IN_PROGRESS
     return MindmapNodeStatus.NOT_STARTED
 
@@ -256,21 +233,11 @@ async def _summary_event_stream(
                 data = json.dumps({"delta": chunk}, ensure_ascii=False)
                 yield f"event: summary_delta\ndata: {data}\n\n"
 
-        # DB更新: summary保存 & is_completed=True
-        AnswerModel = AXIS_ANSWER_MODELS.get(axis_code)
-        if AnswerModel:
-            result = await db.execute(
-                select(AnswerModel).where(
-                    AnswerModel.user_id == user_id,
-                    AnswerModel.card_id == card_id,
-                )
-            )
-            answer = result.scalar_one_or_none()
-            if answer:
-                answer.summary = full_summary
-                answer.is_completed = True
-                await db.commit()
-                logger.info(f"Summary saved for node_id={node_id}, user_id={user_id}")
+        # DB更新: summary保存 & is_completed=True（1文の upsert）
+        await upsert_answer(db, user_id, axis_code, card_id, summary=full_summary, is_completed=True)
+        await refresh_axis_progress(db, user_id, axis_code)
+        await db.commit()
+        logger.info(f"Summary saved for node_id={node_id}, user_id={user_id}")
 
         # done イベント
         done_data = json.dumps({
@@ -280,6 +247,10 @@ async def _summary_event_stream(
         }, ensure_ascii=False)
         yield f"event: done\ndata: {done_data}\n\n"
 
+    except LLMQueueFullError as e:
+        logger.warning(f"Summary rejected for node_id={node_id}: queue full")
+        data = json.dumps({"error": e.detail, "code": "BUSY", "retry_after": e.retry_after}, ensure_ascii=False)
+        yield f"event: error\ndata: {data}\n\n"
     except Exception as e:
         logger.error(f"Error generating summary for node_id={node_id}: {e}")
         yield f"event: error\ndata: {json.dumps({'error': str(e), 'code': 'INTERNAL_ERROR'})}\n\n"
@@ -429,66 +400,47 @@ async def update_node_status(
     elif request.status == MindmapNodeStatus.IN_PROGRESS:
         answer.is_completed = False
 
+    await refresh_axis_progress(db, current_user.id, axis_code)
     await db.commit()
     await db.refresh(answer)
+    history = await load_history(db, current_user.id, axis_code, card_id)
 
     return NodeStatusResponse(
         node_id=node_id,
-        status=_derive_status(answer),
+        status=_derive_status(answer, has_history=bool(history)),
         summary=answer.summary,
         updated_at=answer.updated_at,
     )
 
 
-@router.get("/state", response_model=MindmapStateResponse)
-async def get_mindmap_state(
-    current_user: UserInfo = Depends(get_current_user),
-    db: AsyncSession = Depends(get_session),
-) -> MindmapStateResponse:
-    """
-    マインドマップ表示用の状態一覧＋レーダースコア
-
-    - 認証: Bearer 必須
-    - 既存 *_answers を参照して status を導出
-    - dashboard と同じ計算式を使用
-    """
+def build_mindmap_state(progress: dict[str, dict[str, CardProgress]]) -> MindmapStateResponse:
+    """fetch_card_progress の結果からノード一覧と軸スコアを組み立てる（/bootstrap と共用）"""
     nodes: list[NodeInfo] = []
     axis_scores: list[AxisScoreInfo] = []
 
     for axis_code, config in AXIS_CONFIG.items():
-        AnswerModel = AXIS_ANSWER_MODELS.get(axis_code)
-        if not AnswerModel:
+        if axis_code not in AXIS_ANSWER_MODELS:
             continue
 
         questions = config["questions"]
-
-        # 該当軸の全回答を取得
-        result = await db.execute(
-            select(AnswerModel).where(AnswerModel.user_id == current_user.id)
-        )
-        answers = {a.card_id: a for a in result.scalars()}
+        cards = progress.get(axis_code, {})
 
         completed_count = 0
         card_nodes: list[NodeInfo] = []
 
         for card_id, q_data in questions.items():
-            answer = answers.get(card_id)
-            status = _derive_status(answer)
+            card = cards.get(card_id)
 
             # dashboardと同じく「回答あり」としてカウント
-            if answer and (
-                answer.is_completed or
-                (answer.chat_history and len(answer.chat_history) > 0) or
-                (answer.summary and len(answer.summary) > 0)
-            ):
+            if card and card.answered:
                 completed_count += 1
 
             card_nodes.append(NodeInfo(
                 node_id=f"{axis_code}_{card_id}",
                 name=q_data["title"],
                 type="card",
-                status=status,
-                summary=answer.summary if answer else None,
+                status=_derive_card_status(card),
+                summary=card.summary if card else None,
             ))
 
         # 軸ノード（集約）を先頭に追加
@@ -515,3 +467,26 @@ async def get_mindmap_state(
         ))
 
     return MindmapStateResponse(nodes=nodes, axis_scores=axis_scores)
+
+
+@router.get("/state", response_model=MindmapStateResponse)
+async def get_mindmap_state(
+    request: Request,
+    response: Response,
+    current_user: UserInfo = Depends(get_current_user),
+    db: AsyncSession = Depends(get_session),
+) -> MindmapStateResponse:
+    """
+    マインドマップ表示用の状態一覧＋レーダースコア
+
+    - 認証: Bearer 必須
+    - 既存 *_answers を1クエリで集計して status を導出
+    - dashboard と同じ計算式を使用
+    """
+    etag = await user_etag(db, current_user.id)
+    if cached := not_modified(request, response, etag):
+        return cached
+
+    # 8軸の回答状況を1クエリで取得（chat_history本体は読まない）
+    progress = await fetch_card_progress(db, current_user.id)
+    return build_mindmap_state(progress)
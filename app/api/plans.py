@@ -1,10 +1,11 @@
 # プラン関連のAPI　からちゃん
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.auth import get_current_user
 from app.core.db import get_session
+from app.core.etag import not_modified, user_etag
 from app.models.plan import PlanningPlan
 from app.schemas.auth import UserInfo
 from app.schemas.plan import PlanCreateRequest, PlanListResponse, PlanResponse
@@ -14,6 +15,8 @@ router = APIRouter(prefix="/plans", tags=["plans"])
 
 @router.get("", response_model=PlanListResponse)
 async def list_my_plans(
+    request: Request,
+    response: Response,
     session: AsyncSession = Depends(get_session),
     current_user: UserInfo = Depends(get_current_user),
 ) -> PlanListResponse:
@@ -21,6 +24,9 @@ async def list_my_plans(
     ログインユーザーが持っているプラン一覧を返す。
     （STEP2ではまだ単純に created_at 昇順で返すだけ）
     """
+    etag = await user_etag(session, current_user.id)
+    if cached := not_modified(request, response, etag):
+        return cached
     result = await session.execute(
         select(PlanningPlan)
         .where(PlanningPlan.user_id == current_user.id)
@@ -19,20 +19,44 @@ from app.models.menu_answer import MenuAnswer
 from app.models.operation_answer import OperationAnswer
 from app.models.revenue_forecast_answer import RevenueForecastAnswer
 from app.schemas.auth import UserInfo
+from app.schemas.cashflow import CashflowOverrides, CashflowResponse
 from app.services.ai_client import _chat_completion
+from app.services.cashflow import build_user_cashflow, format_cashflow_for_prompt
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/report", tags=["report"])
 
 
+@router.post("/cashflow", response_model=CashflowResponse)
+async def get_cashflow(
+    overrides: CashflowOverrides,
+    session: AsyncSession = Depends(get_session),
+    current_user: UserInfo = Depends(get_current_user),
+) -> CashflowResponse:
+    """
+    36か月のキャッシュフロー・借入返済予測を返す
+    前提は最新の簡易シミュレーション結果から作り、リクエストで指定した項目だけ上書きする
+    """
+    projection = await build_user_cashflow(
+        session, current_user.id, **overrides.model_dump(exclude_none=True)
+    )
+    if projection is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="簡易シミュレーションの結果がないため、キャッシュフローを計算できません",
+        )
+    return CashflowResponse(**projection.to_dict())
+
+
 @router.get("")
 async def get_report(
     session: AsyncSession = Depends(get_session),
     current_user: UserInfo = Depends(get_current_user),
-) -> dict[str, str]:
+) -> dict:
     """
     全8軸のAIサマリーを結合してMarkdown形式で返す
+    財務計画の数値はAIに作らせず、キャッシュフロー予測の計算結果を埋め込む
     """
     # 各軸のサマリーを取得する関数
     async def get_axis_summary(AnswerModel, axis_name: str) -> str:
@@ -69,6 +93,14 @@ async def get_report(
     revenue_forecast_summary = await get_axis_summary(RevenueForecastAnswer, "収支予測")
     operation_summary = await get_axis_summary(OperationAnswer, "オペレーション")
     interior_exterior_summary = await get_axis_summary(InteriorExteriorAnswer, "内装外装")
+
+    # 財務計画の数値（コードで計算した36か月のキャッシュフロー予測）
+    cashflow = None
+    try:
+        cashflow = await build_user_cashflow(session, current_user.id)
+    except Exception as e:
+        logger.warning(f"キャッシュフロー予測の計算に失敗: {e}")
+    cashflow_text = format_cashflow_for_prompt(cashflow) if cashflow else "（簡易シミュレーション未実施のため未計算）"
     
     # AIに事業計画書を生成させる
     system_prompt = """あなたはプロの経営コンサルタント兼コピーライターです。
@@ -100,6 +132,7 @@ async def get_report(
 
 6. **## 財務計画**
    - Funding（資金計画）、Revenue（収支予測）を統合してください
+   - 「財務計画の数値（自動計算）」が与えられている場合は、その数値をそのまま使用し、独自に数値を作らないでください
    - 数字は強調（**太字**）してください
    - 投資対効果や収益性を明確に示してください
 
@@ -133,6 +166,9 @@ async def get_report(
 【収支予測】
 {revenue_forecast_summary}
 
+【財務計画の数値（自動計算）】
+{cashflow_text}
+
 【オペレーション】
 {operation_summary}
 
@@ -152,6 +188,7 @@ async def get_report(
             messages=messages,
             max_tokens=4000,  # 事業計画書は長文になるため、トークン数を増やす
             temperature=0.7,
+            use_cache=True,  # 要約が変わらなければ同じ計画書を返す
         )
         
         if not ai_generated_content:
@@ -161,7 +198,13 @@ async def get_report(
                 detail="事業計画書の生成に失敗しました。時間をおいて再試行してください。"
             )
         
-        return {"content": ai_generated_content}
+        return {
+            "content": ai_generated_content,
+            "cashflow": cashflow.to_dict() if cashflow else None,
+        }
+    except HTTPException:
+        # 503（混雑）や上で送出した 500 は包み直さずにそのまま返す
+        raise
     except Exception as e:
         logger.error(f"事業計画書生成エラー: {e}", exc_info=True)
         raise HTTPException(
@@ -1,71 +1,51 @@
 import asyncio
 import json
 import logging
+import secrets
 from typing import AsyncGenerator, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
 from fastapi.responses import StreamingResponse
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.auth import get_current_user, get_current_user_optional
+from app.core.config import get_settings
 from app.core.db import get_session
-from app.models.simple_simulation import SimpleSimulationAnswer, SimpleSimulationSession
+from app.models.simple_simulation import (
+    SimpleSimulationAnswer,
+    SimpleSimulationResult,
+    SimpleSimulationSession,
+)
 from app.schemas.auth import UserInfo
 from app.schemas.simulation import (
     AttachUserRequest,
+    ForecastGridRequest,
+    ForecastGridResponse,
+    ForecastRiskRequest,
+    ForecastRiskResponse,
+    SimulationBatchRequest,
+    SimulationBatchResponse,
     SimulationResultResponse,
+    StoreStoryStatusResponse,
     SubmitSimulationRequest,
 )
-from app.services.ai_client import _chat_completion_stream
+from app.services.forecast_grid import build_forecast_grid
+from app.services.forecast_risk import run_forecast_risk
+from app.services.llm_scheduler import LLMQueueFullError
 from app.services.simulation import (
-    MAIN_GENRE_LABELS,
-    SUB_GENRE_LABELS,
-    LOCATION_LABELS,
     attach_session_to_user,
+    process_simulation_batch,
     process_simulation_submission,
 )
+from app.services.simulation_advice import ADVICE_PROMPTS, stream_profile_advice
+from app.services.store_story_jobs import STORY_READY, get_story_job, wait_for_story
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/simulations/simple", tags=["simulations"])
 
 
-# AI advice generation prompts for each category
-ADVICE_PROMPTS = {
-    "location": {
-        "event_name": "advice_location_delta",
-        "system": """あなたは飲食店開業の立地選定の専門家です。
-ユーザーの店舗プロファイルに基づいて、立地に関する具体的なアドバイスを提供してください。
-200〜300文字程度で、実用的で前向きなアドバイスを日本語で回答してください。""",
-    },
-    "hr": {
-        "event_name": "advice_hr_delta",
-        "system": """あなたは飲食店開業の人材採用・オペレーションの専門家です。
-ユーザーの店舗プロファイルに基づいて、人材採用とオペレーションに関する具体的なアドバイスを提供してください。
-200〜300文字程度で、実用的で前向きなアドバイスを日本語で回答してください。""",
-    },
-    "menu": {
-        "event_name": "advice_menu_delta",
-        "system": """あなたは飲食店開業のメニュー開発の専門家です。
-ユーザーの店舗プロファイルに基づいて、メニュー構成や価格設定に関する具体的なアドバイスを提供してください。
-200〜300文字程度で、実用的で前向きなアドバイスを日本語で回答してください。""",
-    },
-    "marketing": {
-        "event_name": "advice_marketing_delta",
-        "system": """あなたは飲食店開業の販促・マーケティングの専門家です。
-ユーザーの店舗プロファイルに基づいて、集客やSNS運用に関する具体的なアドバイスを提供してください。
-200〜300文字程度で、実用的で前向きなアドバイスを日本語で回答してください。""",
-    },
-    "funds": {
-        "event_name": "advice_funds_delta",
-        "system": """あなたは飲食店開業の資金計画の専門家です。
-ユーザーの店舗プロファイルに基づいて、資金調達や収支計画に関する具体的なアドバイスを提供してください。
-200〜300文字程度で、実用的で前向きなアドバイスを日本語で回答してください。""",
-    },
-}
-
-
 @router.post("/result", response_model=SimulationResultResponse)
 async def submit_simple_simulation(
     payload: SubmitSimulationRequest,
@@ -79,6 +59,50 @@ async def submit_simple_simulation(
     )
 
 
+def require_partner_token(x_partner_token: str = Header(default="")) -> None:
+    """X-Partner-Token ヘッダーを検証（SIMULATION_BATCH_PARTNER_TOKEN 未設定時は一括送信APIごと無効）"""
+    expected = get_settings().simulation_batch_partner_token
+    if not expected:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not secrets.compare_digest(x_partner_token, expected):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid partner token")
+
+
+@router.post(
+    "/result/batch",
+    response_model=SimulationBatchResponse,
+    dependencies=[Depends(require_partner_token)],
+)
+async def submit_simple_simulation_batch(
+    payload: SimulationBatchRequest,
+    session: AsyncSession = Depends(get_session),
+) -> SimulationBatchResponse:
+    """
+    Submit many guest simulations at once (partner intake import).
+
+    Items are saved as guest sessions (keyed by guest_session_token) in one
+    transaction; store stories are generated in the background. Only the
+    partner credential (X-Partner-Token) may call this: it writes arbitrary
+    guest sessions and starts one LLM story job per item.
+    """
+    max_items = get_settings().simulation_batch_max_items
+    if len(payload.items) > max_items:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many items in one batch (max {max_items})",
+        )
+    logger.info(f"Partner submitted a simulation batch of {len(payload.items)} items")
+
+    items = await process_simulation_batch(db=session, items=payload.items)
+    succeeded = sum(1 for item in items if item.ok)
+    return SimulationBatchResponse(
+        total=len(items),
+        succeeded=succeeded,
+        failed=len(items) - succeeded,
+        items=items,
+    )
+
+
 @router.post("/attach-user", response_model=SimulationResultResponse)
 async def attach_user_to_session(
     payload: AttachUserRequest,
@@ -97,6 +121,20 @@ async def attach_user_to_session(
     return result
 
 
+@router.post("/forecast-grid", response_model=ForecastGridResponse)
+async def forecast_grid(payload: ForecastGridRequest) -> ForecastGridResponse:
+    """What-if sensitivity grid of the financial forecast (seats × price × occupancy × days × ratios)."""
+    # surfaces の組み立て（.tolist() と検証）は数十万シナリオで1秒を超えるためスレッドで実行
+    return await asyncio.to_thread(build_forecast_grid, payload)
+
+
+@router.post("/forecast-risk", response_model=ForecastRiskResponse)
+async def forecast_risk(payload: ForecastRiskRequest) -> ForecastRiskResponse:
+    """Monte Carlo risk bands (P10/P50/P90) and probability of falling below break-even."""
+    # 10^6 試行では数十ms以上かかるためイベントループを塞がないようスレッドで実行
+    return await asyncio.to_thread(run_forecast_risk, payload)
+
+
 async def _get_session_profile(db: AsyncSession, session_id: int) -> dict:
     """Get simulation session profile from database."""
     # Get session
@@ -123,62 +161,6 @@ async def _get_session_profile(db: AsyncSession, session_id: int) -> dict:
     return profile
 
 
-def _build_profile_description(profile: dict) -> str:
-    """Build a human-readable profile description for AI prompts."""
-    parts = []
-
-    # Genre
-    main_genre = profile.get("main_genre", "")
-    sub_genre = profile.get("sub_genre", "")
-    genre_label = MAIN_GENRE_LABELS.get(main_genre, main_genre)
-    sub_label = SUB_GENRE_LABELS.get(sub_genre, "")
-    if sub_label:
-        parts.append(f"業態: {sub_label}{genre_label}")
-    elif genre_label:
-        parts.append(f"業態: {genre_label}")
-
-    # Location
-    location = profile.get("location", "")
-    location_label = LOCATION_LABELS.get(location, location)
-    if location_label:
-        parts.append(f"立地: {location_label}")
-
-    # Seats
-    seats = profile.get("seats", "")
-    if seats:
-        parts.append(f"席数: {seats}席")
-
-    # Price point
-    price = profile.get("price_point", "")
-    if price:
-        parts.append(f"客単価: {price}円")
-
-    # Business hours
-    hours = profile.get("business_hours", "")
-    if hours:
-        parts.append(f"営業時間: {hours}")
-
-    return "\n".join(parts) if parts else "情報なし"
-
-
-async def _generate_advice_stream(
-    category: str, profile_desc: str
-) -> AsyncGenerator[str, None]:
-    """Generate streaming advice for a specific category."""
-    prompt_config = ADVICE_PROMPTS.get(category)
-    if not prompt_config:
-        yield ""
-        return
-
-    messages = [
-        {"role": "system", "content": prompt_config["system"]},
-        {"role": "user", "content": f"以下の店舗プロファイルに基づいてアドバイスをください:\n\n{profile_desc}"},
-    ]
-
-    async for chunk in _chat_completion_stream(messages, max_tokens=512):
-        yield chunk
-
-
 async def _event_stream(session_id: int, db: AsyncSession) -> AsyncGenerator[str, None]:
     """Generate SSE event stream for simulation result."""
     try:
@@ -188,26 +170,23 @@ async def _event_stream(session_id: int, db: AsyncSession) -> AsyncGenerator[str
             yield f"event: error\ndata: {json.dumps({'error': 'Session not found'})}\n\n"
             return
 
-        profile_desc = _build_profile_description(profile)
         logger.info(f"Generating AI advice for session {session_id}")
 
-        # Generate advice for each category
-        for category, config in ADVICE_PROMPTS.items():
-            event_name = config["event_name"]
-            logger.info(f"Generating {category} advice...")
-
-            async for chunk in _generate_advice_stream(category, profile_desc):
-                if chunk:
-                    data = json.dumps({"delta": chunk}, ensure_ascii=False)
-                    yield f"event: {event_name}\ndata: {data}\n\n"
-
-            # Small delay between categories
-            await asyncio.sleep(0.1)
+        # 5カテゴリを並行生成し、届いた順にイベントとして送る（キャッシュヒット時は即時再生）
+        async for category, chunk in stream_profile_advice(profile):
+            if chunk:
+                event_name = ADVICE_PROMPTS[category]["event_name"]
+                data = json.dumps({"delta": chunk}, ensure_ascii=False)
+                yield f"event: {event_name}\ndata: {data}\n\n"
 
         # Send done event
         yield f"event: done\ndata: {json.dumps({'status': 'completed'})}\n\n"
         logger.info(f"AI advice generation completed for session {session_id}")
 
+    except LLMQueueFullError as e:
+        logger.warning(f"AI advice rejected for session {session_id}: queue full")
+        data = json.dumps({"error": e.detail, "code": "BUSY", "retry_after": e.retry_after}, ensure_ascii=False)
+        yield f"event: error\ndata: {data}\n\n"
     except Exception as e:
         logger.error(f"Error generating AI advice: {e}")
         yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
@@ -239,3 +218,78 @@ async def stream_simulation_result(
             "X-Accel-Buffering": "no",
         },
     )
+
+
+async def _get_story_status(db: AsyncSession, session_id: int) -> Optional[StoreStoryStatusResponse]:
+    """ジョブがあればその状態を、なければ（期限切れ・再起動後）DBの保存内容を返す"""
+    job = get_story_job(session_id)
+    if job is not None:
+        return StoreStoryStatusResponse(
+            session_id=session_id, status=job.status, store_story_text=job.text
+        )
+
+    result = await db.execute(
+        select(SimpleSimulationResult.store_story_text).where(
+            SimpleSimulationResult.session_id == session_id
+        )
+    )
+    row = result.first()
+    if row is None:
+        return None
+    return StoreStoryStatusResponse(
+        session_id=session_id, status=STORY_READY, store_story_text=row[0] or ""
+    )
+
+
+@router.get("/story", response_model=StoreStoryStatusResponse)
+async def get_store_story(
+    session_id: int = Query(..., description="Simulation session ID"),
+    db: AsyncSession = Depends(get_session),
+) -> StoreStoryStatusResponse:
+    """Poll the background store-story generation for a session."""
+    story = await _get_story_status(db, session_id)
+    if story is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Simulation session not found"
+        )
+    return story
+
+
+async def _story_event_stream(session_id: int, db: AsyncSession) -> AsyncGenerator[str, None]:
+    job = await wait_for_story(session_id)
+    if job is not None:
+        story = StoreStoryStatusResponse(
+            session_id=session_id, status=job.status, store_story_text=job.text
+        )
+    else:
+        story = await _get_story_status(db, session_id)
+    if story is None:
+        yield f"event: error\ndata: {json.dumps({'error': 'Session not found'})}\n\n"
+        return
+
+    yield f"event: story\ndata: {story.model_dump_json()}\n\n"
+    yield f"event: done\ndata: {json.dumps({'status': 'completed'})}\n\n"
+
+
+@router.get("/story-stream")
+async def stream_store_story(
+    session_id: int = Query(..., description="Simulation session ID"),
+    db: AsyncSession = Depends(get_session),
+) -> StreamingResponse:
+    """
+    Wait for the background store story and deliver it using Server-Sent Events.
+
+    Events:
+    - story: {session_id, status, store_story_text} once generation finishes
+    - done: Completion signal
+    - error: Error message
+    """
+    return StreamingResponse(
+        _story_event_stream(session_id, db),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        },
+    )
@@ -1,5 +1,5 @@
 """
-マインドマップのnodeId定義
+質問カード8軸の定義（マインドマップのnodeId・質問カードAPI /api/{api_path}/* の共通レジストリ）
 既存の質問定義（*_questions.py）と完全一致させる
 """
 from __future__ import annotations
@@ -14,46 +14,119 @@ from app.config.marketing_questions import MARKETING_QUESTIONS
 from app.config.menu_questions import MENU_QUESTIONS
 
 
-# 軸コード → 質問定義 / 表示名 / Answerテーブル名
+# 軸コード → 質問定義 / 表示名 / APIのパス / チャット・サマリーのプロンプト / Answerテーブル名
+# summary_focus はサマリー生成プロンプトの【重要】の先頭に加える指示（なければ None）
 AXIS_CONFIG = {
     "concept": {
         "name": "コンセプト",
         "questions": CONCEPT_QUESTIONS,
+        "api_path": "concept",
+        "chat_prompt": (
+            "あなたは飲食店開業を支援するコンセプトメイカーのコーチです。"
+            "ユーザーと対話しながら、コンセプトを深掘りしていきます。"
+            "親しみやすく、具体的な質問を投げかけて、ユーザーの考えを引き出してください。"
+            "回答は簡潔に、1〜2文程度で返してください。"
+        ),
+        "summary_role": "コンセプトメイカー",
+        "summary_focus": None,
         "answer_table": "concept_answers",
     },
     "revenue_forecast": {
         "name": "収支予測",
         "questions": REVENUE_FORECAST_QUESTIONS,
+        "api_path": "revenue-forecast",
+        "chat_prompt": (
+            "あなたは飲食店開業を支援する収支予測の専門家です。"
+            "ユーザーと対話しながら、収支予測の各項目を確定していきます。"
+            "数値入力や選択肢の提案、業界平均との比較など、具体的で実用的なアドバイスを提供してください。"
+            "回答は簡潔に、1〜2文程度で返してください。"
+        ),
+        "summary_role": "収支予測の専門家",
+        "summary_focus": "・決定した数値や選択肢を明確に記載してください。",
         "answer_table": "revenue_forecast_answers",
     },
     "funds": {
         "name": "資金計画",
         "questions": FUNDING_PLAN_QUESTIONS,
+        "api_path": "funding-plan",
+        "chat_prompt": (
+            "あなたは飲食店開業を支援する資金計画の専門家です。"
+            "ユーザーと対話しながら、資金計画の各項目を確定していきます。"
+            "数値入力や選択肢の提案、融資制度の説明など、具体的で実用的なアドバイスを提供してください。"
+            "回答は簡潔に、1〜2文程度で返してください。"
+        ),
+        "summary_role": "資金計画の専門家",
+        "summary_focus": "・決定した数値や選択肢を明確に記載してください。",
         "answer_table": "funding_plan_answers",
     },
     "operation": {
         "name": "オペレーション",
         "questions": OPERATION_QUESTIONS,
+        "api_path": "operation",
+        "chat_prompt": (
+            "あなたは飲食店開業を支援するオペレーションの専門家です。"
+            "ユーザーと対話しながら、オペレーションの各項目を確定していきます。"
+            "サービスフロー、人員配置、効率化の提案など、具体的で実用的なアドバイスを提供してください。"
+            "回答は簡潔に、1〜2文程度で返してください。"
+        ),
+        "summary_role": "オペレーションの専門家",
+        "summary_focus": "・決定した内容や選択肢を明確に記載してください。",
         "answer_table": "operation_answers",
     },
     "location": {
         "name": "立地",
         "questions": LOCATION_QUESTIONS,
+        "api_path": "location",
+        "chat_prompt": (
+            "あなたは飲食店開業を支援する立地選定の専門家です。"
+            "ユーザーと対話しながら、立地選定の各項目を確定していきます。"
+            "エリア分析、競合調査、リスク評価など、具体的で実用的なアドバイスを提供してください。"
+            "回答は簡潔に、1〜2文程度で返してください。"
+        ),
+        "summary_role": "立地選定の専門家",
+        "summary_focus": "・決定した内容や選択肢を明確に記載してください。",
         "answer_table": "location_answers",
     },
     "interior_exterior": {
         "name": "内装外装",
         "questions": INTERIOR_EXTERIOR_QUESTIONS,
+        "api_path": "interior-exterior",
+        "chat_prompt": (
+            "あなたは飲食店開業を支援する内装外装デザインの専門家です。"
+            "ユーザーと対話しながら、内装外装の各項目を確定していきます。"
+            "デザインテーマ、素材選び、予算配分など、具体的で実用的なアドバイスを提供してください。"
+            "回答は簡潔に、1〜2文程度で返してください。"
+        ),
+        "summary_role": "内装外装デザインの専門家",
+        "summary_focus": "・決定した内容や選択肢を明確に記載してください。",
         "answer_table": "interior_exterior_answers",
     },
     "marketing": {
         "name": "販促",
         "questions": MARKETING_QUESTIONS,
+        "api_path": "marketing",
+        "chat_prompt": (
+            "あなたは飲食店開業を支援する販促・マーケティングの専門家です。"
+            "ユーザーと対話しながら、販促の各項目を確定していきます。"
+            "SNS運用、MEO対策、キャンペーン企画など、具体的で実用的なアドバイスを提供してください。"
+            "回答は簡潔に、1〜2文程度で返してください。"
+        ),
+        "summary_role": "販促・マーケティングの専門家",
+        "summary_focus": "・決定した内容や選択肢を明確に記載してください。",
         "answer_table": "marketing_answers",
     },
     "menu": {
         "name": "メニュー",
         "questions": MENU_QUESTIONS,
+        "api_path": "menu",
+        "chat_prompt": (
+            "あなたは飲食店開業を支援するメニュー開発の専門家です。"
+            "ユーザーと対話しながら、メニューの各項目を確定していきます。"
+            "看板メニュー選定、原価率設定、調理効率など、具体的で実用的なアドバイスを提供してください。"
+            "回答は簡潔に、1〜2文程度で返してください。"
+        ),
+        "summary_role": "メニュー開発の専門家",
+        "summary_focus": "・決定した内容や選択肢を明確に記載してください。",
         "answer_table": "menu_answers",
     },
 }
@@ -17,6 +17,9 @@ class Settings(BaseSettings):
     db_port: int = 3306
     db_name: str = "ksuns_db"
     ssl_ca_path: Optional[str] = None
+    # 参照系（ダッシュボード等のGET）用のリードレプリカ。空の場合はプライマリを使う
+    db_read_host: str = ""
+    db_read_port: Optional[int] = None
 
     # JWT
     jwt_secret: str = ""
@@ -45,6 +48,71 @@ class Settings(BaseSettings):
     azure_openai_deployment: str = ""
     azure_openai_api_version: str = "2024-12-01-preview"
 
+    # LLM scheduler (同時実行数の上限と待ち行列)
+    llm_max_concurrency: int = 8
+    llm_max_concurrency_per_deployment: int = 6
+    llm_max_queue: int = 32
+    llm_queue_timeout_sec: float = 20.0
+    llm_retry_after_sec: int = 5
+
+    # LLM response cache ("none" / "memory" / "sqlite")
+    llm_cache_backend: str = "memory"
+    llm_cache_ttl_sec: int = 3600
+    llm_cache_max_entries: int = 1024
+    llm_cache_path: str = ".cache/llm_responses.sqlite3"
+
+    # Simple simulation AI advice
+    # mode: "parallel"（5カテゴリを個別に並行生成） / "combined"（1回の呼び出しで5項目を生成）
+    simulation_advice_mode: str = "parallel"
+    simulation_advice_concurrency: int = 5
+
+    # Simple simulation batch submission
+    # 提携先からの一括取り込み用（X-Partner-Token ヘッダーで認証。空の場合は一括送信APIを無効化）
+    simulation_batch_partner_token: str = ""
+    simulation_batch_max_items: int = 500
+    simulation_batch_story_concurrency: int = 4
+
+    # Simple simulation profile cache (店舗プロファイル単位のAI生成文キャッシュ)
+    profile_cache_backend: str = "memory"
+    profile_cache_ttl_sec: int = 7 * 24 * 3600
+    profile_cache_max_entries: int = 4096
+    profile_cache_variants: int = 3
+    profile_cache_path: str = ".cache/profile_cache.sqlite3"
+
+    # Simple simulation what-if grid (1リクエストで評価できるシナリオ数の上限)
+    forecast_grid_max_scenarios: int = 250_000
+
+    # Monte Carlo risk simulation (0 で結果画面へのリスク評価を無効化)
+    forecast_risk_trials: int = 20_000
+    forecast_risk_seed: int = 42
+
+    # Axis card chat context (プロンプトのトークン予算)
+    # 直近 chat_context_keep_turns 往復はそのまま送り、それより古いやり取りはカードごとの要約に置き換える
+    # 要約は要約されていないやり取りが chat_summary_batch_turns 往復たまったらバックグラウンドで更新
+    chat_context_max_tokens: int = 6000
+    chat_context_keep_turns: int = 6
+    chat_summary_batch_turns: int = 2
+    chat_summary_max_tokens: int = 600
+    # o200k_base の BPE ファイル。ビルド時に download_tokenizer.py で取得しておく（実行時はダウンロードしない）
+    chat_tokenizer_path: str = ".cache/tiktoken/o200k_base.tiktoken"
+
+    # Master data cache (planning_axes / axis_steps)
+    # 指定秒ごとに件数・最大IDの目印を確認し、変化していれば再読み込み（0 で確認しない）
+    master_data_check_interval_sec: int = 300
+
+    # Admin API (X-Admin-Token ヘッダーで認証。空の場合は管理APIを無効化)
+    admin_api_token: str = ""
+
+    # Logging
+    # log_module_levels: "app.api.dashboard=DEBUG,sqlalchemy.engine=WARNING" 形式
+    # DEBUG ログは log_debug_sample_rate の割合で間引き、ロガーごとに毎秒 log_debug_max_per_sec 件まで
+    # log_debug_user_ids のユーザー（管理APIで実行中に追加可）は全 app.* ロガーの DEBUG を出力
+    log_level: str = "INFO"
+    log_module_levels: str = ""
+    log_debug_sample_rate: float = 1.0
+    log_debug_max_per_sec: float = 20.0
+    log_debug_user_ids: str = ""
+
     # CORS (accepts comma-separated string or list)
     cors_origins: Union[str, List[str]] = ""
 
@@ -62,9 +130,18 @@ class Settings(BaseSettings):
 
     @property
     def database_url(self) -> str:
+        return self._mysql_url(self.db_host, self.db_port)
+
+    @property
+    def database_read_url(self) -> str:
+        if not self.db_read_host:
+            return self.database_url
+        return self._mysql_url(self.db_read_host, self.db_read_port or self.db_port)
+
+    def _mysql_url(self, host: str, port: int) -> str:
         base_url = (
             f"mysql+asyncmy://{self.db_user}:{self.db_password}"
-            f"@{self.db_host}:{self.db_port}/{self.db_name}"
+            f"@{host}:{port}/{self.db_name}"
         )
         # Add SSL parameter for Azure MySQL
         if self.ssl_ca_path:
@@ -1,9 +1,10 @@
 import ssl
 
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 
 from app.core.config import get_settings
+from app.core.user_version import VersionedSession
 
 settings = get_settings()
 
@@ -23,9 +24,40 @@ engine = create_async_engine(
     connect_args=connect_args,
 )
 
+# リードレプリカ未設定時はプライマリのエンジンを共有する
+if settings.db_read_host:
+    read_engine = create_async_engine(
+        settings.database_read_url,
+        echo=False,
+        pool_pre_ping=True,
+        pool_recycle=3600,
+        connect_args=connect_args,
+    )
+else:
+    read_engine = engine
+
+# 書き込みのたびにユーザーの変更カウンタを進める（ETag の判定用）
 AsyncSessionLocal = sessionmaker(
     bind=engine,
     class_=AsyncSession,
+    sync_session_class=VersionedSession,
+    expire_on_commit=False,
+)
+
+
+class ReadOnlySession(Session):
+    """参照専用セッション（ORM経由の書き込みをflush時点で拒否する）"""
+
+    def flush(self, objects=None) -> None:
+        if self.new or self.dirty or self.deleted:
+            raise RuntimeError("Write attempted on a read-only session")
+        super().flush(objects)
+
+
+AsyncReadSessionLocal = sessionmaker(
+    bind=read_engine,
+    class_=AsyncSession,
+    sync_session_class=ReadOnlySession,
     expire_on_commit=False,
 )
 
@@ -33,3 +65,9 @@ AsyncSessionLocal = sessionmaker(
 async def get_session() -> AsyncSession:
     async with AsyncSessionLocal() as session:
         yield session
+
+
+async def get_read_session() -> AsyncSession:
+    """参照系エンドポイント用（リードレプリカ設定時はレプリカに接続）"""
+    async with AsyncReadSessionLocal() as session:
+        yield session
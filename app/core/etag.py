@@ -0,0 +1,65 @@
+"""ETag / If-None-Match for per-user read endpoints.
+
+The ETag is derived from the user's change counter
+(``app.core.user_version``), so checking it costs one primary-key lookup.
+It also carries the digest of the cached master data: axis names and steps
+are part of the responses but are not user data, so a master-data reload
+must change the ETag without touching every user's counter.
+On a match the endpoint returns 304 before querying its data or building
+the response model.
+
+Usage in an endpoint::
+
+    etag = await user_etag(session, current_user.id)
+    if cached := not_modified(request, response, etag):
+        return cached
+"""
+from __future__ import annotations
+
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.user_version import get_user_version
+from app.services.master_data import master_data
+
+# レスポンス形式を変えたら上げる（古い ETag を一斉に無効化する）
+ETAG_FORMAT_VERSION = "3"
+CACHE_CONTROL = "private, no-cache"
+
+
+async def user_etag(db: AsyncSession, user_id: int, *variant: object) -> Optional[str]:
+    """ユーザーの変更カウンタから ETag を作る（variant にはクエリ条件など応答を変える値を渡す）"""
+    version = await get_user_version(db, user_id)
+    if version is None:
+        return None
+    tag = f"{user_id}.{version}.{master_data.digest()}"
+    if variant:
+        digest = hashlib.sha1(repr(variant).encode("utf-8")).hexdigest()[:12]
+        tag = f"{tag}.{digest}"
+    return f'W/"{ETAG_FORMAT_VERSION}.{tag}"'
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # 弱い比較（W/ の有無は区別しない）
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+def not_modified(request: Request, response: Response, etag: Optional[str]) -> Optional[Response]:
+    """If-None-Match が一致すれば 304 を返す。一致しなければ通常のレスポンスに ETag を付ける"""
+    if etag is None:
+        return None
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -1,8 +1,194 @@
+"""Non-blocking, leveled logging with sampled and per-user debug output.
+
+Handlers that write to stdout run on a ``QueueListener`` thread. Request
+handlers only enqueue records through a ``QueueHandler``, so logging never
+blocks the event loop on I/O.
+
+Levels are set per module with ``LOG_MODULE_LEVELS``. With
+``LOG_LEVEL=DEBUG`` every DEBUG record is written as before. Otherwise
+DEBUG records go through ``DebugGate``:
+
+- Modules configured at DEBUG are sampled (``log_debug_sample_rate``) and
+  rate-limited per logger (``log_debug_max_per_sec``).
+- Requests of users in the debug set (``log_debug_user_ids``, or added at
+  runtime through ``/admin/logging``) emit every ``app.*`` DEBUG record,
+  still rate-limited. ``get_current_user`` binds ``current_user_id`` for
+  the request.
+
+Adding a debug user lowers the ``app`` logger to DEBUG for the duration;
+the gate drops the extra records for everyone else.
+"""
+from __future__ import annotations
+
+import atexit
 import logging
+import queue
+import random
+import threading
+import time
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from app.core.config import get_settings
+
+LOG_FORMAT = "%(asctime)s [%(levelname)s] %(name)s - %(message)s"
+APP_LOGGER = "app"
+
+# リクエスト中のログインユーザー（ユーザー単位のDEBUG出力の判定に使う）
+current_user_id: ContextVar[Optional[int]] = ContextVar("current_user_id", default=None)
+
+
+def parse_module_levels(value: str) -> dict[str, int]:
+    """"app.api.dashboard=DEBUG,sqlalchemy.engine=WARNING" → {ロガー名: レベル}"""
+    levels: dict[str, int] = {}
+    for item in value.split(","):
+        name, sep, level = item.partition("=")
+        if not sep or not name.strip():
+            continue
+        level_no = logging.getLevelName(level.strip().upper())
+        if isinstance(level_no, int):
+            levels[name.strip()] = level_no
+    return levels
+
+
+def _parse_user_ids(value: str) -> set[int]:
+    return {int(v) for v in value.split(",") if v.strip().isdigit()}
+
+
+class DebugGate(logging.Filter):
+    """DEBUG レコードの間引き・流量制限・ユーザー単位の出力判定"""
+
+    def __init__(self, sample_rate: float = 1.0, max_per_sec: float = 20.0) -> None:
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.max_per_sec = max_per_sec
+        self.module_levels: dict[str, int] = {}
+        self.debug_user_ids: set[int] = set()
+        self.dropped = 0
+        self._windows: dict[str, tuple[int, int]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        user_id = current_user_id.get()
+        if user_id is not None and user_id in self.debug_user_ids:
+            return self._within_rate(record.name)
+        if not self._module_debug(record.name):
+            # LOG_LEVEL=DEBUG（ルートが DEBUG）なら全体の DEBUG 出力なので間引かずに通す
+            if self._root_debug():
+                return True
+            # ユーザー単位のDEBUGのために app ロガーを下げている間、他ユーザーの分は捨てる
+            return self._drop()
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return self._drop()
+        return self._within_rate(record.name)
+
+    @staticmethod
+    def _root_debug() -> bool:
+        return logging.getLogger().getEffectiveLevel() <= logging.DEBUG
+
+    def _module_debug(self, name: str) -> bool:
+        # 最も近い親ロガーの設定を参照する
+        while name:
+            if name in self.module_levels:
+                return self.module_levels[name] <= logging.DEBUG
+            name = name.rpartition(".")[0]
+        return False
+
+    def _within_rate(self, name: str) -> bool:
+        if self.max_per_sec <= 0:
+            return True
+        second = int(time.monotonic())
+        with self._lock:
+            window, count = self._windows.get(name, (second, 0))
+            if window != second:
+                window, count = second, 0
+            if count >= self.max_per_sec:
+                self._windows[name] = (window, count)
+                return self._drop()
+            self._windows[name] = (window, count + 1)
+        return True
+
+    def _drop(self) -> bool:
+        self.dropped += 1
+        return False
+
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+debug_gate = DebugGate()
 
 
 def setup_logging() -> None:
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s [%(levelname)s] %(name)s - %(message)s",
-    )
+    """ルートロガーに QueueHandler を付け、標準出力への書き込みは別スレッドで行う（複数回呼んでも1回だけ）"""
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        return
+    settings = get_settings()
+
+    debug_gate.sample_rate = settings.log_debug_sample_rate
+    debug_gate.max_per_sec = settings.log_debug_max_per_sec
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    _queue_handler = QueueHandler(log_queue)
+    _queue_handler.addFilter(debug_gate)
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    root = logging.getLogger()
+    root.addHandler(_queue_handler)
+    root.setLevel(logging.getLevelName(settings.log_level.upper()))
+
+    for name, level in parse_module_levels(settings.log_module_levels).items():
+        set_module_level(name, level)
+    for user_id in _parse_user_ids(settings.log_debug_user_ids):
+        enable_user_debug(user_id)
+
+
+def set_module_level(name: str, level: int | str) -> None:
+    """ロガー単位のレベルを実行中に変更する"""
+    if isinstance(level, str):
+        level_no = logging.getLevelName(level.upper())
+        if not isinstance(level_no, int):
+            raise ValueError(f"unknown log level: {level}")
+        level = level_no
+    debug_gate.module_levels[name] = level
+    logging.getLogger(name).setLevel(level)
+    if name == APP_LOGGER:
+        _sync_app_level()
+
+
+def enable_user_debug(user_id: int) -> None:
+    debug_gate.debug_user_ids.add(user_id)
+    _sync_app_level()
+
+
+def disable_user_debug(user_id: int) -> None:
+    debug_gate.debug_user_ids.discard(user_id)
+    _sync_app_level()
+
+
+def _sync_app_level() -> None:
+    # 対象ユーザーがいる間だけ app.* の DEBUG レコードを生成させる（絞り込みは DebugGate）
+    app_logger = logging.getLogger(APP_LOGGER)
+    if debug_gate.debug_user_ids:
+        app_logger.setLevel(logging.DEBUG)
+    else:
+        app_logger.setLevel(debug_gate.module_levels.get(APP_LOGGER, logging.NOTSET))
+
+
+def logging_snapshot() -> dict:
+    return {
+        "root_level": logging.getLevelName(logging.getLogger().level),
+        "module_levels": {name: logging.getLevelName(level) for name, level in debug_gate.module_levels.items()},
+        "debug_user_ids": sorted(debug_gate.debug_user_ids),
+        "debug_sample_rate": debug_gate.sample_rate,
+        "debug_max_per_sec": debug_gate.max_per_sec,
+        "debug_dropped": debug_gate.dropped,
+    }
@@ -0,0 +1,56 @@
+"""One-time tickets for SSE endpoints.
+
+``EventSource`` cannot send an ``Authorization`` header, so SSE endpoints
+are opened in two steps. A Bearer-authenticated POST issues a short-lived
+ticket, and the stream is then opened with ``?ticket=...``. A ticket is
+bound to a scope (e.g. the mindmap node id or the axis card) and is
+consumed on first use. It can carry a payload, such as the chat message
+the stream should answer, because the GET carries no body.
+
+Tickets live in process memory, like the store story jobs. They only need
+to survive the few seconds between the POST and the GET.
+"""
+from __future__ import annotations
+
+import secrets
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+
+class TicketStore:
+    """スコープ付きワンタイムticketの保管（メモリ）"""
+
+    def __init__(self, ttl_seconds: int = 60):
+        self.ttl_seconds = ttl_seconds
+        self._tickets: dict[str, dict] = {}
+
+    def _cleanup_expired(self) -> None:
+        """期限切れticketを削除"""
+        now = datetime.utcnow()
+        expired = [k for k, v in self._tickets.items() if v["expires_at"] < now]
+        for k in expired:
+            del self._tickets[k]
+
+    def issue(self, user_id: int, scope: str, payload: Any = None) -> str:
+        """ワンタイムticketを発行"""
+        self._cleanup_expired()
+        ticket = secrets.token_urlsafe(32)
+        self._tickets[ticket] = {
+            "user_id": user_id,
+            "scope": scope,
+            "payload": payload,
+            "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl_seconds),
+        }
+        return ticket
+
+    def redeem(self, ticket: str, scope: str) -> Optional[dict]:
+        """ticketを検証して {"user_id", "payload"} を返す（検証後は削除 = ワンタイム。無効なら None）"""
+        self._cleanup_expired()
+        data = self._tickets.pop(ticket, None)
+        if not data:
+            return None
+        if data["expires_at"] < datetime.utcnow():
+            return None
+        if data["scope"] != scope:
+            return None
+        return {"user_id": data["user_id"], "payload": data["payload"]}
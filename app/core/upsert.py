@@ -0,0 +1,97 @@
+"""Dialect-aware INSERT ... ON CONFLICT / ON DUPLICATE KEY UPDATE.
+
+Production runs on MySQL (``ON DUPLICATE KEY UPDATE``); tests run on SQLite
+(``ON CONFLICT ... DO UPDATE``). ``upsert_stmt`` builds the right statement
+for the session's dialect so callers can replace select-then-update or
+delete-then-insert sequences with one round trip.
+
+``upsert_returning`` also returns the resulting row. SQLite and
+PostgreSQL use ``RETURNING``, so the row comes back in the same
+statement. MySQL has no ``INSERT ... RETURNING``. There the upsert sets
+``id = LAST_INSERT_ID(id)``, which reports the row id for both the
+inserted and the updated case, and the row is re-read by primary key.
+
+ORM objects already loaded in the session are not refreshed by these
+statements, and the ``VersionedSession`` flush hook does not see them.
+Callers writing user data call ``bump_user_versions`` themselves.
+"""
+from __future__ import annotations
+
+from typing import Any, Iterable, Optional, Sequence
+
+from sqlalchemy import Row, func, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.dml import Insert
+
+
+def dialect_name(db: AsyncSession) -> str:
+    return db.get_bind().dialect.name
+
+
+def upsert_stmt(
+    db: AsyncSession,
+    model: Any,
+    rows: dict | Sequence[dict],
+    conflict_columns: Iterable[str],
+    update_columns: Iterable[str],
+    update_exprs: Optional[dict[str, Any]] = None,
+) -> Insert:
+    """``rows`` を挿入し、一意キー（conflict_columns）が衝突した行は update_columns を上書きする
+
+    MySQL は衝突判定に任意の UNIQUE キーを使うため conflict_columns は SQLite / PostgreSQL でのみ参照する
+    update_exprs には既存行を参照する式（例: ``{"version": table.c.version + 1}``）を渡せる
+    """
+    table = model.__table__
+    name = dialect_name(db)
+    update_columns = list(update_columns)
+    update_exprs = update_exprs or {}
+
+    if name == "mysql":
+        stmt = mysql.insert(table).values(rows)
+        return stmt.on_duplicate_key_update(
+            {**{c: stmt.inserted[c] for c in update_columns}, **update_exprs}
+        )
+
+    if name in ("sqlite", "postgresql"):
+        insert = sqlite.insert if name == "sqlite" else postgresql.insert
+        stmt = insert(table).values(rows)
+        return stmt.on_conflict_do_update(
+            index_elements=list(conflict_columns),
+            set_={**{c: stmt.excluded[c] for c in update_columns}, **update_exprs},
+        )
+
+    raise NotImplementedError(f"upsert is not supported for dialect: {name}")
+
+
+async def upsert_returning(
+    db: AsyncSession,
+    model: Any,
+    row: dict,
+    conflict_columns: Iterable[str],
+    update_columns: Iterable[str],
+    update_exprs: Optional[dict[str, Any]] = None,
+    columns: Optional[Sequence[Any]] = None,
+) -> Row:
+    """1行を upsert して結果の行（columns。省略時は全列）を返す
+
+    update_columns が空の場合も衝突時は既存行を返す（一意キーを同じ値で上書きするだけで内容は変えない）
+    """
+    table = model.__table__
+    conflict_columns = list(conflict_columns)
+    update_columns = list(update_columns) or conflict_columns[:1]
+    columns = list(columns) if columns is not None else list(table.c)
+
+    if dialect_name(db) == "mysql":
+        pk = table.c.id
+        stmt = upsert_stmt(
+            db, model, row, conflict_columns, update_columns,
+            {**(update_exprs or {}), "id": func.last_insert_id(pk)},
+        )
+        result = await db.execute(stmt)
+        selected = await db.execute(select(*columns).where(pk == result.lastrowid))
+        return selected.one()
+
+    stmt = upsert_stmt(db, model, row, conflict_columns, update_columns, update_exprs)
+    result = await db.execute(stmt.returning(*columns))
+    return result.one()
@@ -0,0 +1,98 @@
+"""Per-user change counter for conditional GETs.
+
+Every flush that inserts, modifies or deletes a row carrying a ``user_id``
+(or the ``users`` row itself) bumps that user's row in ``user_data_versions`` in the same transaction.
+Read endpoints compare the counter against ``If-None-Match``
+(``app.core.etag``) and skip building unchanged responses.
+
+A counter is used rather than ``MAX(updated_at)`` because MySQL
+``DATETIME`` has second precision: a write and a poll within the same
+second would otherwise produce the same ETag.
+
+The flush hook only sees ORM writes. Core ``insert``/``update`` statements
+on user data call ``bump_user_versions`` explicitly.
+"""
+from __future__ import annotations
+
+import logging
+from datetime import datetime
+from itertools import chain
+from typing import Iterable, Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.upsert import upsert_stmt
+from app.models.user import User
+from app.models.user_data_version import UserDataVersion
+
+logger = logging.getLogger(__name__)
+
+
+class VersionedSession(Session):
+    """書き込みのあったユーザーの user_data_versions を flush と同じトランザクションで進めるセッション"""
+
+
+def _bump_stmt(db, user_ids: Iterable[int]):
+    now = datetime.utcnow()
+    table = UserDataVersion.__table__
+    return upsert_stmt(
+        db,
+        UserDataVersion,
+        # 複数ユーザーを更新する場合もロック順を揃える
+        [{"user_id": user_id, "version": 1, "updated_at": now} for user_id in sorted(user_ids)],
+        conflict_columns=["user_id"],
+        update_columns=["updated_at"],
+        update_exprs={"version": table.c.version + 1},
+    )
+
+
+def _changed_user_ids(session: Session) -> set[int]:
+    user_ids = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, UserDataVersion):
+            continue
+        if obj in session.dirty and not session.is_modified(obj, include_collections=False):
+            continue
+        # users の行（メールアドレス・表示名など）も応答に含まれるので自分自身の変更として数える
+        user_id = obj.id if isinstance(obj, User) else getattr(obj, "user_id", None)
+        if isinstance(user_id, int):
+            user_ids.add(user_id)
+    return user_ids
+
+
+@event.listens_for(VersionedSession, "after_flush")
+def _bump_after_flush(session: Session, flush_context) -> None:
+    user_ids = _changed_user_ids(session)
+    if not user_ids:
+        return
+    try:
+        session.connection().execute(_bump_stmt(session, user_ids))
+    except SQLAlchemyError as e:
+        # テーブル未作成でも書き込み自体は止めない（ETag が返らなくなるだけ）
+        logger.warning(f"user_data_versions の更新に失敗しました（create_all_tables.py を実行してください）: {e}")
+
+
+async def bump_user_versions(db: AsyncSession, user_ids: Iterable[int]) -> None:
+    """Core の insert/update でユーザーのデータを書き換えた場合に呼ぶ（commit は呼び出し側）"""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+    try:
+        await db.execute(_bump_stmt(db, user_ids))
+    except SQLAlchemyError as e:
+        logger.warning(f"user_data_versions の更新に失敗しました: {e}")
+
+
+async def get_user_version(db: AsyncSession, user_id: int) -> Optional[int]:
+    """現在のバージョン（書き込みがまだなければ 0。テーブルがなければ None）"""
+    try:
+        result = await db.execute(
+            select(UserDataVersion.version).where(UserDataVersion.user_id == user_id)
+        )
+    except SQLAlchemyError as e:
+        logger.warning(f"user_data_versions の取得に失敗しました: {e}")
+        return None
+    return result.scalar_one_or_none() or 0
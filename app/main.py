@@ -1,3 +1,6 @@
+import logging
+from contextlib import asynccontextmanager
+
 # ★★★ ここに2行追加してください ★★★
 from dotenv import load_dotenv
 load_dotenv()
@@ -6,18 +9,35 @@ load_dotenv()
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.api import auth, simulations_simple, dashboard, axes, qa, detail_questions, deep_questions, plans, concept, revenue_forecast, funding_plan, operation, location, interior_exterior, marketing, menu, report
+from app.api import auth, simulations_simple, dashboard, axes, qa, detail_questions, deep_questions, plans, axis_cards, report
 from app.core.config import get_settings
 from app.core.logging_config import setup_logging
+from app.services.chat_context import load_tokenizer
+from app.services.llm_cache import response_cache
+from app.services.llm_scheduler import llm_scheduler
+from app.services.llm_singleflight import flight_snapshot
+from app.services.master_data import master_data
+from app.services.profile_cache import profile_cache
 
 # ...他の import 文の並びに追加
 from app.api import free_chat  # ★これを追加
 from app.api import mindmap  # マインドマップAPI
+from app.api import admin  # 管理API（マスタデータ再読み込み）
+from app.api import bootstrap  # 初期表示データの一括取得API
 
 setup_logging()
+logger = logging.getLogger(__name__)
 settings = get_settings()
 
-app = FastAPI(title=settings.app_name)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 初回の /chat でトークナイザを読み込むとイベントループが止まるため起動時に読む（失敗したら起動しない）
+    await load_tokenizer()
+    yield
+
+
+app = FastAPI(title=settings.app_name, lifespan=lifespan)
 
 # CORS設定: 環境変数が設定されていない場合は localhost:3000 を許可
 # 空のリストの場合はデフォルト値を使用
@@ -31,7 +51,7 @@ else:
     if "http://127.0.0.1:3000" not in cors_origins:
         cors_origins.append("http://127.0.0.1:3000")
 
-print(f"🔧 CORS設定: {cors_origins}")
+logger.info(f"🔧 CORS設定: {cors_origins}")
 
 app.add_middleware(
     CORSMiddleware,
@@ -48,6 +68,18 @@ async def health_check() -> dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/health/llm", tags=["health"])
+async def llm_health() -> dict:
+    """LLMスケジューラ・各キャッシュ・リクエスト集約のメトリクス"""
+    return {
+        "scheduler": llm_scheduler.snapshot(),
+        "response_cache": response_cache.snapshot(),
+        "single_flight": flight_snapshot(),
+        "profile_cache": profile_cache.snapshot(),
+        "master_data": master_data.snapshot(),
+    }
+
+
 # Routers
 app.include_router(auth.router)
 app.include_router(simulations_simple.router)
@@ -58,13 +90,9 @@ app.include_router(detail_questions.router)
 app.include_router(deep_questions.router)
 app.include_router(plans.router) # からちゃん追加部分
 app.include_router(free_chat.router, prefix="/api", tags=["chat"]) # ★はまさん追加部分
-app.include_router(concept.router) # コンセプト軸の質問カードAPI
-app.include_router(revenue_forecast.router) # 収支予測軸の質問カードAPI
-app.include_router(funding_plan.router) # 資金計画軸の質問カードAPI
-app.include_router(operation.router) # オペレーション軸の質問カードAPI
-app.include_router(location.router) # 立地軸の質問カードAPI
-app.include_router(interior_exterior.router) # 内装外装軸の質問カードAPI
-app.include_router(marketing.router) # 販促軸の質問カードAPI
-app.include_router(menu.router) # メニュー軸の質問カードAPI
+for axis_router in axis_cards.routers:
+    app.include_router(axis_router) # 質問カードAPI（8軸共通。/api/{api_path}/*）
 app.include_router(report.router) # 開業プラン出力API
-app.include_router(mindmap.router) # マインドマップAPI
\ No newline at end of file
+app.include_router(mindmap.router) # マインドマップAPI
+app.include_router(admin.router) # 管理API
+app.include_router(bootstrap.router) # 初期表示データの一括取得API
\ No newline at end of file
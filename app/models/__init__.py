@@ -22,6 +22,10 @@ from app.models.simple_simulation import (
 )
 from app.models.summaries import Summary
 from app.models.user import User
+from app.models.user_axis_progress import UserAxisProgress
+from app.models.user_data_version import UserDataVersion
+from app.models.card_chat_message import CardChatMessage
+from app.models.card_chat_summary import CardChatSummary
 
 __all__ = [
     "Base",
@@ -52,4 +56,8 @@ __all__ = [
     "InteriorExteriorAnswer",
     "MarketingAnswer",
     "MenuAnswer",
+    "UserAxisProgress",
+    "UserDataVersion",
+    "CardChatMessage",
+    "CardChatSummary",
 ]
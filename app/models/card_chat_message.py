@@ -0,0 +1,31 @@
+"""
+質問カードのチャットメッセージ（1メッセージ1行の追記のみのテーブル）
+"""
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Boolean, DateTime, ForeignKey, Index, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class CardChatMessage(Base):
+    """8軸の質問カード共通のチャットメッセージ（*_answers.chat_history の置き換え）"""
+
+    __tablename__ = "card_chat_messages"
+    __table_args__ = (
+        # カード単位の履歴取得・差分取得（id > last_message_id）用
+        Index("ix_card_chat_messages_card", "user_id", "axis_code", "card_id", "id"),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(
+        BigInteger, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    axis_code: Mapped[str] = mapped_column(String(64), nullable=False)
+    card_id: Mapped[str] = mapped_column(String(16), nullable=False)
+    role: Mapped[str] = mapped_column(String(16), nullable=False)
+    content: Mapped[str] = mapped_column(Text, nullable=False)
+    # ストリーミング中にクライアントが切断し、途中までの応答を保存した場合 True
+    truncated: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,32 @@
+"""
+質問カードの会話の要約（プロンプトのトークン予算を超える古いやり取りの置き換え）
+"""
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Integer, String, Text, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class CardChatSummary(Base):
+    """カードごとのローリング要約（covered_message_id までのメッセージを要約済み）"""
+
+    __tablename__ = "card_chat_summaries"
+    __table_args__ = (UniqueConstraint("user_id", "axis_code", "card_id"),)
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(
+        BigInteger, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    axis_code: Mapped[str] = mapped_column(String(64), nullable=False)
+    card_id: Mapped[str] = mapped_column(String(16), nullable=False)
+    summary: Mapped[str] = mapped_column(Text, nullable=False)
+    covered_message_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    summary_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+    )
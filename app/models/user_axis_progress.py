@@ -0,0 +1,32 @@
+"""
+ユーザー×軸ごとの質問カード進捗（*_answers から集計した値を書き込み時に保持する）
+"""
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Numeric, SmallInteger, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class UserAxisProgress(Base):
+    """軸ごとの回答・完了カード数とスコア"""
+
+    __tablename__ = "user_axis_progress"
+    __table_args__ = (UniqueConstraint("user_id", "axis_code"),)
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(
+        BigInteger, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    axis_code: Mapped[str] = mapped_column(String(64), nullable=False)
+    answered: Mapped[int] = mapped_column(SmallInteger, nullable=False, default=0)
+    completed: Mapped[int] = mapped_column(SmallInteger, nullable=False, default=0)
+    total: Mapped[int] = mapped_column(SmallInteger, nullable=False, default=0)
+    score: Mapped[float] = mapped_column(Numeric(3, 1), nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+    )
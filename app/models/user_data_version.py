@@ -0,0 +1,26 @@
+"""
+ユーザーごとのデータ変更カウンタ（ETag / 条件付きGETの判定に使う）
+"""
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class UserDataVersion(Base):
+    """ユーザーのデータが書き込まれるたびに version を1つ進める"""
+
+    __tablename__ = "user_data_versions"
+
+    user_id: Mapped[int] = mapped_column(
+        BigInteger, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True, autoincrement=False
+    )
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=1)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+    )
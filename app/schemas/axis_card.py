@@ -0,0 +1,70 @@
+"""
+質問カードAPI（8軸共通 /api/{api_path}/*）のスキーマ
+"""
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class ChatMessage(BaseModel):
+    """チャットメッセージ"""
+    role: str = Field(..., description="'user' または 'assistant'")
+    content: str = Field(..., description="メッセージ内容")
+    id: Optional[int] = Field(None, description="サーバーに保存済みのメッセージID")
+    truncated: bool = Field(False, description="ストリーミングが中断され途中までの応答の場合 True")
+
+
+class CardStatusResponse(BaseModel):
+    """カードの進捗ステータス"""
+    card_id: str
+    is_completed: bool
+    summary: Optional[str] = None
+    chat_history: Optional[List[ChatMessage]] = None
+
+
+class CardStatusListResponse(BaseModel):
+    """全カードの進捗ステータス一覧"""
+    statuses: List[CardStatusResponse]
+
+
+class CardChatRequest(BaseModel):
+    """チャット送信リクエスト"""
+    card_id: str = Field(..., description="カードID (例: '1-1')")
+    user_message: str = Field(..., description="ユーザーのメッセージ")
+    history: List[ChatMessage] = Field(
+        default_factory=list,
+        description="チャット履歴（旧クライアント用。履歴はサーバー側に保存されるため送信不要）",
+    )
+    last_message_id: Optional[int] = Field(
+        None,
+        description="クライアントが持っている最後のメッセージID（指定すると応答はそれより後の差分のみ。初回は0）",
+    )
+
+
+class CardChatResponse(BaseModel):
+    """チャット応答"""
+    assistant_message: str = Field(..., description="AIの応答")
+    history: Optional[List[ChatMessage]] = Field(
+        None, description="更新後の全履歴（last_message_id 未指定の場合のみ）"
+    )
+    messages: List[ChatMessage] = Field(default_factory=list, description="last_message_id より後のメッセージ")
+    last_message_id: Optional[int] = Field(None, description="保存済みの最後のメッセージID")
+
+
+class CardSummaryRequest(BaseModel):
+    """サマリー生成リクエスト"""
+    card_id: str = Field(..., description="カードID")
+    chat_history: List[ChatMessage] = Field(
+        default_factory=list, description="チャット履歴（省略時はサーバーに保存済みの履歴を使う）"
+    )
+
+
+class CardSummaryResponse(BaseModel):
+    """サマリー生成応答"""
+    summary: str = Field(..., description="生成されたサマリー")
+
+
+class ChatTicketResponse(BaseModel):
+    """チャットSSE接続用のワンタイムticket"""
+    ticket: str
+    expires_in: int
@@ -0,0 +1,60 @@
+from typing import Literal, Optional
+
+from pydantic import BaseModel, Field
+
+
+class CashflowOverrides(BaseModel):
+    """キャッシュフロー予測の前提（未指定は簡易シミュレーション結果からの既定値）"""
+    monthly_sales_target: Optional[float] = Field(default=None, ge=0)
+    cost_ratio: Optional[float] = Field(default=None, ge=0, le=100)
+    labor_cost_ratio: Optional[float] = Field(default=None, ge=0, le=100)
+    other_costs_ratio: Optional[float] = Field(default=None, ge=0, le=100)
+    monthly_rent: Optional[float] = Field(default=None, ge=0)
+    initial_investment: Optional[float] = Field(default=None, ge=0)
+    own_funds: Optional[float] = Field(default=None, ge=0)
+    loan_amount: Optional[float] = Field(default=None, ge=0)
+    annual_interest_rate: Optional[float] = Field(default=None, ge=0, le=30)
+    loan_term_months: Optional[int] = Field(default=None, ge=1, le=360)
+    repayment_method: Optional[Literal["equal_installment", "equal_principal"]] = None
+    grace_months: Optional[int] = Field(default=None, ge=0, le=60)
+    ramp_months: Optional[int] = Field(default=None, ge=0, le=36)
+    ramp_start_ratio: Optional[float] = Field(default=None, ge=0, le=1)
+    months: Optional[int] = Field(default=None, ge=1, le=120)
+
+
+class CashflowYear(BaseModel):
+    year: int
+    sales: int
+    operating_profit: int
+    debt_service: int
+    net_cashflow: int
+    ending_cash: int
+    ending_loan_balance: int
+
+
+class CashflowSummary(BaseModel):
+    opening_cash: int
+    first_profitable_month: Optional[int] = None
+    first_cash_positive_month: Optional[int] = None
+    min_cash: int
+    min_cash_month: int
+    ending_cash: int
+    ending_loan_balance: int
+    total_interest: int
+    monthly_debt_service: int
+    cash_shortfall: bool
+
+
+class CashflowResponse(BaseModel):
+    assumptions: dict
+    summary: CashflowSummary
+    yearly: list[CashflowYear]
+    # 月次の配列（sales / cogs / labor / rent / other_costs / operating_profit /
+    # interest / principal / net_cashflow / cumulative_cash / loan_balance）
+    monthly: Optional[dict[str, list[int]]] = None
+
+
+class DashboardCashflow(BaseModel):
+    """ダッシュボード表示用（月次配列なし）"""
+    summary: CashflowSummary
+    yearly: list[CashflowYear]
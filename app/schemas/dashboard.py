@@ -1,5 +1,7 @@
 from pydantic import BaseModel, Field
 
+from app.schemas.cashflow import DashboardCashflow
+
 
 class ConceptSummary(BaseModel):
     title: str
@@ -41,6 +43,8 @@ class DashboardResponse(BaseModel):
     owner_note: str = ""
     latest_store_story: str = ""
     user_email: str
+    # 36か月キャッシュフロー予測（簡易シミュレーション未実施なら None）
+    cashflow: DashboardCashflow | None = None
 
 
 class OwnerNoteRequest(BaseModel):
@@ -1,6 +1,6 @@
-from typing import List, Optional
+from typing import List, Literal, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 
 class AnswerItem(BaseModel):
@@ -29,6 +29,11 @@ class FinancialForecast(BaseModel):
     break_even_sales: Optional[int] = None  # 損益分岐売上
     funds_comment_category: str
     funds_comment_text: str
+    # モンテカルロ法によるリスク評価（任意）
+    profit_p10: Optional[int] = None  # 月次利益の10パーセンタイル
+    profit_p50: Optional[int] = None
+    profit_p90: Optional[int] = None
+    below_break_even_probability: Optional[float] = None  # 損益分岐売上を下回る確率 (0〜1)
 
 
 class SimulationResultResponse(BaseModel):
@@ -45,11 +50,148 @@ class SimulationResultResponse(BaseModel):
     funds_comment_category: str = ""
     funds_comment_text: str = ""
     store_story_text: str = ""
+    # ストーリー生成状況: pending（生成中・テンプレ文） / ready（AI生成済み） / fallback（テンプレ文のまま）
+    store_story_status: str = "ready"
     concept_title: str = ""
     concept_detail: str = ""
     funds_summary: str = ""
     monthly_sales: Optional[int] = None
 
 
+class SimulationBatchRequest(BaseModel):
+    # 各要素は SubmitSimulationRequest 形式。1件ごとに検証し、不正な要素は個別エラーにする
+    items: List[dict] = Field(..., min_length=1)
+
+
+class SimulationBatchItemResult(BaseModel):
+    index: int  # items 内の位置
+    ok: bool
+    result: Optional[SimulationResultResponse] = None
+    error: Optional[str] = None
+
+
+class SimulationBatchResponse(BaseModel):
+    total: int
+    succeeded: int
+    failed: int
+    items: List[SimulationBatchItemResult]
+
+
+class StoreStoryStatusResponse(BaseModel):
+    session_id: int
+    status: str
+    store_story_text: str = ""
+
+
+class GridRange(BaseModel):
+    """What-if グリッドの1軸: values を列挙するか start/stop/step で範囲指定"""
+    values: Optional[List[float]] = None
+    start: Optional[float] = None
+    stop: Optional[float] = None  # stop を含む
+    step: Optional[float] = Field(default=None, gt=0)
+
+    @model_validator(mode="after")
+    def check_spec(self) -> "GridRange":
+        if self.values is None and None in (self.start, self.stop, self.step):
+            raise ValueError("values または start/stop/step を指定してください")
+        if self.values is not None and not self.values:
+            raise ValueError("values は1件以上指定してください")
+        if self.values is None and self.stop < self.start:
+            raise ValueError("stop は start 以上を指定してください")
+        return self
+
+
+class ForecastGridRequest(BaseModel):
+    main_genre: str = Field(default="default", description="FINANCIAL_RATIO_BY_GENRE のキー")
+    seats: GridRange
+    price_point: GridRange
+    occupancy_rate: Optional[GridRange] = None  # 既定: 0.7
+    operating_days: Optional[GridRange] = None  # 既定: 30
+    cost_ratio: Optional[GridRange] = None  # 原価率 (%)。既定: 業態別比率
+    labor_cost_ratio: Optional[GridRange] = None  # 人件費率 (%)。既定: 業態別比率
+    include_surfaces: bool = True
+
+
+class ForecastGridResponse(BaseModel):
+    main_genre: str
+    # 軸の順番 = surfaces の次元の順番
+    axes: dict[str, List[float]]
+    shape: List[int]
+    scenario_count: int
+    # monthly_sales / estimated_rent / break_even_sales / monthly_profit
+    surfaces: Optional[dict[str, list]] = None
+    # 各指標の min / max / mean
+    summary: dict[str, dict[str, float]]
+
+
+class RiskDistribution(BaseModel):
+    """モンテカルロ用の確率分布
+
+    - fixed: value
+    - normal: mean, std（low/high で切り詰め可）
+    - uniform: low, high
+    - triangular: low, mode, high
+    - lognormal: mean, std（対数ではなく実数空間での平均・標準偏差）
+    """
+    kind: Literal["fixed", "normal", "uniform", "triangular", "lognormal"] = "normal"
+    value: Optional[float] = None
+    mean: Optional[float] = None
+    std: Optional[float] = Field(default=None, ge=0)
+    low: Optional[float] = None
+    mode: Optional[float] = None
+    high: Optional[float] = None
+
+    @model_validator(mode="after")
+    def check_params(self) -> "RiskDistribution":
+        required = {
+            "fixed": ("value",),
+            "normal": ("mean", "std"),
+            "uniform": ("low", "high"),
+            "triangular": ("low", "mode", "high"),
+            "lognormal": ("mean", "std"),
+        }[self.kind]
+        missing = [name for name in required if getattr(self, name) is None]
+        if missing:
+            raise ValueError(f"{self.kind} 分布には {', '.join(missing)} が必要です")
+        if self.kind == "lognormal" and self.mean <= 0:
+            raise ValueError("lognormal 分布の mean は正の値を指定してください")
+        if self.kind == "uniform" and not self.low < self.high:
+            raise ValueError("uniform 分布は low < high を指定してください")
+        if self.kind == "triangular" and not self.low <= self.mode <= self.high:
+            raise ValueError("triangular 分布は low ≤ mode ≤ high を指定してください")
+        # normal / lognormal の切り詰め範囲
+        if self.low is not None and self.high is not None and self.low > self.high:
+            raise ValueError("low は high 以下を指定してください")
+        return self
+
+
+class ForecastRiskRequest(BaseModel):
+    main_genre: str = Field(default="default", description="FINANCIAL_RATIO_BY_GENRE のキー")
+    seats: int = Field(..., ge=1)
+    price_point: int = Field(..., ge=1)
+    trials: Optional[int] = Field(default=None, ge=1, le=1_000_000)
+    seed: Optional[int] = None
+    # 未指定の項目は決定論的な予測値を中心とした既定の分布を使う
+    occupancy_rate: Optional[RiskDistribution] = None
+    customer_spend: Optional[RiskDistribution] = None
+    cost_ratio: Optional[RiskDistribution] = None  # 原価率 (%)
+    rent: Optional[RiskDistribution] = None  # 月額家賃（円）
+
+
+class PercentileBand(BaseModel):
+    p10: float
+    p50: float
+    p90: float
+
+
+class ForecastRiskResponse(BaseModel):
+    trials: int
+    seed: int
+    monthly_sales: PercentileBand
+    monthly_profit: PercentileBand
+    below_break_even_probability: float
+    trials_per_second: float
+
+
 class AttachUserRequest(BaseModel):
     session_id: int = Field(..., ge=1)
@@ -4,6 +4,9 @@ from typing import AsyncGenerator, Optional
 from openai import AsyncAzureOpenAI
 
 from app.core.config import get_settings
+from app.services.llm_cache import make_cache_key, response_cache
+from app.services.llm_scheduler import llm_scheduler
+from app.services.llm_singleflight import completion_flight, stream_flight
 
 settings = get_settings()
 
@@ -16,26 +19,69 @@ client = AsyncAzureOpenAI(
 
 MODEL_NAME = settings.azure_openai_deployment
 
+# ストリームが失敗したときに最後のチャンクとして流す文字列の先頭
+STREAM_ERROR_PREFIX = "[エラー: "
+
+
+def is_stream_error(chunk: str) -> bool:
+    """ストリームのチャンクが失敗の通知かどうか"""
+    return chunk.startswith(STREAM_ERROR_PREFIX)
+
+
+async def _request_completion(
+    messages: list[dict],
+    max_tokens: int,
+    temperature: float,
+) -> Optional[str]:
+    """Call Azure OpenAI once (no cache)."""
+    # 待ち行列が満杯の場合は LLMQueueFullError (503) をそのまま呼び出し元へ伝播させる
+    async with llm_scheduler.slot(MODEL_NAME):
+        try:
+            response = await client.chat.completions.create(
+                model=MODEL_NAME,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+            )
+            return response.choices[0].message.content
+        except Exception:
+            return None
+
 
 async def _chat_completion(
     messages: list[dict],
     max_tokens: int = 1024,
     temperature: float = 0.7,
+    use_cache: bool = False,
 ) -> Optional[str]:
-    """Send a chat completion request to Azure OpenAI."""
+    """Send a chat completion request to Azure OpenAI.
+
+    Identical requests are answered from the response cache when ``use_cache``.
+    Only deterministic calls (summaries, the report) opt in; conversational
+    replies must not be replayed.
+    """
     if not settings.azure_openai_api_key or not settings.azure_openai_endpoint:
         return None
 
-    try:
-        response = await client.chat.completions.create(
-            model=MODEL_NAME,
-            messages=messages,
-            max_tokens=max_tokens,
-            temperature=temperature,
+    key = make_cache_key(MODEL_NAME, messages, max_tokens, temperature)
+    if not use_cache:
+        return await completion_flight.do(
+            key, lambda: _request_completion(messages, max_tokens, temperature)
         )
-        return response.choices[0].message.content
-    except Exception:
-        return None
+
+    cached = await response_cache.get(key)
+    if cached is not None:
+        return cached
+
+    async def _fetch_and_store() -> Optional[str]:
+        content = await _request_completion(messages, max_tokens, temperature)
+        # 失敗（None / 空文字）はキャッシュしない
+        if content:
+            await response_cache.set(key, content)
+        return content
+
+    # 同一プロンプトが同時に飛んでいる場合は1回の上流呼び出しを共有する
+    return await completion_flight.do(key, _fetch_and_store)
 
 
 async def _chat_completion_stream(
@@ -43,24 +89,43 @@ async def _chat_completion_stream(
     max_tokens: int = 1024,
     temperature: float = 0.7,
 ) -> AsyncGenerator[str, None]:
-    """Send a streaming chat completion request to Azure OpenAI."""
+    """Send a streaming chat completion request to Azure OpenAI.
+
+    Concurrent identical requests share one upstream stream; late joiners get
+    the chunks emitted so far replayed before following the live stream.
+    """
     if not settings.azure_openai_api_key or not settings.azure_openai_endpoint:
         yield ""
         return
 
-    try:
-        response = await client.chat.completions.create(
-            model=MODEL_NAME,
-            messages=messages,
-            max_tokens=max_tokens,
-            temperature=temperature,
-            stream=True,
-        )
-        async for chunk in response:
-            if chunk.choices and chunk.choices[0].delta.content:
-                yield chunk.choices[0].delta.content
-    except Exception as e:
-        yield f"[エラー: {str(e)}]"
+    key = make_cache_key(MODEL_NAME, messages, max_tokens, temperature)
+    async for chunk in stream_flight.subscribe(
+        key, lambda: _request_completion_stream(messages, max_tokens, temperature)
+    ):
+        yield chunk
+
+
+async def _request_completion_stream(
+    messages: list[dict],
+    max_tokens: int,
+    temperature: float,
+) -> AsyncGenerator[str, None]:
+    """Stream one completion from Azure OpenAI (no coalescing)."""
+    # ストリーム終了までスロットを保持する
+    async with llm_scheduler.slot(MODEL_NAME):
+        try:
+            response = await client.chat.completions.create(
+                model=MODEL_NAME,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=True,
+            )
+            async for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            yield f"{STREAM_ERROR_PREFIX}{str(e)}]"
 
 
 async def answer_question(context: dict, question: str) -> Optional[str]:
@@ -130,7 +195,7 @@ async def generate_summary(
         {"role": "user", "content": user_content},
     ]
 
-    return await _chat_completion(messages, max_tokens=1024)
+    return await _chat_completion(messages, max_tokens=1024, use_cache=True)
 
 # --- compatibility wrapper: legacy name expected by other modules ---
 async def send_chat_completion(
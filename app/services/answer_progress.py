@@ -0,0 +1,295 @@
+"""Card progress across the eight ``*_answers`` tables in one query.
+
+The dashboard and the mindmap need, per axis, how many question cards the
+user has answered (chat started, summary written or marked complete). The
+tables are combined with ``UNION ALL`` and filtered by ``user_id``.
+A card counts as having a conversation when it has rows in
+``card_chat_messages`` or, for cards not yet backfilled, a non-empty legacy
+``chat_history``. That column is only compared against an empty JSON array
+and is never fetched unless asked for.
+
+- ``fetch_card_progress``: one row per answered card (mindmap nodes).
+- ``fetch_axis_progress``: ``GROUP BY`` axis on top of the same union
+  (dashboard scores).
+
+The per-axis counts are also materialized in ``user_axis_progress``. Every
+answer write calls ``refresh_axis_progress`` before its commit, so the
+dashboard reads one indexed row set per user (``load_axis_progress``).
+``rebuild_axis_progress`` recomputes the table for backfills and drift
+repair (``rebuild_axis_progress.py``).
+"""
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import String, and_, case, cast, exists, func, literal, or_, select, union_all
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.mindmap_nodes import AXIS_CONFIG
+from app.core.upsert import upsert_stmt
+from app.core.user_version import bump_user_versions
+from app.models.card_chat_message import CardChatMessage
+from app.models.concept_answer import ConceptAnswer
+from app.models.funding_plan_answer import FundingPlanAnswer
+from app.models.interior_exterior_answer import InteriorExteriorAnswer
+from app.models.location_answer import LocationAnswer
+from app.models.marketing_answer import MarketingAnswer
+from app.models.menu_answer import MenuAnswer
+from app.models.operation_answer import OperationAnswer
+from app.models.revenue_forecast_answer import RevenueForecastAnswer
+from app.models.user_axis_progress import UserAxisProgress
+
+logger = logging.getLogger(__name__)
+
+# 軸コード → Answerモデル
+AXIS_ANSWER_MODELS = {
+    "concept": ConceptAnswer,
+    "revenue_forecast": RevenueForecastAnswer,
+    "funds": FundingPlanAnswer,
+    "operation": OperationAnswer,
+    "location": LocationAnswer,
+    "interior_exterior": InteriorExteriorAnswer,
+    "marketing": MarketingAnswer,
+    "menu": MenuAnswer,
+}
+
+
+@dataclass
+class CardProgress:
+    axis_code: str
+    card_id: str
+    has_history: bool
+    has_summary: bool
+    is_completed: bool
+    summary: Optional[str] = None
+    chat_history: Optional[list] = None
+
+    @property
+    def answered(self) -> bool:
+        # dashboard / mindmap 共通の「回答あり」判定
+        return self.has_history or self.has_summary or self.is_completed
+
+
+@dataclass
+class AxisProgress:
+    axis_code: str
+    total: int
+    answered: int = 0
+    completed: int = 0
+    summarized: int = 0
+
+    @property
+    def score(self) -> float:
+        return round((self.answered / self.total) * 10, 1) if self.total else 0.0
+
+
+def _card_rows(
+    user_id: Optional[int],
+    with_summary: bool,
+    axis_codes: Optional[Iterable[str]] = None,
+    with_history: bool = False,
+):
+    """回答レコードを1行1カードに揃えた UNION ALL（user_id=None で全ユーザー）"""
+    selects = []
+    for axis_code in axis_codes or AXIS_ANSWER_MODELS:
+        model = AXIS_ANSWER_MODELS[axis_code]
+        card_ids = list(AXIS_CONFIG[axis_code]["questions"].keys())
+        # 会話は card_chat_messages に追記される（未移行のカードは chat_history に残っている）
+        has_history = or_(
+            and_(
+                model.chat_history.is_not(None),
+                cast(model.chat_history, String) != "[]",
+            ),
+            exists().where(
+                CardChatMessage.user_id == model.user_id,
+                CardChatMessage.axis_code == axis_code,
+                CardChatMessage.card_id == model.card_id,
+            ),
+        )
+        has_summary = and_(model.summary.is_not(None), model.summary != "")
+        columns = [
+            model.user_id.label("user_id"),
+            literal(axis_code).label("axis_code"),
+            model.card_id.label("card_id"),
+            case((has_history, 1), else_=0).label("has_history"),
+            case((has_summary, 1), else_=0).label("has_summary"),
+            case((model.is_completed.is_(True), 1), else_=0).label("is_completed"),
+        ]
+        if with_summary:
+            columns.append(model.summary.label("summary"))
+        if with_history:
+            columns.append(model.chat_history.label("chat_history"))
+        conditions = [model.card_id.in_(card_ids)]
+        if user_id is not None:
+            conditions.append(model.user_id == user_id)
+        selects.append(select(*columns).where(*conditions))
+    return union_all(*selects).subquery("card_rows")
+
+
+def _axis_counts(rows, by_user: bool = False):
+    answered = or_(rows.c.has_history == 1, rows.c.has_summary == 1, rows.c.is_completed == 1)
+    keys = [rows.c.user_id, rows.c.axis_code] if by_user else [rows.c.axis_code]
+    return select(
+        *keys,
+        func.sum(case((answered, 1), else_=0)),
+        func.sum(rows.c.is_completed),
+        func.sum(rows.c.has_summary),
+    ).group_by(*keys)
+
+
+def _empty_progress(axis_code: str) -> AxisProgress:
+    return AxisProgress(axis_code=axis_code, total=len(AXIS_CONFIG[axis_code]["questions"]))
+
+
+async def fetch_card_progress(
+    db: AsyncSession, user_id: int, with_summary: bool = True, with_history: bool = False
+) -> dict[str, dict[str, CardProgress]]:
+    """軸コード → カードID → 進捗（回答レコードのあるカードのみ。chat_history は with_history 指定時のみ読む）"""
+    rows = _card_rows(user_id, with_summary, with_history=with_history)
+    result = await db.execute(select(rows))
+    progress: dict[str, dict[str, CardProgress]] = {code: {} for code in AXIS_ANSWER_MODELS}
+    for row in result.mappings():
+        progress[row["axis_code"]][row["card_id"]] = CardProgress(
+            axis_code=row["axis_code"],
+            card_id=row["card_id"],
+            has_history=bool(row["has_history"]),
+            has_summary=bool(row["has_summary"]),
+            is_completed=bool(row["is_completed"]),
+            summary=row.get("summary"),
+            chat_history=row.get("chat_history"),
+        )
+    return progress
+
+
+def axis_progress_from_cards(cards: dict[str, dict[str, CardProgress]]) -> dict[str, AxisProgress]:
+    """fetch_card_progress の結果から軸ごとの件数を数える（追加のクエリなし）"""
+    progress = {code: _empty_progress(code) for code in AXIS_ANSWER_MODELS}
+    for axis_code, per_card in cards.items():
+        item = progress[axis_code]
+        for card in per_card.values():
+            item.answered += card.answered
+            item.completed += card.is_completed
+            item.summarized += card.has_summary
+    return progress
+
+
+async def fetch_axis_progress(
+    db: AsyncSession,
+    user_id: int,
+    axis_codes: Optional[Iterable[str]] = None,
+) -> dict[str, AxisProgress]:
+    """軸ごとの回答・完了・要約済みカード数（8テーブルを1クエリで集計）"""
+    axis_codes = list(axis_codes or AXIS_ANSWER_MODELS)
+    result = await db.execute(_axis_counts(_card_rows(user_id, False, axis_codes)))
+    progress = {code: _empty_progress(code) for code in axis_codes}
+    for axis_code, answered_count, completed_count, summarized_count in result.all():
+        item = progress[axis_code]
+        item.answered = int(answered_count or 0)
+        item.completed = int(completed_count or 0)
+        item.summarized = int(summarized_count or 0)
+    return progress
+
+
+def _progress_row(user_id: int, item: AxisProgress) -> dict:
+    return {
+        "user_id": user_id,
+        "axis_code": item.axis_code,
+        "answered": item.answered,
+        "completed": item.completed,
+        "total": item.total,
+        "score": item.score,
+        "updated_at": datetime.utcnow(),
+    }
+
+
+async def _upsert_progress_rows(db: AsyncSession, rows: list[dict]) -> None:
+    await db.execute(
+        upsert_stmt(
+            db,
+            UserAxisProgress,
+            rows,
+            conflict_columns=["user_id", "axis_code"],
+            update_columns=["answered", "completed", "total", "score", "updated_at"],
+        )
+    )
+
+
+async def refresh_axis_progress(db: AsyncSession, user_id: int, axis_code: str) -> None:
+    """回答の保存と同じトランザクションで user_axis_progress を更新する（commit は呼び出し側）
+
+    集計テーブルの更新に失敗しても回答の保存は失敗させない（SAVEPOINT でロールバック）
+    """
+    if axis_code not in AXIS_ANSWER_MODELS:
+        return
+    # 回答自体の保存エラーはここで呼び出し側に返す
+    await db.flush()
+    try:
+        async with db.begin_nested():
+            progress = await fetch_axis_progress(db, user_id, [axis_code])
+            await _upsert_progress_rows(db, [_progress_row(user_id, progress[axis_code])])
+    except SQLAlchemyError as e:
+        logger.warning(f"user_axis_progress の更新に失敗しました（user_id={user_id}, axis={axis_code}）: {e}")
+
+
+async def load_axis_progress(db: AsyncSession, user_id: int) -> dict[str, AxisProgress]:
+    """user_axis_progress から読む（1ユーザー分の索引検索。行のない軸だけ回答テーブルから集計）"""
+    try:
+        result = await db.execute(
+            select(UserAxisProgress).where(UserAxisProgress.user_id == user_id)
+        )
+        rows = list(result.scalars())
+    except SQLAlchemyError as e:
+        logger.warning(f"user_axis_progress の取得に失敗したため回答テーブルから集計します: {e}")
+        rows = []
+
+    progress: dict[str, AxisProgress] = {}
+    for row in rows:
+        if row.axis_code not in AXIS_ANSWER_MODELS:
+            continue
+        item = progress[row.axis_code] = _empty_progress(row.axis_code)
+        item.answered = row.answered
+        item.completed = row.completed
+
+    # バックフィル前に一部の軸だけ更新された場合も、残りの軸を0件にしない
+    missing = [code for code in AXIS_ANSWER_MODELS if code not in progress]
+    if missing:
+        progress.update(await fetch_axis_progress(db, user_id, missing))
+    return {code: progress[code] for code in AXIS_ANSWER_MODELS}
+
+
+async def rebuild_axis_progress(
+    db: AsyncSession,
+    user_ids: Optional[list[int]] = None,
+    batch_size: int = 500,
+) -> int:
+    """回答テーブルから user_axis_progress を作り直す（バックフィル・ずれの修復用）"""
+    card_rows = _card_rows(None, False)
+    counts = _axis_counts(card_rows, by_user=True)
+    if user_ids:
+        counts = counts.where(card_rows.c.user_id.in_(user_ids))
+    result = await db.execute(counts)
+
+    aggregated: dict[int, dict[str, AxisProgress]] = {}
+    for user_id, axis_code, answered_count, completed_count, summarized_count in result.all():
+        item = aggregated.setdefault(user_id, {}).setdefault(axis_code, _empty_progress(axis_code))
+        item.answered = int(answered_count or 0)
+        item.completed = int(completed_count or 0)
+        item.summarized = int(summarized_count or 0)
+
+    # 回答のない軸も0件の行を書いておく（行があれば集計済みとみなす）
+    rows = []
+    for user_id in user_ids or aggregated.keys():
+        per_axis = aggregated.get(user_id, {})
+        for axis_code in AXIS_ANSWER_MODELS:
+            rows.append(_progress_row(user_id, per_axis.get(axis_code) or _empty_progress(axis_code)))
+
+    for start in range(0, len(rows), batch_size):
+        await _upsert_progress_rows(db, rows[start:start + batch_size])
+        # 値が変わった可能性があるので条件付きGETの ETag を進める
+        await bump_user_versions(db, {row["user_id"] for row in rows[start:start + batch_size]})
+    await db.commit()
+    return len(rows)
@@ -0,0 +1,242 @@
+"""Append-only chat message store for the eight axis question cards.
+
+Each message is one row in ``card_chat_messages``. A ``/chat`` turn inserts
+only the new user and assistant messages instead of rewriting the card's
+whole ``chat_history`` JSON. Clients send only the new message plus the
+last message id they have, and get back only the messages after it.
+
+``*_answers.chat_history`` is legacy. It is read as a fallback for cards
+that have not been backfilled yet (``migrate_card_chat_messages.py``) and
+is no longer written.
+
+Messages are passed around as dicts ``{"id", "role", "content", "truncated"}``.
+``id`` is ``None`` for messages that are not stored yet (legacy JSON,
+client-supplied history, or a turn whose save failed).
+"""
+from __future__ import annotations
+
+import logging
+from datetime import datetime
+from typing import Iterable, Optional, Sequence
+
+from sqlalchemy import Row, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.upsert import upsert_returning
+from app.core.user_version import bump_user_versions
+from app.models.card_chat_message import CardChatMessage
+from app.services.answer_progress import AXIS_ANSWER_MODELS
+
+logger = logging.getLogger(__name__)
+
+
+def _message(msg_id: Optional[int], role: str, content: str, truncated: bool = False) -> dict:
+    return {"id": msg_id, "role": role, "content": content, "truncated": bool(truncated)}
+
+
+def _from_json(chat_history: Optional[list]) -> list[dict]:
+    return [_message(None, m.get("role", ""), m.get("content", "")) for m in chat_history or []]
+
+
+async def load_history(
+    db: AsyncSession,
+    user_id: int,
+    axis_code: str,
+    card_id: str,
+    client_history: Sequence = (),
+) -> list[dict]:
+    """カードの会話履歴（保存済みメッセージ → 未移行の chat_history → クライアント送信の履歴の順に参照）"""
+    try:
+        result = await db.execute(
+            select(
+                CardChatMessage.id,
+                CardChatMessage.role,
+                CardChatMessage.content,
+                CardChatMessage.truncated,
+            )
+            .where(
+                CardChatMessage.user_id == user_id,
+                CardChatMessage.axis_code == axis_code,
+                CardChatMessage.card_id == card_id,
+            )
+            .order_by(CardChatMessage.id)
+        )
+        stored = [_message(*row) for row in result.all()]
+        if stored:
+            return stored
+        model = AXIS_ANSWER_MODELS[axis_code]
+        result = await db.execute(
+            select(model.chat_history).where(model.user_id == user_id, model.card_id == card_id)
+        )
+        legacy = _from_json(result.scalar_one_or_none())
+        if legacy:
+            return legacy
+    except SQLAlchemyError as e:
+        logger.warning(f"チャット履歴の取得に失敗したため送信された履歴を使います: {e}")
+    # 旧クライアントは毎回全履歴を送ってくる
+    return [_message(None, m.role, m.content) for m in client_history]
+
+
+async def load_axis_histories(
+    db: AsyncSession,
+    user_id: int,
+    axis_codes: Optional[Iterable[str]] = None,
+) -> dict[str, dict[str, list[dict]]]:
+    """軸コード → カードID → 保存済みメッセージ（1クエリ。未保存のカードは含まない）"""
+    axis_codes = list(axis_codes or AXIS_ANSWER_MODELS)
+    histories: dict[str, dict[str, list[dict]]] = {code: {} for code in axis_codes}
+    try:
+        result = await db.execute(
+            select(
+                CardChatMessage.axis_code,
+                CardChatMessage.card_id,
+                CardChatMessage.id,
+                CardChatMessage.role,
+                CardChatMessage.content,
+                CardChatMessage.truncated,
+            )
+            .where(CardChatMessage.user_id == user_id, CardChatMessage.axis_code.in_(axis_codes))
+            .order_by(CardChatMessage.id)
+        )
+    except SQLAlchemyError as e:
+        logger.warning(f"card_chat_messages の取得に失敗しました: {e}")
+        return histories
+    for axis_code, card_id, *message in result.all():
+        histories[axis_code].setdefault(card_id, []).append(_message(*message))
+    return histories
+
+
+async def append_messages(
+    db: AsyncSession,
+    user_id: int,
+    axis_code: str,
+    card_id: str,
+    history: list[dict],
+) -> list[dict]:
+    """history のうち未保存（id なし）のメッセージを追記し、id を振った履歴を返す（commit は呼び出し側）
+
+    回答レコード（*_answers）がなければ作る（進捗・完了フラグ・サマリーの保存先。upsert_answer）
+    """
+    await upsert_answer(db, user_id, axis_code, card_id)
+
+    pending = [
+        (i, CardChatMessage(
+            user_id=user_id,
+            axis_code=axis_code,
+            card_id=card_id,
+            role=msg["role"],
+            content=msg["content"],
+            truncated=msg.get("truncated", False),
+        ))
+        for i, msg in enumerate(history)
+        if msg["id"] is None
+    ]
+    db.add_all([row for _, row in pending])
+    await db.flush()
+
+    saved = list(history)
+    for i, row in pending:
+        saved[i] = _message(row.id, row.role, row.content, row.truncated)
+    return saved
+
+
+async def upsert_answer(
+    db: AsyncSession,
+    user_id: int,
+    axis_code: str,
+    card_id: str,
+    **values,
+) -> Row:
+    """回答レコード（*_answers）を1文で作成・更新して結果の行を返す（commit は呼び出し側）
+
+    values（summary・is_completed など）を指定しなければ、レコードがない場合に作るだけ
+    同じカードに複数タブから同時に書き込んでも (user_id, card_id) の一意制約で失敗しない
+    """
+    model = AXIS_ANSWER_MODELS[axis_code]
+    now = datetime.utcnow()
+    row = await upsert_returning(
+        db,
+        model,
+        {
+            "user_id": user_id,
+            "card_id": card_id,
+            "chat_history": [],
+            "is_completed": False,
+            "updated_at": now,
+            **values,
+        },
+        conflict_columns=["user_id", "card_id"],
+        update_columns=[*values, "updated_at"] if values else [],
+        columns=[model.id, model.summary, model.is_completed, model.updated_at],
+    )
+    if values:
+        # Core の upsert なのでキャッシュ（ETag）の無効化は明示的に行う
+        await bump_user_versions(db, [user_id])
+    return row
+
+
+def chat_response_fields(history: list[dict], last_message_id: Optional[int]) -> dict:
+    """/chat 応答の履歴部分
+
+    last_message_id を送ってきたクライアントにはそれより後のメッセージ（差分）だけを返す。
+    送ってこない旧クライアントには従来どおり全履歴も返す
+    """
+    ids = [m["id"] for m in history if m["id"] is not None]
+    if last_message_id is None:
+        delta = history
+    else:
+        delta = [m for m in history if m["id"] is None or m["id"] > last_message_id]
+    return {
+        "history": history if last_message_id is None else None,
+        "messages": delta,
+        "last_message_id": max(ids) if ids else last_message_id,
+    }
+
+
+async def backfill_card_messages(db: AsyncSession, batch_size: int = 500) -> int:
+    """*_answers.chat_history を card_chat_messages に移す（移行済みのカードは飛ばす。何度実行してもよい）"""
+    total = 0
+    for axis_code, model in AXIS_ANSWER_MODELS.items():
+        result = await db.execute(
+            select(CardChatMessage.user_id, CardChatMessage.card_id)
+            .where(CardChatMessage.axis_code == axis_code)
+            .distinct()
+        )
+        migrated = set(result.all())
+
+        last_id = 0
+        while True:
+            result = await db.execute(
+                select(model.id, model.user_id, model.card_id, model.chat_history)
+                .where(model.id > last_id)
+                .order_by(model.id)
+                .limit(batch_size)
+            )
+            rows = result.all()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+
+            messages = []
+            for _, user_id, card_id, chat_history in rows:
+                if (user_id, card_id) in migrated or not chat_history:
+                    continue
+                messages.extend(
+                    {
+                        "user_id": user_id,
+                        "axis_code": axis_code,
+                        "card_id": card_id,
+                        "role": msg.get("role", ""),
+                        "content": msg.get("content", ""),
+                    }
+                    for msg in chat_history
+                )
+            if messages:
+                # 1カード内の順序は挿入順（id 昇順）で保たれる
+                await db.execute(CardChatMessage.__table__.insert(), messages)
+                # Core の insert なのでキャッシュ（ETag）の無効化は明示的に行う
+                await bump_user_versions(db, {m["user_id"] for m in messages})
+                total += len(messages)
+            await db.commit()
+    return total
@@ -0,0 +1,296 @@
+"""36-month cashflow and loan amortization engine for the funds axis.
+
+Everything is computed in code from a small set of assumptions: a monthly
+sales ramp, COGS, labor, rent, other costs, and loan repayment by equal
+principal (元金均等) or equal installment (元利均等). All months are
+evaluated at once as NumPy arrays, so the numbers that ``/api/report`` and
+the dashboard embed are fast and reproducible, and the LLM does not have to
+invent them.
+
+When a user has no explicit assumptions, they are derived from the latest
+simple simulation (seats, price point, genre) and the same ratios as
+``calculate_financial_forecast``. Taxes are not modelled.
+"""
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, field, replace
+from typing import Literal, Optional
+
+import numpy as np
+from sqlalchemy import desc, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.simple_simulation import (
+    SimpleSimulationAnswer,
+    SimpleSimulationSession,
+    SimulationStatus,
+)
+from app.services.simulation import (
+    FINANCIAL_RATIO_BY_GENRE,
+    OTHER_COSTS_RATIO,
+    _build_store_profile,
+    calculate_financial_forecast,
+)
+
+RepaymentMethod = Literal["equal_installment", "equal_principal"]
+
+# 簡易シミュレーションから前提を作るときの既定値
+INITIAL_INVESTMENT_PER_SEAT = 600_000  # 1席あたりの初期投資（内装・設備・保証金など）
+OWN_FUNDS_SHARE = 1 / 3  # 初期投資のうち自己資金の割合（残りを借入）
+DEFAULT_INTEREST_RATE = 2.0  # 年利 (%)
+DEFAULT_LOAN_TERM_MONTHS = 84  # 7年
+DEFAULT_MONTHS = 36
+WORKING_CAPITAL_MONTHS = 3  # 借入に含める運転資金（家賃＋人件費の月数分）
+
+
+@dataclass
+class CashflowAssumptions:
+    monthly_sales_target: float  # 軌道に乗った後の月商
+    cost_ratio: float  # 原価率 (%)
+    labor_cost_ratio: float  # 人件費率 (%)
+    monthly_rent: float
+    initial_investment: float
+    own_funds: float
+    loan_amount: float
+    other_costs_ratio: float = OTHER_COSTS_RATIO  # その他経費率 (%)
+    annual_interest_rate: float = DEFAULT_INTEREST_RATE
+    loan_term_months: int = DEFAULT_LOAN_TERM_MONTHS
+    repayment_method: RepaymentMethod = "equal_installment"
+    grace_months: int = 0  # 据置期間（利息のみ支払い）
+    ramp_months: int = 6  # 売上が目標に達するまでの月数
+    ramp_start_ratio: float = 0.6  # 開業月の売上（目標比）
+    months: int = DEFAULT_MONTHS
+
+
+@dataclass
+class CashflowProjection:
+    assumptions: CashflowAssumptions
+    # 各月の値（長さ = months）
+    sales: np.ndarray
+    cogs: np.ndarray
+    labor: np.ndarray
+    rent: np.ndarray
+    other_costs: np.ndarray
+    operating_profit: np.ndarray
+    interest: np.ndarray
+    principal: np.ndarray
+    net_cashflow: np.ndarray
+    cumulative_cash: np.ndarray
+    loan_balance: np.ndarray
+    summary: dict = field(default_factory=dict)
+
+    def yearly(self) -> list[dict]:
+        """12か月ごとの集計"""
+        rows = []
+        for start in range(0, len(self.sales), 12):
+            end = min(start + 12, len(self.sales))
+            rows.append(
+                {
+                    "year": start // 12 + 1,
+                    "sales": int(self.sales[start:end].sum()),
+                    "operating_profit": int(self.operating_profit[start:end].sum()),
+                    "debt_service": int((self.interest[start:end] + self.principal[start:end]).sum()),
+                    "net_cashflow": int(self.net_cashflow[start:end].sum()),
+                    "ending_cash": int(self.cumulative_cash[end - 1]),
+                    "ending_loan_balance": int(self.loan_balance[end - 1]),
+                }
+            )
+        return rows
+
+    def to_dict(self, include_monthly: bool = True) -> dict:
+        data = {
+            "assumptions": asdict(self.assumptions),
+            "summary": self.summary,
+            "yearly": self.yearly(),
+        }
+        if include_monthly:
+            data["monthly"] = {
+                name: np.rint(getattr(self, name)).astype(np.int64).tolist()
+                for name in (
+                    "sales", "cogs", "labor", "rent", "other_costs", "operating_profit",
+                    "interest", "principal", "net_cashflow", "cumulative_cash", "loan_balance",
+                )
+            }
+        return data
+
+
+def loan_schedule(
+    principal: float,
+    annual_rate: float,
+    term_months: int,
+    method: RepaymentMethod,
+    grace_months: int,
+    months: int,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Monthly (interest, principal repayment, ending balance) for ``months`` months.
+
+    Interest is charged monthly at ``annual_rate / 12`` on the opening
+    balance. During the grace period only interest is paid.
+    """
+    m = np.arange(1, months + 1)
+    if principal <= 0 or term_months <= 0:
+        zeros = np.zeros(months)
+        return zeros, zeros, zeros
+
+    r = annual_rate / 100 / 12
+    n = max(term_months - grace_months, 1)
+    # 据置期間後の返済回数（月ごと、0 = 返済開始前）
+    k = np.clip(m - grace_months, 0, n)
+
+    if method == "equal_principal":
+        per_month = principal / n
+        balance_end = principal - per_month * k
+    elif r == 0:
+        balance_end = principal - principal / n * k
+    else:
+        growth = (1 + r) ** k
+        payment = principal * r / (1 - (1 + r) ** -n)
+        balance_end = principal * growth - payment * (growth - 1) / r
+
+    balance_end = np.maximum(balance_end, 0.0)
+    balance_start = np.concatenate(([float(principal)], balance_end[:-1]))
+    interest = balance_start * r
+    repaid = balance_start - balance_end
+    return interest, repaid, balance_end
+
+
+def project_cashflow(assumptions: CashflowAssumptions) -> CashflowProjection:
+    """Project the monthly cashflow (all months in one vectorized pass)."""
+    a = assumptions
+    m = np.arange(a.months)
+
+    # 開業月 ramp_start_ratio → ramp_months 後に 100% まで直線的に立ち上がる
+    if a.ramp_months > 0:
+        ramp = np.minimum(1.0, a.ramp_start_ratio + (1 - a.ramp_start_ratio) * m / a.ramp_months)
+    else:
+        ramp = np.ones(a.months)
+    sales = a.monthly_sales_target * ramp
+    cogs = sales * a.cost_ratio / 100
+    labor = sales * a.labor_cost_ratio / 100
+    other_costs = sales * a.other_costs_ratio / 100
+    rent = np.full(a.months, float(a.monthly_rent))
+    operating_profit = sales - cogs - labor - other_costs - rent
+
+    interest, principal, loan_balance = loan_schedule(
+        a.loan_amount, a.annual_interest_rate, a.loan_term_months,
+        a.repayment_method, a.grace_months, a.months,
+    )
+    net_cashflow = operating_profit - interest - principal
+    opening_cash = a.own_funds + a.loan_amount - a.initial_investment
+    cumulative_cash = opening_cash + np.cumsum(net_cashflow)
+
+    profitable = np.flatnonzero(operating_profit > 0)
+    cash_positive = np.flatnonzero(net_cashflow > 0)
+    min_index = int(np.argmin(cumulative_cash))
+    summary = {
+        "opening_cash": int(round(opening_cash)),
+        "first_profitable_month": int(profitable[0]) + 1 if profitable.size else None,
+        "first_cash_positive_month": int(cash_positive[0]) + 1 if cash_positive.size else None,
+        "min_cash": int(round(cumulative_cash[min_index])),
+        "min_cash_month": min_index + 1,
+        "ending_cash": int(round(cumulative_cash[-1])),
+        "ending_loan_balance": int(round(loan_balance[-1])),
+        "total_interest": int(round(interest.sum())),
+        "monthly_debt_service": int(round(interest[-1] + principal[-1])),
+        "cash_shortfall": bool(cumulative_cash.min() < 0),
+    }
+
+    return CashflowProjection(
+        assumptions=a,
+        sales=sales,
+        cogs=cogs,
+        labor=labor,
+        rent=rent,
+        other_costs=other_costs,
+        operating_profit=operating_profit,
+        interest=interest,
+        principal=principal,
+        net_cashflow=net_cashflow,
+        cumulative_cash=cumulative_cash,
+        loan_balance=loan_balance,
+        summary=summary,
+    )
+
+
+def assumptions_from_profile(profile: dict, **overrides) -> CashflowAssumptions:
+    """簡易シミュレーションのプロファイルから前提を作る（overrides で上書き可）"""
+    forecast, _, _ = calculate_financial_forecast(profile)
+    ratios = FINANCIAL_RATIO_BY_GENRE.get(
+        profile.get("main_genre", "default"), FINANCIAL_RATIO_BY_GENRE["default"]
+    )
+    seats = profile.get("seats", 0)
+    seats = int(seats) if str(seats).isdigit() else 20
+    initial_investment = seats * INITIAL_INVESTMENT_PER_SEAT
+    own_funds = round(initial_investment * OWN_FUNDS_SHARE)
+    monthly_sales = forecast.monthly_sales or 0
+    monthly_rent = forecast.estimated_rent or 0
+    working_capital = WORKING_CAPITAL_MONTHS * (monthly_rent + monthly_sales * ratios["labor"] / 100)
+
+    assumptions = CashflowAssumptions(
+        monthly_sales_target=monthly_sales,
+        cost_ratio=ratios["cost"],
+        labor_cost_ratio=ratios["labor"],
+        monthly_rent=monthly_rent,
+        initial_investment=initial_investment,
+        own_funds=own_funds,
+        loan_amount=round(initial_investment - own_funds + working_capital),
+    )
+    overrides = {k: v for k, v in overrides.items() if v is not None}
+    return replace(assumptions, **overrides)
+
+
+async def fetch_latest_simulation_profile(db: AsyncSession, user_id: int) -> Optional[dict]:
+    """ユーザーの最新の簡易シミュレーション回答からプロファイルを作る"""
+    result = await db.execute(
+        select(SimpleSimulationSession.id)
+        .where(SimpleSimulationSession.user_id == user_id)
+        .where(SimpleSimulationSession.status == SimulationStatus.COMPLETED)
+        .order_by(desc(SimpleSimulationSession.id))
+        .limit(1)
+    )
+    session_id = result.scalar_one_or_none()
+    if session_id is None:
+        return None
+
+    result = await db.execute(
+        select(SimpleSimulationAnswer.question_code, SimpleSimulationAnswer.answer_values).where(
+            SimpleSimulationAnswer.session_id == session_id
+        )
+    )
+    answers = {code: (values or {}).get("values", []) for code, values in result.all()}
+    return _build_store_profile(answers)
+
+
+async def build_user_cashflow(
+    db: AsyncSession, user_id: int, **overrides
+) -> Optional[CashflowProjection]:
+    """ユーザーのキャッシュフロー予測（簡易シミュレーション未実施なら None）"""
+    profile = await fetch_latest_simulation_profile(db, user_id)
+    if not profile:
+        return None
+    return project_cashflow(assumptions_from_profile(profile, **overrides))
+
+
+def format_cashflow_for_prompt(projection: CashflowProjection) -> str:
+    """事業計画書プロンプトに埋め込む数値表（Markdown）"""
+    a = projection.assumptions
+    s = projection.summary
+    method = "元利均等" if a.repayment_method == "equal_installment" else "元金均等"
+    lines = [
+        f"- 初期投資: {a.initial_investment:,.0f}円（自己資金 {a.own_funds:,.0f}円 / 借入 {a.loan_amount:,.0f}円）",
+        f"- 借入条件: 年利{a.annual_interest_rate}%・{a.loan_term_months}か月・{method}返済（据置{a.grace_months}か月）",
+        f"- 目標月商: {a.monthly_sales_target:,.0f}円（開業月は{a.ramp_start_ratio:.0%}、{a.ramp_months}か月で到達）",
+        f"- 原価率 {a.cost_ratio}% / 人件費率 {a.labor_cost_ratio}% / その他経費率 {a.other_costs_ratio}% / 家賃 {a.monthly_rent:,.0f}円",
+        "- 月次黒字化: "
+        + (f"{s['first_profitable_month']}か月目" if s["first_profitable_month"] else f"{a.months}か月以内に未達"),
+        f"- 手元資金の最低額: {s['min_cash']:,}円（{s['min_cash_month']}か月目）",
+        "",
+        "| 年 | 売上 | 営業利益 | 返済額(元利) | 年間キャッシュフロー | 期末現預金 | 期末借入残高 |",
+        "|---|---|---|---|---|---|---|",
+    ]
+    for row in projection.yearly():
+        lines.append(
+            f"| {row['year']}年目 | {row['sales']:,} | {row['operating_profit']:,} | {row['debt_service']:,}"
+            f" | {row['net_cashflow']:,} | {row['ending_cash']:,} | {row['ending_loan_balance']:,} |"
+        )
+    return "\n".join(lines)
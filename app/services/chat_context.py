@@ -0,0 +1,340 @@
+"""Token-budgeted prompt context for the axis card chats.
+
+``/chat`` used to send the system prompt plus every earlier message of the
+card. Each turn got slower and more expensive until the prompt hit the
+context limit. The prompt is now built from:
+
+- the system prompt,
+- a rolling summary of the older turns (``card_chat_summaries``),
+- the older messages the summary does not cover yet, verbatim,
+- the last ``chat_context_keep_turns`` turns, verbatim,
+- the new user message.
+
+If that still exceeds ``chat_context_max_tokens``, the oldest verbatim
+messages are dropped. The last turn and the new message are always kept.
+
+The summary is extended incrementally: the previous summary plus the
+messages that aged out since. This runs in a background task after the
+``/chat`` commit (``schedule_summary_refresh``), so requests never wait
+on it. Until it finishes, the aged-out messages stay in the prompt
+verbatim and nothing is lost.
+
+Token counts come from the tokenizer (tiktoken, o200k_base). The BPE file
+is fetched at build time by ``download_tokenizer.py`` into
+``chat_tokenizer_path``; the app never downloads it. The encoding is built
+from that file (hash-checked) once at startup, off the event loop
+(``load_tokenizer``), without touching tiktoken's global cache settings.
+If it cannot be loaded, the error propagates instead of falling back to an
+estimate. A character- or byte-length estimate is several times off for
+Japanese text and would make the budget drop history far too early.
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional
+
+import tiktoken
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.db import AsyncSessionLocal
+from app.core.upsert import upsert_stmt
+from app.models.card_chat_summary import CardChatSummary
+from app.services.ai_client import _chat_completion
+from app.services.card_chat import load_history
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# OpenAI のチャット形式でメッセージごとに加わるトークン数と、応答の先頭に加わるトークン数
+MESSAGE_OVERHEAD_TOKENS = 3
+REPLY_PRIMING_TOKENS = 3
+
+SUMMARY_SYSTEM_PROMPT = (
+    "あなたは飲食店開業支援の会話を記録するアシスタントです。"
+    "これまでの要約に新しいやり取りを加えて、要約を書き直してください。"
+    "ユーザーの考え・決定事項・数値・未解決の論点を漏らさず、簡潔な日本語の箇条書きにしてください。"
+)
+
+
+# ============================================================
+# Token counting
+# ============================================================
+TOKENIZER_NAME = "o200k_base"
+TOKENIZER_URL = "https://openaipublic.blob.core.windows.net/encodings/o200k_base.tiktoken"
+TOKENIZER_SHA256 = "446a9538cb6c348e3516120d7c08b09f57c36495e2acfffe59a5bf8b0cfb1a2d"
+
+# o200k_base の分割規則と特殊トークン（tiktoken_ext.openai_public と同じ定義）
+_O200K_PAT_STR = "|".join([
+    r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]*[\p{Ll}\p{Lm}\p{Lo}\p{M}]+(?i:'s|'t|'re|'ve|'m|'ll|'d)?""",
+    r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]+[\p{Ll}\p{Lm}\p{Lo}\p{M}]*(?i:'s|'t|'re|'ve|'m|'ll|'d)?""",
+    r"""\p{N}{1,3}""",
+    r""" ?[^\s\p{L}\p{N}]+[\r\n/]*""",
+    r"""\s*[\r\n]+""",
+    r"""\s+(?!\S)""",
+    r"""\s+""",
+])
+_O200K_SPECIAL_TOKENS = {"<|endoftext|>": 199999, "<|endofprompt|>": 200018}
+
+
+def read_tokenizer_ranks(contents: bytes) -> dict[bytes, int]:
+    """BPE ファイルの中身を検証して辞書にする（ハッシュが違えば ValueError）"""
+    digest = hashlib.sha256(contents).hexdigest()
+    if digest != TOKENIZER_SHA256:
+        raise ValueError(f"トークナイザファイルのハッシュが一致しません: {digest}")
+    return {
+        base64.b64decode(token): int(rank)
+        for token, rank in (line.split() for line in contents.splitlines() if line)
+    }
+
+
+@lru_cache(maxsize=None)
+def get_encoding() -> tiktoken.Encoding:
+    """トークナイザ（chat_tokenizer_path のファイルから組み立てる。読めなければ例外をそのまま返す）"""
+    path = settings.chat_tokenizer_path
+    try:
+        with open(path, "rb") as f:
+            contents = f.read()
+    except FileNotFoundError as e:
+        raise RuntimeError(
+            f"トークナイザファイルがありません: {path}（python download_tokenizer.py で取得してください）"
+        ) from e
+    return tiktoken.Encoding(
+        name=TOKENIZER_NAME,
+        pat_str=_O200K_PAT_STR,
+        mergeable_ranks=read_tokenizer_ranks(contents),
+        special_tokens=_O200K_SPECIAL_TOKENS,
+    )
+
+
+async def load_tokenizer() -> None:
+    """起動時にトークナイザを読み込む（ファイル読み込みと辞書構築でイベントループを塞がないようスレッドで実行）"""
+    encoding = await asyncio.to_thread(get_encoding)
+    logger.info(f"トークナイザを読み込みました: {encoding.name}")
+
+
+@lru_cache(maxsize=4096)
+def count_tokens(text: str) -> int:
+    """テキストのトークン数"""
+    return len(get_encoding().encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages: list[dict]) -> int:
+    """チャットメッセージ列のプロンプトトークン数（応答の先頭分を含む）"""
+    return REPLY_PRIMING_TOKENS + sum(
+        MESSAGE_OVERHEAD_TOKENS + count_tokens(m["role"]) + count_tokens(m["content"])
+        for m in messages
+    )
+
+
+# ============================================================
+# Context builder
+# ============================================================
+@dataclass
+class ChatContext:
+    user_id: int
+    axis_code: str
+    card_id: str
+    messages: list[dict]
+    prompt_tokens: int
+    # 要約に含まれているメッセージの最大ID（要約がなければ 0）
+    covered_message_id: int = 0
+    # 予算超過で送らなかったメッセージ数
+    dropped: int = 0
+
+
+def _split(history: list[dict]) -> tuple[list[dict], list[dict]]:
+    """(直近 keep_turns 往復より古いメッセージ, 直近のメッセージ)"""
+    keep = max(settings.chat_context_keep_turns, 1) * 2
+    cut = max(len(history) - keep, 0)
+    return history[:cut], history[cut:]
+
+
+def _summary_message(summary: str) -> dict:
+    return {"role": "system", "content": f"これまでの会話の要約:\n{summary}"}
+
+
+async def _load_summary(
+    db: AsyncSession, user_id: int, axis_code: str, card_id: str
+) -> Optional[CardChatSummary]:
+    try:
+        result = await db.execute(
+            select(CardChatSummary).where(
+                CardChatSummary.user_id == user_id,
+                CardChatSummary.axis_code == axis_code,
+                CardChatSummary.card_id == card_id,
+            )
+        )
+    except SQLAlchemyError as e:
+        logger.warning(f"card_chat_summaries の取得に失敗しました（要約なしで続行）: {e}")
+        return None
+    return result.scalar_one_or_none()
+
+
+async def build_chat_context(
+    db: AsyncSession,
+    user_id: int,
+    axis_code: str,
+    card_id: str,
+    system_prompt: str,
+    history: list[dict],
+    user_message: str,
+    initial_question: str,
+) -> ChatContext:
+    """トークン予算内のプロンプトを組み立てる（history は load_history の結果）"""
+    older, recent = _split(history)
+    summary = await _load_summary(db, user_id, axis_code, card_id) if older else None
+    covered = summary.covered_message_id if summary else 0
+
+    head = [{"role": "system", "content": system_prompt}]
+    if summary:
+        head.append(_summary_message(summary.summary))
+    if not history:
+        # 初回の場合、初期質問を追加
+        head.append({"role": "assistant", "content": initial_question})
+    # 要約が追いついていない古いメッセージはそのまま送る（id なしは未保存の履歴）
+    unsummarized = [m for m in older if m["id"] is None or m["id"] > covered]
+    body = [{"role": m["role"], "content": m["content"]} for m in unsummarized + recent]
+    tail = [{"role": "user", "content": user_message}]
+
+    # 予算を超える場合は古いものから落とす（直前の1往復は残す）
+    dropped = 0
+    tokens = count_message_tokens(head + body + tail)
+    while tokens > settings.chat_context_max_tokens and len(body) > 2:
+        removed = body.pop(0)
+        tokens -= MESSAGE_OVERHEAD_TOKENS + count_tokens(removed["role"]) + count_tokens(removed["content"])
+        dropped += 1
+    if dropped:
+        logger.debug(
+            f"チャットのプロンプトが予算を超えたため {dropped} 件を省略: "
+            f"axis={axis_code} card={card_id} tokens={tokens}"
+        )
+
+    return ChatContext(
+        user_id=user_id,
+        axis_code=axis_code,
+        card_id=card_id,
+        messages=head + body + tail,
+        prompt_tokens=tokens,
+        covered_message_id=covered,
+        dropped=dropped,
+    )
+
+
+# ============================================================
+# Rolling summary
+# ============================================================
+def _pending(history: list[dict], covered: int) -> list[dict]:
+    """直近 keep_turns 往復より古く、まだ要約されていない保存済みメッセージ"""
+    older, _ = _split(history)
+    return [m for m in older if m["id"] is not None and m["id"] > covered]
+
+
+def _chunk(summary: str, pending: list[dict]) -> list[dict]:
+    """1回の要約呼び出しに収まる分だけ pending の先頭から取る（最低1件）"""
+    budget = settings.chat_context_max_tokens - count_tokens(SUMMARY_SYSTEM_PROMPT) - count_tokens(summary)
+    chunk: list[dict] = []
+    for m in pending:
+        budget -= MESSAGE_OVERHEAD_TOKENS + count_tokens(m["content"])
+        if chunk and budget < 0:
+            break
+        chunk.append(m)
+    return chunk
+
+
+async def refresh_rolling_summary(
+    db: AsyncSession, user_id: int, axis_code: str, card_id: str
+) -> bool:
+    """直近 keep_turns 往復より古いやり取りを要約に取り込む（更新したら True）"""
+    history = await load_history(db, user_id, axis_code, card_id)
+    row = await _load_summary(db, user_id, axis_code, card_id)
+    summary = row.summary if row else ""
+    covered = row.covered_message_id if row else 0
+
+    pending = _pending(history, covered)
+    if not pending:
+        return False
+    while pending:
+        chunk = _chunk(summary, pending)
+        conversation = "\n".join(f"{m['role']}: {m['content']}" for m in chunk)
+        text = await _chat_completion(
+            [
+                {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+                {
+                    "role": "user",
+                    "content": f"これまでの要約:\n{summary or '（なし）'}\n\n新しいやり取り:\n{conversation}",
+                },
+            ],
+            max_tokens=settings.chat_summary_max_tokens,
+            temperature=0.3,
+        )
+        if not text:
+            # 次のターンで再試行する（それまで古いメッセージはそのまま送られる）
+            logger.warning(f"会話の要約に失敗しました: axis={axis_code} card={card_id}")
+            return False
+        summary = text.strip()
+        covered = chunk[-1]["id"]
+        pending = pending[len(chunk):]
+
+    await db.execute(
+        upsert_stmt(
+            db,
+            CardChatSummary,
+            {
+                "user_id": user_id,
+                "axis_code": axis_code,
+                "card_id": card_id,
+                "summary": summary,
+                "covered_message_id": covered,
+                "summary_tokens": count_tokens(summary),
+                "updated_at": datetime.utcnow(),
+            },
+            conflict_columns=["user_id", "axis_code", "card_id"],
+            update_columns=["summary", "covered_message_id", "summary_tokens", "updated_at"],
+        )
+    )
+    await db.commit()
+    return True
+
+
+# 実行中の要約タスク（同じカードの要約は同時に1つだけ）
+_refresh_tasks: dict[tuple[int, str, str], asyncio.Task] = {}
+
+
+async def _refresh_in_background(user_id: int, axis_code: str, card_id: str) -> None:
+    try:
+        async with AsyncSessionLocal() as db:
+            await refresh_rolling_summary(db, user_id, axis_code, card_id)
+    except Exception as e:
+        logger.warning(f"会話の要約の更新に失敗しました: axis={axis_code} card={card_id}: {e}")
+
+
+def schedule_summary_refresh(context: ChatContext, saved_history: list[dict]) -> Optional[asyncio.Task]:
+    """要約されていないやり取りが chat_summary_batch_turns 往復たまっていれば要約をバックグラウンドで更新
+
+    saved_history は /chat の commit 後の履歴（append_messages の結果）
+    """
+    pending = _pending(saved_history, context.covered_message_id)
+    if len(pending) < max(settings.chat_summary_batch_turns, 1) * 2 and not context.dropped:
+        return None
+    if not pending:
+        return None
+
+    key = (context.user_id, context.axis_code, context.card_id)
+    running = _refresh_tasks.get(key)
+    if running and not running.done():
+        # 実行中の要約が終われば、残りは次のターンで取り込む
+        return running
+    task = asyncio.create_task(_refresh_in_background(*key))
+    _refresh_tasks[key] = task
+    task.add_done_callback(lambda t: _refresh_tasks.pop(key, None) if _refresh_tasks.get(key) is t else None)
+    return task
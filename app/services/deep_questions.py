@@ -4,14 +4,13 @@ from typing import List
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.axis import PlanningAxis
 from app.models.deep_question import DeepAnswer, DeepQuestion
 from app.services.ai_client import answer_question as ai_answer_question
+from app.services.master_data import master_data
 
 
 async def _axis_name(session: AsyncSession, axis_code: str) -> str:
-    result = await session.execute(select(PlanningAxis).where(PlanningAxis.code == axis_code))
-    axis = result.scalar_one_or_none()
+    axis = (await master_data.get(session)).axis_by_code(axis_code)
     return axis.name if axis and axis.name else axis_code
 
 
@@ -5,8 +5,9 @@ from typing import Iterable, Optional
 from sqlalchemy import delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.axis import AxisScore, PlanningAxis
+from app.models.axis import AxisScore
 from app.models.detail_question import DetailQuestionAnswer
+from app.services.master_data import master_data
 
 OK_LINE = 5.0
 GROWTH_ZONE = 6.0
@@ -211,9 +212,9 @@ def get_detail_questions() -> list[dict[str, str]]:
 
 
 async def fetch_axis_meta(session: AsyncSession) -> dict[str, dict[str, str | int]]:
-    result = await session.execute(select(PlanningAxis))
+    data = await master_data.get(session)
     meta: dict[str, dict[str, str | int]] = {}
-    for axis in result.scalars():
+    for axis in data.axes:
         meta[axis.code] = {
             "id": axis.id,
             "name": axis.name or AXIS_DEFAULTS.get(axis.code, axis.code),
@@ -349,12 +350,11 @@ def pick_next_focus_axis(axis_scores: list[AxisScoreResult]) -> Optional[dict[st
     }
 
 
-async def calculate_axis_scores(
-    session: AsyncSession,
-    user_id: int,
+def compute_axis_scores(
     answers: dict[str, bool | None],
     axis_meta: dict[str, dict[str, str | int]],
 ) -> list[AxisScoreResult]:
+    """詳細質問の回答から軸スコアを計算する（DBへの書き込みなし。参照系はこちらを使う）"""
     axis_question_map = _build_axis_question_map()
     checkpoints = _build_axis_checkpoints(axis_question_map)
     results: list[AxisScoreResult] = []
@@ -389,6 +389,17 @@ async def calculate_axis_scores(
             )
         )
 
+    return results
+
+
+async def calculate_axis_scores(
+    session: AsyncSession,
+    user_id: int,
+    answers: dict[str, bool | None],
+    axis_meta: dict[str, dict[str, str | int]],
+) -> list[AxisScoreResult]:
+    """軸スコアを計算して axis_scores に保存する（回答の保存時など入力が変わったときだけ呼ぶ）"""
+    results = compute_axis_scores(answers, axis_meta)
     await _persist_axis_scores(session, user_id, results, axis_meta)
     return results
 
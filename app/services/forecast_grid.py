@@ -0,0 +1,127 @@
+"""Vectorized what-if sensitivity grid for the simple simulation forecast.
+
+``calculate_financial_forecast`` evaluates a single scenario. This module
+evaluates the same formulas over the cartesian product of seats, price
+point, occupancy rate, operating days and cost / labor ratios in a single
+NumPy broadcast, so grids of 100k+ scenarios take milliseconds.
+"""
+from __future__ import annotations
+
+import math
+from typing import Optional
+
+import numpy as np
+from fastapi import HTTPException, status
+
+from app.core.config import get_settings
+from app.schemas.simulation import ForecastGridRequest, ForecastGridResponse, GridRange
+from app.services.simulation import (
+    DEFAULT_OCCUPANCY_RATE,
+    DEFAULT_OPERATING_DAYS,
+    FINANCIAL_RATIO_BY_GENRE,
+    OTHER_COSTS_RATIO,
+)
+
+settings = get_settings()
+
+# surfaces の次元の順番
+GRID_AXES = ["seats", "price_point", "occupancy_rate", "operating_days", "cost_ratio", "labor_cost_ratio"]
+
+
+def _axis_length(spec: Optional[GridRange]) -> int:
+    """配列を作らずに軸の要素数を求める（上限チェックを割り当て前に行うため）"""
+    if spec is None:
+        return 1
+    if spec.values is not None:
+        return len(spec.values)
+    steps = (spec.stop - spec.start) / spec.step
+    if not math.isfinite(steps):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start/stop/step の範囲が大きすぎます",
+        )
+    # 浮動小数の誤差で stop が落ちないよう少しだけ余裕を持たせる
+    return math.floor(steps + 1e-9) + 1
+
+
+def _axis_values(spec: Optional[GridRange], default: float) -> np.ndarray:
+    if spec is None:
+        return np.array([default], dtype=np.float64)
+    if spec.values is not None:
+        return np.asarray(spec.values, dtype=np.float64)
+    return spec.start + spec.step * np.arange(_axis_length(spec), dtype=np.float64)
+
+
+def evaluate_forecast_grid(
+    axes: dict[str, np.ndarray],
+    target_profit_ratio: float,
+) -> dict[str, np.ndarray]:
+    """Evaluate the forecast formulas over every combination of ``axes``.
+
+    ``axes`` maps each name in ``GRID_AXES`` to a 1-D array. Returns arrays of
+    shape ``tuple(len(axes[name]) for name in GRID_AXES)``; the integer
+    metrics are truncated the same way as ``calculate_financial_forecast``.
+    """
+    seats, price, occupancy, days, cost, labor = np.meshgrid(
+        *(axes[name] for name in GRID_AXES), indexing="ij", sparse=True
+    )
+
+    monthly_sales = np.trunc(seats * price * days * occupancy)
+
+    max_rent_ratio = np.maximum(0.0, 100 - cost - labor - OTHER_COSTS_RATIO - target_profit_ratio)
+    estimated_rent = np.trunc(monthly_sales * max_rent_ratio / 100)
+
+    fixed_costs = estimated_rent + monthly_sales * OTHER_COSTS_RATIO / 100
+    variable_cost_ratio = (cost + labor) / 100
+    with np.errstate(divide="ignore", invalid="ignore"):
+        break_even_sales = np.where(
+            variable_cost_ratio < 1, np.trunc(fixed_costs / (1 - variable_cost_ratio)), 0.0
+        )
+
+    monthly_profit = monthly_sales * (1 - variable_cost_ratio) - fixed_costs
+
+    shape = tuple(len(axes[name]) for name in GRID_AXES)
+    return {
+        "monthly_sales": np.broadcast_to(monthly_sales, shape).astype(np.int64),
+        "estimated_rent": np.broadcast_to(estimated_rent, shape).astype(np.int64),
+        "break_even_sales": np.broadcast_to(break_even_sales, shape).astype(np.int64),
+        "monthly_profit": np.broadcast_to(np.trunc(monthly_profit), shape).astype(np.int64),
+    }
+
+
+def build_forecast_grid(payload: ForecastGridRequest) -> ForecastGridResponse:
+    """Evaluate a what-if grid request."""
+    ratios = FINANCIAL_RATIO_BY_GENRE.get(payload.main_genre, FINANCIAL_RATIO_BY_GENRE["default"])
+
+    shape = [_axis_length(getattr(payload, name)) for name in GRID_AXES]
+    scenario_count = math.prod(shape)
+    if scenario_count > settings.forecast_grid_max_scenarios:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=(
+                f"シナリオ数が上限を超えています ({scenario_count} > "
+                f"{settings.forecast_grid_max_scenarios})"
+            ),
+        )
+
+    axes = {
+        "seats": _axis_values(payload.seats, 0),
+        "price_point": _axis_values(payload.price_point, 0),
+        "occupancy_rate": _axis_values(payload.occupancy_rate, DEFAULT_OCCUPANCY_RATE),
+        "operating_days": _axis_values(payload.operating_days, DEFAULT_OPERATING_DAYS),
+        "cost_ratio": _axis_values(payload.cost_ratio, ratios["cost"]),
+        "labor_cost_ratio": _axis_values(payload.labor_cost_ratio, ratios["labor"]),
+    }
+    surfaces = evaluate_forecast_grid(axes, ratios["profit"])
+
+    return ForecastGridResponse(
+        main_genre=payload.main_genre,
+        axes={name: axes[name].tolist() for name in GRID_AXES},
+        shape=shape,
+        scenario_count=scenario_count,
+        surfaces={k: v.tolist() for k, v in surfaces.items()} if payload.include_surfaces else None,
+        summary={
+            k: {"min": float(v.min()), "max": float(v.max()), "mean": round(float(v.mean()), 1)}
+            for k, v in surfaces.items()
+        },
+    )
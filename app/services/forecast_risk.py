@@ -0,0 +1,196 @@
+"""Monte Carlo risk simulation for the simple simulation forecast.
+
+The deterministic forecast assumes a fixed occupancy, customer spend, cost
+ratio and rent. Here those inputs are sampled from configurable
+distributions (centered on the deterministic values by default) and every
+trial is evaluated in one vectorized NumPy pass. The result is P10/P50/P90
+bands for monthly sales and profit, and the probability that sales fall
+below the trial's break-even sales.
+
+A seeded ``numpy.random.Generator`` makes the result reproducible.
+"""
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.schemas.simulation import (
+    FinancialForecast,
+    ForecastRiskRequest,
+    ForecastRiskResponse,
+    PercentileBand,
+    RiskDistribution,
+)
+from app.services.simulation import (
+    DEFAULT_OCCUPANCY_RATE,
+    DEFAULT_OPERATING_DAYS,
+    FINANCIAL_RATIO_BY_GENRE,
+    OTHER_COSTS_RATIO,
+)
+
+settings = get_settings()
+
+
+@dataclass
+class RiskResult:
+    trials: int
+    seed: int
+    sales_percentiles: tuple[float, float, float]
+    profit_percentiles: tuple[float, float, float]
+    below_break_even_probability: float
+    elapsed_sec: float
+
+    @property
+    def trials_per_second(self) -> float:
+        return self.trials / self.elapsed_sec if self.elapsed_sec > 0 else float("inf")
+
+
+def sample(rng: np.random.Generator, dist: RiskDistribution, n: int) -> np.ndarray:
+    """Draw ``n`` samples from ``dist``."""
+    if dist.kind == "fixed":
+        return np.full(n, dist.value, dtype=np.float64)
+    if dist.kind == "uniform":
+        return rng.uniform(dist.low, dist.high, n)
+    if dist.kind == "triangular":
+        if dist.low == dist.high:
+            return np.full(n, dist.low, dtype=np.float64)
+        return rng.triangular(dist.low, dist.mode, dist.high, n)
+    if dist.kind == "lognormal":
+        # 実数空間の平均・標準偏差から対数正規分布のパラメータを求める
+        sigma2 = np.log1p((dist.std / dist.mean) ** 2)
+        values = rng.lognormal(np.log(dist.mean) - sigma2 / 2, np.sqrt(sigma2), n)
+    else:
+        values = rng.normal(dist.mean, dist.std, n)
+    if dist.low is not None or dist.high is not None:
+        values = np.clip(values, dist.low, dist.high)
+    return values
+
+
+def default_distributions(
+    price_point: float,
+    cost_ratio: float,
+    estimated_rent: float,
+) -> dict[str, RiskDistribution]:
+    """決定論的な予測値を中心とした既定の分布"""
+    return {
+        "occupancy_rate": RiskDistribution(
+            kind="normal", mean=DEFAULT_OCCUPANCY_RATE, std=0.12, low=0.05, high=1.0
+        ),
+        "customer_spend": RiskDistribution(
+            kind="normal", mean=price_point, std=price_point * 0.15, low=price_point * 0.3
+        ),
+        "cost_ratio": RiskDistribution(kind="normal", mean=cost_ratio, std=3.0, low=5.0, high=80.0),
+        "rent": RiskDistribution(
+            kind="triangular",
+            low=estimated_rent * 0.8,
+            mode=estimated_rent,
+            high=estimated_rent * 1.3,
+        ),
+    }
+
+
+def simulate_forecast_risk(
+    seats: int,
+    price_point: int,
+    main_genre: str = "default",
+    trials: Optional[int] = None,
+    seed: Optional[int] = None,
+    distributions: Optional[dict[str, Optional[RiskDistribution]]] = None,
+) -> RiskResult:
+    """Run the Monte Carlo simulation (all trials in one vectorized pass)."""
+    trials = trials or settings.forecast_risk_trials
+    seed = settings.forecast_risk_seed if seed is None else seed
+    ratios = FINANCIAL_RATIO_BY_GENRE.get(main_genre, FINANCIAL_RATIO_BY_GENRE["default"])
+    labor_ratio = ratios["labor"]
+
+    # 決定論的予測と同じ式で家賃上限（目安）を求め、家賃分布の中心にする
+    base_sales = seats * price_point * DEFAULT_OPERATING_DAYS * DEFAULT_OCCUPANCY_RATE
+    max_rent_ratio = max(0.0, 100 - ratios["cost"] - labor_ratio - OTHER_COSTS_RATIO - ratios["profit"])
+    dists = default_distributions(price_point, ratios["cost"], int(base_sales * max_rent_ratio / 100))
+    for name, dist in (distributions or {}).items():
+        if dist is not None:
+            dists[name] = dist
+
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    occupancy = sample(rng, dists["occupancy_rate"], trials)
+    spend = sample(rng, dists["customer_spend"], trials)
+    cost_ratio = sample(rng, dists["cost_ratio"], trials)
+    rent = sample(rng, dists["rent"], trials)
+
+    sales = seats * spend * DEFAULT_OPERATING_DAYS * occupancy
+    variable_cost_ratio = (cost_ratio + labor_ratio) / 100
+    fixed_costs = rent + sales * OTHER_COSTS_RATIO / 100
+    profit = sales * (1 - variable_cost_ratio) - fixed_costs
+    # 損益分岐売上 = 固定費 / (1 - 変動費率)。変動費率が100%以上なら常に分岐点未満
+    margin = 1 - variable_cost_ratio
+    with np.errstate(divide="ignore", invalid="ignore"):
+        break_even = np.where(margin > 0, fixed_costs / margin, np.inf)
+    below = float(np.mean(sales < break_even))
+
+    sales_p = np.percentile(sales, [10, 50, 90])
+    profit_p = np.percentile(profit, [10, 50, 90])
+    elapsed = time.perf_counter() - started
+
+    return RiskResult(
+        trials=trials,
+        seed=seed,
+        sales_percentiles=tuple(float(v) for v in sales_p),
+        profit_percentiles=tuple(float(v) for v in profit_p),
+        below_break_even_probability=below,
+        elapsed_sec=elapsed,
+    )
+
+
+def run_forecast_risk(payload: ForecastRiskRequest) -> ForecastRiskResponse:
+    result = simulate_forecast_risk(
+        seats=payload.seats,
+        price_point=payload.price_point,
+        main_genre=payload.main_genre,
+        trials=payload.trials,
+        seed=payload.seed,
+        distributions={
+            "occupancy_rate": payload.occupancy_rate,
+            "customer_spend": payload.customer_spend,
+            "cost_ratio": payload.cost_ratio,
+            "rent": payload.rent,
+        },
+    )
+    p10, p50, p90 = result.sales_percentiles
+    q10, q50, q90 = result.profit_percentiles
+    return ForecastRiskResponse(
+        trials=result.trials,
+        seed=result.seed,
+        monthly_sales=PercentileBand(p10=round(p10), p50=round(p50), p90=round(p90)),
+        monthly_profit=PercentileBand(p10=round(q10), p50=round(q50), p90=round(q90)),
+        below_break_even_probability=round(result.below_break_even_probability, 4),
+        trials_per_second=round(result.trials_per_second),
+    )
+
+
+def attach_risk_to_forecast(forecast: FinancialForecast, profile: dict) -> FinancialForecast:
+    """シミュレーション結果の FinancialForecast にリスク評価を付与する（無効時はそのまま）"""
+    if settings.forecast_risk_trials <= 0:
+        return forecast
+
+    seats = profile.get("seats", 0)
+    price_point = profile.get("price_point", 0)
+    seats = int(seats) if str(seats).isdigit() else 20
+    price_point = int(price_point) if str(price_point).isdigit() else 3000
+    if seats <= 0 or price_point <= 0:
+        return forecast
+
+    result = simulate_forecast_risk(seats, price_point, profile.get("main_genre", "default"))
+    p10, p50, p90 = result.profit_percentiles
+    return forecast.model_copy(
+        update={
+            "profit_p10": int(p10),
+            "profit_p50": int(p50),
+            "profit_p90": int(p90),
+            "below_break_even_probability": round(result.below_break_even_probability, 4),
+        }
+    )
@@ -0,0 +1,228 @@
+"""Prompt-keyed response cache for non-streaming AI completions.
+
+The cache key is a SHA-256 of (deployment, messages, max_tokens, temperature),
+so identical ``/summary`` or ``/api/report`` requests are served without a new
+LLM round trip. Two backends are provided:
+
+- ``MemoryResponseCache``: in-process LRU with TTL
+- ``SQLiteResponseCache``: local SQLite file that survives restarts
+
+Both track hit/miss counters, exposed at ``/health/llm``.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Iterator, Optional
+
+from app.core.config import get_settings
+
+
+def make_cache_key(
+    deployment: str,
+    messages: list[dict],
+    max_tokens: int,
+    temperature: float,
+) -> str:
+    """Stable fingerprint of a chat completion request."""
+    payload = json.dumps(
+        {
+            "deployment": deployment,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+        },
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    sets: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class ResponseCache:
+    """Base class: subclasses implement ``_get`` / ``_set``."""
+
+    backend = "none"
+
+    def __init__(self, ttl_sec: int, max_entries: int) -> None:
+        self.ttl_sec = ttl_sec
+        self.max_entries = max_entries
+        self.stats = CacheStats()
+
+    async def get(self, key: str) -> Optional[str]:
+        value = await self._get(key)
+        if value is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return value
+
+    async def set(self, key: str, value: str) -> None:
+        await self._set(key, value)
+        self.stats.sets += 1
+
+    async def _get(self, key: str) -> Optional[str]:
+        return None
+
+    async def _set(self, key: str, value: str) -> None:
+        return None
+
+    def snapshot(self) -> dict:
+        data = asdict(self.stats)
+        data["hit_ratio"] = round(self.stats.hit_ratio, 3)
+        data["backend"] = self.backend
+        return data
+
+
+class NullResponseCache(ResponseCache):
+    """キャッシュ無効時の実装（常にミス）"""
+
+
+class MemoryResponseCache(ResponseCache):
+    """In-process LRU cache with per-entry TTL."""
+
+    backend = "memory"
+
+    def __init__(self, ttl_sec: int, max_entries: int) -> None:
+        super().__init__(ttl_sec, max_entries)
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+    async def _get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def _set(self, key: str, value: str) -> None:
+        self._entries[key] = (time.time() + self.ttl_sec, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+
+class SQLiteResponseCache(ResponseCache):
+    """SQLite-file cache that survives process restarts.
+
+    LRU order is tracked with ``last_access``; sqlite3 calls run in a worker
+    thread so the event loop is never blocked on disk I/O.
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, path: str, ttl_sec: int, max_entries: int) -> None:
+        super().__init__(ttl_sec, max_entries)
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_llm_cache_last_access ON llm_cache (last_access)"
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:  # commit / rollback
+                yield conn
+        finally:
+            conn.close()
+
+    def _get_sync(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at < now:
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            return value
+
+    def _set_sync(self, key: str, value: str) -> int:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO llm_cache (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT(key) DO UPDATE SET value = excluded.value,"
+                " expires_at = excluded.expires_at, last_access = excluded.last_access",
+                (key, value, now + self.ttl_sec, now),
+            )
+            conn.execute("DELETE FROM llm_cache WHERE expires_at < ?", (now,))
+            (count,) = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+            overflow = count - self.max_entries
+            if overflow > 0:
+                conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN ("
+                    " SELECT key FROM llm_cache ORDER BY last_access ASC LIMIT ?)",
+                    (overflow,),
+                )
+                return overflow
+        return 0
+
+    async def _get(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self._get_sync, key)
+
+    async def _set(self, key: str, value: str) -> None:
+        evicted = await asyncio.to_thread(self._set_sync, key, value)
+        self.stats.evictions += evicted
+
+
+def build_response_cache(
+    backend: str,
+    ttl_sec: int,
+    max_entries: int,
+    path: str,
+) -> ResponseCache:
+    """設定値からキャッシュバックエンドを生成"""
+    if backend == "memory":
+        return MemoryResponseCache(ttl_sec, max_entries)
+    if backend == "sqlite":
+        return SQLiteResponseCache(path, ttl_sec, max_entries)
+    return NullResponseCache(ttl_sec, max_entries)
+
+
+_settings = get_settings()
+
+response_cache = build_response_cache(
+    backend=_settings.llm_cache_backend,
+    ttl_sec=_settings.llm_cache_ttl_sec,
+    max_entries=_settings.llm_cache_max_entries,
+    path=_settings.llm_cache_path,
+)
@@ -0,0 +1,146 @@
+"""Bounded-concurrency scheduler for Azure OpenAI calls.
+
+Every LLM request acquires a slot here before talking to Azure. A global
+semaphore and a per-deployment semaphore cap the number of in-flight calls;
+callers that cannot get a slot wait in a bounded queue. When the queue is
+full (or the wait exceeds the timeout) the caller gets an immediate
+``LLMQueueFullError`` (HTTP 503 + Retry-After) instead of piling onto Azure
+and hitting 429s.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass
+from typing import AsyncIterator
+
+from fastapi import HTTPException, status
+
+from app.core.config import get_settings
+
+
+class LLMQueueFullError(HTTPException):
+    """LLM待ち行列が満杯（またはタイムアウト）のときに送出する 503 エラー"""
+
+    def __init__(self, retry_after: int, detail: str | None = None) -> None:
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=detail or "AIが混み合っています。しばらくしてから再試行してください。",
+            headers={"Retry-After": str(retry_after)},
+        )
+        self.retry_after = retry_after
+
+
+@dataclass
+class SchedulerStats:
+    """スケジューラのメトリクス（/health/llm で参照）"""
+
+    admitted: int = 0
+    rejected: int = 0
+    timed_out: int = 0
+    completed: int = 0
+    in_flight: int = 0
+    waiting: int = 0
+    total_queue_ms: float = 0.0
+    max_queue_ms: float = 0.0
+    last_queue_ms: float = 0.0
+
+    @property
+    def avg_queue_ms(self) -> float:
+        return self.total_queue_ms / self.admitted if self.admitted else 0.0
+
+
+class LLMScheduler:
+    """Global + per-deployment concurrency limiter with a bounded wait queue."""
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_concurrency_per_deployment: int,
+        max_queue: int,
+        queue_timeout_sec: float,
+        retry_after_sec: int,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.max_concurrency_per_deployment = max_concurrency_per_deployment
+        self.max_queue = max_queue
+        self.queue_timeout_sec = queue_timeout_sec
+        self.retry_after_sec = retry_after_sec
+        self._global = asyncio.Semaphore(max_concurrency)
+        self._deployments: dict[str, asyncio.Semaphore] = {}
+        self.stats = SchedulerStats()
+
+    def _deployment_semaphore(self, deployment: str) -> asyncio.Semaphore:
+        sem = self._deployments.get(deployment)
+        if sem is None:
+            sem = asyncio.Semaphore(self.max_concurrency_per_deployment)
+            self._deployments[deployment] = sem
+        return sem
+
+    async def _acquire_both(self, deployment_sem: asyncio.Semaphore) -> None:
+        # デプロイメント枠 → グローバル枠の順に取得（取得順を固定してデッドロックを防ぐ）
+        await deployment_sem.acquire()
+        try:
+            await self._global.acquire()
+        except BaseException:
+            deployment_sem.release()
+            raise
+
+    @asynccontextmanager
+    async def slot(self, deployment: str) -> AsyncIterator[None]:
+        """Hold one LLM slot for the duration of the ``async with`` block."""
+        deployment_sem = self._deployment_semaphore(deployment)
+        started = time.perf_counter()
+
+        if not deployment_sem.locked() and not self._global.locked():
+            # 空きがあれば待ち行列を通さずに即時取得
+            await self._acquire_both(deployment_sem)
+        else:
+            if self.stats.waiting >= self.max_queue:
+                self.stats.rejected += 1
+                raise LLMQueueFullError(self.retry_after_sec)
+
+            self.stats.waiting += 1
+            try:
+                await asyncio.wait_for(
+                    self._acquire_both(deployment_sem), timeout=self.queue_timeout_sec
+                )
+            except asyncio.TimeoutError:
+                self.stats.timed_out += 1
+                raise LLMQueueFullError(self.retry_after_sec)
+            finally:
+                self.stats.waiting -= 1
+
+        queue_ms = (time.perf_counter() - started) * 1000
+        self.stats.admitted += 1
+        self.stats.total_queue_ms += queue_ms
+        self.stats.last_queue_ms = queue_ms
+        self.stats.max_queue_ms = max(self.stats.max_queue_ms, queue_ms)
+        self.stats.in_flight += 1
+        try:
+            yield
+        finally:
+            self.stats.in_flight -= 1
+            self.stats.completed += 1
+            self._global.release()
+            deployment_sem.release()
+
+    def snapshot(self) -> dict:
+        data = asdict(self.stats)
+        data["avg_queue_ms"] = round(self.stats.avg_queue_ms, 2)
+        data["max_concurrency"] = self.max_concurrency
+        data["max_concurrency_per_deployment"] = self.max_concurrency_per_deployment
+        data["max_queue"] = self.max_queue
+        return data
+
+
+_settings = get_settings()
+
+llm_scheduler = LLMScheduler(
+    max_concurrency=_settings.llm_max_concurrency,
+    max_concurrency_per_deployment=_settings.llm_max_concurrency_per_deployment,
+    max_queue=_settings.llm_max_queue,
+    queue_timeout_sec=_settings.llm_queue_timeout_sec,
+    retry_after_sec=_settings.llm_retry_after_sec,
+)
@@ -0,0 +1,156 @@
+"""Single-flight coalescing of identical in-flight LLM requests.
+
+Double-clicks on "要約" and frontend retries often put the same prompt in
+flight several times at once. Callers sharing a prompt fingerprint share one
+upstream call:
+
+- ``SingleFlight``: non-streaming; every caller awaits the same task.
+- ``StreamFlight``: streaming; the upstream stream is pumped by a background
+  task into a buffer. Late joiners first get the chunks emitted so far
+  replayed, then follow the live stream.
+
+The upstream call runs in its own task, so one caller disconnecting does not
+cancel the call for the others.
+"""
+from __future__ import annotations
+
+import asyncio
+from dataclasses import asdict, dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class FlightStats:
+    leaders: int = 0
+    coalesced: int = 0
+
+
+def _consume_exception(task: asyncio.Task) -> None:
+    # 誰も待っていないタスクの例外で "never retrieved" 警告を出さない
+    if not task.cancelled():
+        task.exception()
+
+
+class SingleFlight:
+    """Coalesce concurrent awaitables that share a key."""
+
+    def __init__(self) -> None:
+        self._tasks: dict[str, asyncio.Task] = {}
+        self.stats = FlightStats()
+
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._tasks.get(key)
+        if task is None:
+            self.stats.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+            task.add_done_callback(_consume_exception)
+        else:
+            self.stats.coalesced += 1
+        # shield: 呼び出し元がキャンセルされても共有タスクは止めない
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+
+
+@dataclass
+class _Broadcast:
+    chunks: list[str] = field(default_factory=list)
+    done: bool = False
+    error: Optional[BaseException] = None
+    subscribers: int = 0
+    changed: asyncio.Condition = field(default_factory=asyncio.Condition)
+    task: Optional[asyncio.Task] = None
+
+
+class StreamFlight:
+    """Share one upstream stream between concurrent subscribers."""
+
+    def __init__(self) -> None:
+        self._streams: dict[str, _Broadcast] = {}
+        self.stats = FlightStats()
+
+    def in_flight(self) -> int:
+        return len(self._streams)
+
+    async def _pump(
+        self,
+        key: str,
+        broadcast: _Broadcast,
+        source: Callable[[], AsyncIterator[str]],
+    ) -> None:
+        upstream = source()
+        try:
+            async for chunk in upstream:
+                async with broadcast.changed:
+                    broadcast.chunks.append(chunk)
+                    broadcast.changed.notify_all()
+        except BaseException as exc:  # CancelledError も購読者に伝える
+            broadcast.error = exc
+            if not isinstance(exc, Exception):
+                raise
+        finally:
+            await upstream.aclose()
+            if self._streams.get(key) is broadcast:
+                del self._streams[key]
+            async with broadcast.changed:
+                broadcast.done = True
+                broadcast.changed.notify_all()
+
+    async def subscribe(
+        self,
+        key: str,
+        source: Callable[[], AsyncIterator[str]],
+    ) -> AsyncIterator[str]:
+        broadcast = self._streams.get(key)
+        if broadcast is None:
+            self.stats.leaders += 1
+            broadcast = _Broadcast()
+            self._streams[key] = broadcast
+            broadcast.task = asyncio.ensure_future(self._pump(key, broadcast, source))
+            broadcast.task.add_done_callback(_consume_exception)
+        else:
+            self.stats.coalesced += 1
+
+        broadcast.subscribers += 1
+        position = 0
+        try:
+            while True:
+                # 既に受信済みのチャンクを再生してから、ライブのチャンクを待つ
+                while position < len(broadcast.chunks):
+                    yield broadcast.chunks[position]
+                    position += 1
+                if broadcast.done:
+                    if broadcast.error is not None:
+                        raise broadcast.error
+                    return
+                async with broadcast.changed:
+                    await broadcast.changed.wait_for(
+                        lambda: broadcast.done or len(broadcast.chunks) > position
+                    )
+        finally:
+            broadcast.subscribers -= 1
+            # 全員が離脱したら上流の生成も止める（無駄なトークン消費を防ぐ）
+            if broadcast.subscribers == 0 and not broadcast.done and broadcast.task:
+                if self._streams.get(key) is broadcast:
+                    del self._streams[key]
+                broadcast.task.cancel()
+
+
+def flight_snapshot() -> dict:
+    return {
+        "completion": asdict(completion_flight.stats) | {"in_flight": completion_flight.in_flight()},
+        "stream": asdict(stream_flight.stats) | {"in_flight": stream_flight.in_flight()},
+    }
+
+
+completion_flight = SingleFlight()
+stream_flight = StreamFlight()
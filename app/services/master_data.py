@@ -0,0 +1,196 @@
+"""Process-wide cache of the planning axis master data.
+
+``planning_axes`` and ``axis_steps`` are seeded once by
+``seed_master_data.py`` and almost never change, yet nearly every request
+looked them up. ``master_data.get(db)`` loads both tables once into an
+immutable ``MasterData`` with typed lookups by code and id.
+
+Each load bumps ``version``. Changes are picked up either through the admin
+endpoint (``POST /admin/master-data/reload``) or by a periodic marker check
+(row counts and max ids of both tables, one cheap query every
+``master_data_check_interval_sec``). The marker catches rows being added or
+removed; edits to existing rows need the admin reload.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.models.axis import AxisStep, PlanningAxis
+
+
+@dataclass(frozen=True)
+class AxisInfo:
+    id: int
+    code: str
+    name: str
+    description: str
+    display_order: int
+
+
+@dataclass(frozen=True)
+class StepInfo:
+    id: int
+    axis_id: int
+    level: int
+    code: str
+    title: str
+    description: str
+    display_order: int
+
+
+@dataclass(frozen=True)
+class MasterData:
+    version: int
+    marker: tuple
+    axes: tuple[AxisInfo, ...]  # display_order 順
+    steps: tuple[StepInfo, ...]  # display_order 順
+    # 内容のハッシュ（プロセス間で共通。ETag に含めて再読み込み後の 304 を防ぐ）
+    digest: str = ""
+    _by_code: dict[str, AxisInfo] = field(default_factory=dict, repr=False)
+    _by_id: dict[int, AxisInfo] = field(default_factory=dict, repr=False)
+    _steps_by_axis: dict[int, tuple[StepInfo, ...]] = field(default_factory=dict, repr=False)
+
+    @classmethod
+    def build(cls, version: int, marker: tuple, axes: list[AxisInfo], steps: list[StepInfo]) -> "MasterData":
+        axes = sorted(axes, key=lambda a: (a.display_order, a.id))
+        steps = sorted(steps, key=lambda s: (s.display_order, s.id))
+        steps_by_axis: dict[int, list[StepInfo]] = {}
+        for step in steps:
+            steps_by_axis.setdefault(step.axis_id, []).append(step)
+        return cls(
+            version=version,
+            marker=marker,
+            axes=tuple(axes),
+            steps=tuple(steps),
+            digest=hashlib.sha1(repr((axes, steps)).encode("utf-8")).hexdigest()[:12],
+            _by_code={a.code: a for a in axes},
+            _by_id={a.id: a for a in axes},
+            _steps_by_axis={k: tuple(v) for k, v in steps_by_axis.items()},
+        )
+
+    def axis_by_code(self, code: Optional[str]) -> Optional[AxisInfo]:
+        return self._by_code.get(code) if code else None
+
+    def axis_by_id(self, axis_id: int) -> Optional[AxisInfo]:
+        return self._by_id.get(axis_id)
+
+    def steps_for(self, axis_id: int) -> tuple[StepInfo, ...]:
+        return self._steps_by_axis.get(axis_id, ())
+
+    def axis_id_map(self) -> dict[str, int]:
+        return {a.code: a.id for a in self.axes}
+
+
+def _marker_query():
+    # 件数と最大IDを1往復で取得する
+    return select(
+        select(func.count(PlanningAxis.id)).scalar_subquery(),
+        select(func.max(PlanningAxis.id)).scalar_subquery(),
+        select(func.count(AxisStep.id)).scalar_subquery(),
+        select(func.max(AxisStep.id)).scalar_subquery(),
+    )
+
+
+class MasterDataCache:
+    def __init__(self, check_interval_sec: float) -> None:
+        self.check_interval_sec = check_interval_sec
+        self._data: Optional[MasterData] = None
+        self._checked_at = 0.0
+        self._version = 0
+        self._lock = asyncio.Lock()
+        self.loads = 0
+        self.checks = 0
+
+    async def get(self, db: AsyncSession) -> MasterData:
+        """キャッシュ済みのマスタを返す（未読み込み・目印の変化時のみDBを参照）"""
+        data = self._data
+        if data is not None and not self._check_due():
+            return data
+
+        async with self._lock:
+            # ロック待ちの間に他のリクエストが読み込んでいれば再確認しない
+            if self._data is not None and not self._check_due():
+                return self._data
+            marker = tuple((await db.execute(_marker_query())).one())
+            self.checks += 1
+            self._checked_at = time.monotonic()
+            if self._data is None or self._data.marker != marker:
+                self._load_result(await self._load(db, marker))
+            return self._data
+
+    async def reload(self, db: AsyncSession) -> MasterData:
+        """目印に関係なく読み込み直す（管理APIから呼ぶ）"""
+        async with self._lock:
+            marker = tuple((await db.execute(_marker_query())).one())
+            self._checked_at = time.monotonic()
+            self._load_result(await self._load(db, marker))
+            return self._data
+
+    def invalidate(self) -> None:
+        self._data = None
+
+    def digest(self) -> str:
+        """読み込み済みマスタの内容ハッシュ（DBは参照しない。未読み込みなら空文字）"""
+        return self._data.digest if self._data is not None else ""
+
+    def snapshot(self) -> dict:
+        data = self._data
+        return {
+            "loaded": data is not None,
+            "version": data.version if data else None,
+            "axes": len(data.axes) if data else 0,
+            "steps": len(data.steps) if data else 0,
+            "loads": self.loads,
+            "checks": self.checks,
+        }
+
+    def _check_due(self) -> bool:
+        if self.check_interval_sec <= 0:
+            return False
+        return time.monotonic() - self._checked_at >= self.check_interval_sec
+
+    def _load_result(self, data: MasterData) -> None:
+        self._data = data
+        self.loads += 1
+
+    async def _load(self, db: AsyncSession, marker: tuple) -> MasterData:
+        axes_result = await db.execute(select(PlanningAxis))
+        steps_result = await db.execute(select(AxisStep))
+        self._version += 1
+        return MasterData.build(
+            version=self._version,
+            marker=marker,
+            axes=[
+                AxisInfo(
+                    id=a.id,
+                    code=a.code,
+                    name=a.name,
+                    description=a.description or "",
+                    display_order=a.display_order or 0,
+                )
+                for a in axes_result.scalars()
+            ],
+            steps=[
+                StepInfo(
+                    id=s.id,
+                    axis_id=s.axis_id,
+                    level=s.level,
+                    code=s.code,
+                    title=s.title,
+                    description=s.description or "",
+                    display_order=s.display_order or 0,
+                )
+                for s in steps_result.scalars()
+            ],
+        )
+
+
+master_data = MasterDataCache(check_interval_sec=get_settings().master_data_check_interval_sec)
@@ -0,0 +1,111 @@
+"""Profile-fingerprint cache for simple simulation AI texts.
+
+The simple simulation profile space is small (genre × sub-genre × location ×
+hours × a handful of seat / price buckets), so store stories and advice
+texts generated for one session can be reused for any session with the same
+normalized profile. Prompts whose output is cached this way must describe
+seats and price by their bucket (``bucket_label``), not the exact numbers,
+or one user's figures would be replayed to everyone in the same bucket.
+
+Each fingerprint has ``variants`` slots. A lookup picks a random slot: an
+empty slot is a miss and the caller fills it with a fresh generation, so up
+to ``variants`` different texts accumulate per profile and users with the
+same profile do not all see the identical text. Storage reuses the
+``ResponseCache`` backends (TTL + LRU eviction, memory or SQLite).
+"""
+from __future__ import annotations
+
+import bisect
+import hashlib
+import json
+import random
+from typing import Optional
+
+from app.core.config import get_settings
+from app.services.llm_cache import ResponseCache, build_response_cache
+
+# 席数・客単価のバケット境界（境界値以上で次のバケット）
+SEAT_BUCKETS = [10, 20, 30, 50, 80]
+PRICE_BUCKETS = [1000, 2000, 3000, 5000, 8000, 12000]
+
+
+def _to_int(value) -> Optional[int]:
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value.strip())
+    return None
+
+
+def _bucket(value, edges: list[int]) -> Optional[int]:
+    number = _to_int(value)
+    if number is None:
+        return None
+    return bisect.bisect_right(edges, number)
+
+
+def bucket_label(value, edges: list[int], unit: str) -> Optional[str]:
+    """Describe the bucket of ``value`` (e.g. ``20〜29席``) for prompts whose output is cached per bucket."""
+    bucket = _bucket(value, edges)
+    if bucket is None:
+        return None
+    if bucket == 0:
+        return f"{edges[0]:,}{unit}未満"
+    if bucket == len(edges):
+        return f"{edges[-1]:,}{unit}以上"
+    return f"{edges[bucket - 1]:,}〜{edges[bucket] - 1:,}{unit}"
+
+
+def normalize_profile(profile: dict) -> dict:
+    """Reduce a store profile to the fields that shape the generated texts."""
+    return {
+        "main_genre": profile.get("main_genre") or "",
+        "sub_genre": profile.get("sub_genre") or "",
+        "location": profile.get("location") or "",
+        "business_hours": profile.get("business_hours") or "",
+        "seats_bucket": _bucket(profile.get("seats"), SEAT_BUCKETS),
+        "price_bucket": _bucket(profile.get("price_point"), PRICE_BUCKETS),
+    }
+
+
+def profile_fingerprint(profile: dict) -> str:
+    payload = json.dumps(normalize_profile(profile), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ProfileCache:
+    """Variant slots of generated texts keyed by profile fingerprint."""
+
+    def __init__(self, store: ResponseCache, variants: int) -> None:
+        self.store = store
+        self.variants = max(1, variants)
+
+    def slot_key(self, kind: str, fingerprint: str, slot: int) -> str:
+        return f"{kind}:{fingerprint}:{slot}"
+
+    async def lookup(self, kind: str, profile: dict) -> tuple[Optional[str], str]:
+        """Return ``(cached_text_or_None, key_to_store_a_fresh_text_under)``."""
+        slot = random.randrange(self.variants)
+        key = self.slot_key(kind, profile_fingerprint(profile), slot)
+        return await self.store.get(key), key
+
+    async def store_text(self, key: str, value: str) -> None:
+        await self.store.set(key, value)
+
+    def snapshot(self) -> dict:
+        data = self.store.snapshot()
+        data["variants"] = self.variants
+        return data
+
+
+_settings = get_settings()
+
+profile_cache = ProfileCache(
+    store=build_response_cache(
+        backend=_settings.profile_cache_backend,
+        ttl_sec=_settings.profile_cache_ttl_sec,
+        max_entries=_settings.profile_cache_max_entries,
+        path=_settings.profile_cache_path,
+    ),
+    variants=_settings.profile_cache_variants,
+)
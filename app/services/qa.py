@@ -3,11 +3,11 @@ from datetime import datetime
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.axis import PlanningAxis
 from app.models.free_question import FreeQuestion
 from app.models.qa import QAContextType, QAConversation, QAMessage, QARole
 from app.schemas.qa import QAResponse
 from app.services.ai_client import answer_question as ai_answer_question
+from app.services.master_data import master_data
 
 
 async def handle_question(
@@ -19,8 +19,7 @@ async def handle_question(
 ) -> QAResponse:
     axis_id = None
     if context_type == QAContextType.AXIS.value and axis_code:
-        result = await db.execute(select(PlanningAxis).where(PlanningAxis.code == axis_code))
-        axis = result.scalar_one_or_none()
+        axis = (await master_data.get(db)).axis_by_code(axis_code)
         if axis:
             axis_id = axis.id
 
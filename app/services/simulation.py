@@ -1,8 +1,13 @@
 """Simulation service for simple simulation functionality."""
-from typing import Optional
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
 from app.services.ai_client import send_chat_completion
 from fastapi import HTTPException, status
-from sqlalchemy import select, delete
+from pydantic import ValidationError
+from sqlalchemy import select, delete, insert, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.simple_simulation import (
@@ -12,9 +17,27 @@ from app.models.simple_simulation import (
     SimpleSimulationSession,
     SimulationStatus,
 )
-from app.models.axis import PlanningAxis, AxisScore
-from app.schemas.simulation import FinancialForecast, SimulationResultResponse, SubmitSimulationRequest
+from app.models.axis import AxisScore
+from app.core.config import get_settings
+from app.core.upsert import upsert_stmt
+from app.core.user_version import bump_user_versions
+from app.schemas.simulation import (
+    FinancialForecast,
+    SimulationBatchItemResult,
+    SimulationResultResponse,
+    SubmitSimulationRequest,
+)
 from app.models.notes import StoreStory
+from app.services.master_data import master_data
+from app.services.profile_cache import profile_cache
+from app.services.store_story_jobs import (
+    STORE_STORY_MAX_LENGTH,
+    STORY_FALLBACK,
+    STORY_PENDING,
+    start_story_job,
+)
+
+logger = logging.getLogger(__name__)
 
 # Required fields for store profile
 REQUIRED_FIELDS = ["main_genre", "sub_genre", "seats", "price_point", "business_hours", "location"]
@@ -376,6 +399,11 @@ SNS映えするメニューや内装で、口コミ拡散を狙いましょう
 # 業態別比率マップ（収支予想用）
 # ========================================
 
+# 想定月商・経費の前提値
+DEFAULT_OPERATING_DAYS = 30
+DEFAULT_OCCUPANCY_RATE = 0.7
+OTHER_COSTS_RATIO = 15.0
+
 FINANCIAL_RATIO_BY_GENRE = {
     "izakaya": {"cost": 32.0, "labor": 28.0, "profit": 10.0},
     "ramen": {"cost": 30.0, "labor": 25.0, "profit": 12.0},
@@ -497,7 +525,7 @@ def calculate_financial_forecast(profile: dict) -> tuple[FinancialForecast, Fund
         price_point = int(price_point) if price_point.isdigit() else 3000
 
     # 1. 想定月商（70%稼働率）
-    monthly_sales = int(seats * price_point * 30 * 0.7)
+    monthly_sales = int(seats * price_point * DEFAULT_OPERATING_DAYS * DEFAULT_OCCUPANCY_RATE)
 
     # 2. 業態別比率を取得
     ratios = FINANCIAL_RATIO_BY_GENRE.get(main_genre, FINANCIAL_RATIO_BY_GENRE["default"])
@@ -506,7 +534,7 @@ def calculate_financial_forecast(profile: dict) -> tuple[FinancialForecast, Fund
     target_profit_ratio = ratios["profit"]
 
     # 3. その他経費率（固定）
-    other_costs_ratio = 15.0
+    other_costs_ratio = OTHER_COSTS_RATIO
 
     # 4. 家賃上限率を計算
     max_rent_ratio = 100 - cost_ratio - labor_cost_ratio - other_costs_ratio - target_profit_ratio
@@ -598,19 +626,87 @@ async def _generate_store_story_ai(profile: dict, concept_name: str) -> str:
     return (text or "").strip()
 
 
+async def _get_or_generate_store_story(profile: dict, concept_name: str) -> str:
+    """同じプロファイルで生成済みのストーリーがあれば再利用し、なければAIで生成する"""
+    cached, key = await profile_cache.lookup("story", profile)
+    if cached:
+        return cached
+    text = await _generate_store_story_ai(profile, concept_name)
+    if text:
+        await profile_cache.store_text(key, text)
+    return text
+
+
+# 同じセッションへの再送信で上書きする結果のカラム
+_RESULT_UPSERT_COLUMNS = [
+    "axis_scores",
+    "funds_comment_category",
+    "funds_comment_text",
+    "store_story_text",
+    "created_at",
+]
+
 async def _get_axis_id_map(db: AsyncSession) -> dict[str, int]:
-    """Get mapping of axis codes to axis IDs."""
-    result = await db.execute(select(PlanningAxis))
-    axes = result.scalars().all()
-    return {axis.code: axis.id for axis in axes}
+    """Get mapping of axis codes to axis IDs (from the master data cache)."""
+    return (await master_data.get(db)).axis_id_map()
 
 
-async def process_simulation_submission(
-    db: AsyncSession,
-    payload: SubmitSimulationRequest,
-    user_id: Optional[int],
-) -> SimulationResultResponse:
-    """Process simulation submission and return results."""
+async def _insert_axis_scores(db: AsyncSession, user_id: int, axis_scores: dict[str, float]) -> None:
+    """ユーザーの軸スコアを複数行 INSERT で保存"""
+    axis_map = await _get_axis_id_map(db)
+    rows = [
+        {
+            "user_id": user_id,
+            "axis_id": axis_map[axis_code],
+            "score": score,
+        }
+        for axis_code, score in axis_scores.items()
+        if axis_code in axis_map
+    ]
+    if rows:
+        await db.execute(insert(AxisScore).values(rows))
+
+
+@dataclass
+class _ComputedSimulation:
+    """DBに依存しない計算結果（単体・一括送信で共通）"""
+    profile: dict
+    axis_scores: dict[str, float]
+    concept_name: str
+    concept_sub_comment: str
+    financial_forecast: FinancialForecast
+    funds_category: FundsCommentCategory
+    funds_text: str
+    opening_notes: str
+    store_story_text: str
+
+    def to_response(self, session_id: int, story_status: str) -> SimulationResultResponse:
+        return SimulationResultResponse(
+            session_id=session_id,
+            axis_scores=self.axis_scores,
+            concept_name=self.concept_name,
+            concept_sub_comment=self.concept_sub_comment,
+            financial_forecast=self.financial_forecast,
+            opening_notes=self.opening_notes,
+            # 後方互換性フィールド
+            funds_comment_category=self.funds_category.value,
+            funds_comment_text=self.funds_text,
+            store_story_text=self.store_story_text,
+            store_story_status=story_status,
+            concept_title=MAIN_GENRE_LABELS.get(self.profile.get("main_genre", ""), ""),
+            concept_detail=SUB_GENRE_LABELS.get(self.profile.get("sub_genre", ""), ""),
+            funds_summary=self.funds_text,
+            monthly_sales=self.financial_forecast.monthly_sales,
+        )
+
+    def story_generator(self) -> Callable[[], Awaitable[str]]:
+        return lambda: _get_or_generate_store_story(self.profile, self.concept_name)
+
+
+def _compute_simulation(payload: SubmitSimulationRequest) -> _ComputedSimulation:
+    """Compute scores, forecast and the template story for one submission."""
+    # 循環 import を避けるため遅延 import
+    from app.services.forecast_risk import attach_risk_to_forecast
 
     # Convert answers to dict
     answers_dict = {item.question_code: item.values for item in payload.answers}
@@ -627,54 +723,51 @@ async def process_simulation_submission(
 
     # Calculate financial forecast
     financial_forecast, funds_category, funds_text = calculate_financial_forecast(profile)
+    financial_forecast = attach_risk_to_forecast(financial_forecast, profile)
 
     # Generate opening notes
     opening_notes = generate_opening_notes(profile)
     # Dashboard(CONCEPT) 用のテキスト（StoreStory.content に保存する元データ）
-    # 旧: store_story_text = "\n".join(...)
-    store_story_text = ""
-    try:
-        store_story_text = await _generate_store_story_ai(profile, concept_name)
-    except Exception:
-        store_story_text = ""
-
-    # フォールバック（AIが空ならテンプレ）
-    if not store_story_text:
-        store_story_text = "\n".join([
-            f"コンセプト名: {concept_name}",
-            f"補足: {concept_sub_comment}",
-            "",
-            "開業メモ:",
-            opening_notes,
-        ])
-
-    # 4096に収める
-    store_story_text = store_story_text[:4000]
-
-
-
-    # Build response
-    def build_response(session_id: int) -> SimulationResultResponse:
-        return SimulationResultResponse(
-            session_id=session_id,
-            axis_scores=axis_scores,
-            concept_name=concept_name,
-            concept_sub_comment=concept_sub_comment,
-            financial_forecast=financial_forecast,
-            opening_notes=opening_notes,
-            # 後方互換性フィールド
-            funds_comment_category=funds_category.value,
-            funds_comment_text=funds_text,
-            store_story_text=store_story_text,
-            concept_title=MAIN_GENRE_LABELS.get(profile.get("main_genre", ""), ""),
-            concept_detail=SUB_GENRE_LABELS.get(profile.get("sub_genre", ""), ""),
-            funds_summary=funds_text,
-            monthly_sales=financial_forecast.monthly_sales,
-        )
+    # AI生成はレスポンス後にバックグラウンドで行い、まずはテンプレ文を返す
+    store_story_text = "\n".join([
+        f"コンセプト名: {concept_name}",
+        f"補足: {concept_sub_comment}",
+        "",
+        "開業メモ:",
+        opening_notes,
+    ])
+
+    return _ComputedSimulation(
+        profile=profile,
+        axis_scores=axis_scores,
+        concept_name=concept_name,
+        concept_sub_comment=concept_sub_comment,
+        financial_forecast=financial_forecast,
+        funds_category=funds_category,
+        funds_text=funds_text,
+        opening_notes=opening_notes,
+        # 4096に収める
+        store_story_text=store_story_text[:STORE_STORY_MAX_LENGTH],
+    )
+
+
+async def process_simulation_submission(
+    db: AsyncSession,
+    payload: SubmitSimulationRequest,
+    user_id: Optional[int],
+) -> SimulationResultResponse:
+    """Process simulation submission and return results."""
+    # リスク評価のモンテカルロ（数万試行）を含むためイベントループを塞がないようスレッドで計算
+    computed = await asyncio.to_thread(_compute_simulation, payload)
+    axis_scores = computed.axis_scores
+    funds_category = computed.funds_category
+    funds_text = computed.funds_text
+    store_story_text = computed.store_story_text
+    build_response = computed.to_response
 
     # If no user and no guest token, return without saving
     if user_id is None and not payload.guest_session_token:
-        return build_response(0)
+        return build_response(0, STORY_FALLBACK)
 
     # Guest without token - require token
     if user_id is None and payload.guest_session_token == "":
@@ -683,78 +776,289 @@ async def process_simulation_submission(
             detail="Guest session token is required for saving results",
         )
 
-    # Check if session with same guest_session_token already exists
-    session_obj = None
-    if payload.guest_session_token:
+    if user_id is None:
+        # ゲストの再送信は guest_session_token をキーにセッションを UPSERT する
+        await db.execute(
+            upsert_stmt(
+                db,
+                SimpleSimulationSession,
+                {
+                    "user_id": None,
+                    "guest_session_token": payload.guest_session_token,
+                    "status": SimulationStatus.COMPLETED,
+                },
+                conflict_columns=["guest_session_token"],
+                # user_id は更新しない（ユーザーに紐づいたセッションを外さない）
+                update_columns=["status"],
+            )
+        )
         result = await db.execute(
-            select(SimpleSimulationSession).where(
+            select(SimpleSimulationSession.id, SimpleSimulationSession.user_id).where(
                 SimpleSimulationSession.guest_session_token == payload.guest_session_token
             )
         )
-        session_obj = result.scalar_one_or_none()
-
-    if session_obj:
-        # Update existing session
-        await db.execute(
-            delete(SimpleSimulationAnswer).where(
-                SimpleSimulationAnswer.session_id == session_obj.id
+        session_id, owner_id = result.one()
+        # ユーザーに紐づいたセッションはゲストとして上書きさせない（一括送信と同じ扱い）
+        if owner_id is not None:
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Session is already attached to a user",
             )
-        )
+        # 同じトークンでの再送信なら前回の回答を置き換える
         await db.execute(
-            delete(SimpleSimulationResult).where(
-                SimpleSimulationResult.session_id == session_obj.id
-            )
+            delete(SimpleSimulationAnswer).where(SimpleSimulationAnswer.session_id == session_id)
         )
-        session_obj.status = SimulationStatus.COMPLETED
-        session_obj.user_id = user_id
     else:
-        # Create new session
-        session_obj = SimpleSimulationSession(
-            user_id=user_id,
-            guest_session_token=payload.guest_session_token if not user_id else None,
-            status=SimulationStatus.COMPLETED,
-        )
-        db.add(session_obj)
-        await db.flush()
+        # Check if session with same guest_session_token already exists
+        session_id = None
+        if payload.guest_session_token:
+            result = await db.execute(
+                select(SimpleSimulationSession.id).where(
+                    SimpleSimulationSession.guest_session_token == payload.guest_session_token
+                )
+            )
+            session_id = result.scalar_one_or_none()
+
+        if session_id:
+            await db.execute(
+                delete(SimpleSimulationAnswer).where(SimpleSimulationAnswer.session_id == session_id)
+            )
+            await db.execute(
+                update(SimpleSimulationSession)
+                .where(SimpleSimulationSession.id == session_id)
+                .values(status=SimulationStatus.COMPLETED, user_id=user_id)
+            )
+        else:
+            result = await db.execute(
+                insert(SimpleSimulationSession).values(
+                    user_id=user_id,
+                    guest_session_token=None,
+                    status=SimulationStatus.COMPLETED,
+                )
+            )
+            session_id = result.inserted_primary_key[0]
 
     # Save answers
-    for item in payload.answers:
-        answer = SimpleSimulationAnswer(
-            session_id=session_obj.id,
-            question_code=item.question_code,
-            answer_values={"values": item.values},
+    if payload.answers:
+        await db.execute(
+            insert(SimpleSimulationAnswer).values(
+                [
+                    {
+                        "session_id": session_id,
+                        "question_code": item.question_code,
+                        "answer_values": {"values": item.values},
+                    }
+                    for item in payload.answers
+                ]
+            )
         )
-        db.add(answer)
 
-    # Save result
-    result_obj = SimpleSimulationResult(
-        session_id=session_obj.id,
-        axis_scores=axis_scores,
-        funds_comment_category=funds_category,
-        funds_comment_text=funds_text,
-        store_story_text=store_story_text,
+    # Save result（session_id の一意制約で UPSERT）
+    await db.execute(
+        upsert_stmt(
+            db,
+            SimpleSimulationResult,
+            {
+                "session_id": session_id,
+                "axis_scores": axis_scores,
+                "funds_comment_category": funds_category,
+                "funds_comment_text": funds_text,
+                "store_story_text": store_story_text,
+                "created_at": datetime.utcnow(),
+            },
+            conflict_columns=["session_id"],
+            update_columns=_RESULT_UPSERT_COLUMNS,
+        )
     )
-    db.add(result_obj)
 
     # If user is logged in, save axis scores
+    # (StoreStory はストーリー生成ジョブの完了時に保存する)
     if user_id:
-        story = (store_story_text or "").strip()
-        if story:
-            db.add(StoreStory(user_id=user_id, source="simple_simulation", content=story))
-        
-        axis_map = await _get_axis_id_map(db)
-        for axis_code, score in axis_scores.items():
-            if axis_code in axis_map:
-                axis_score = AxisScore(
-                    user_id=user_id,
-                    axis_id=axis_map[axis_code],
-                    score=score,
-                )
-                db.add(axis_score)
+        await _insert_axis_scores(db, user_id, axis_scores)
+        await bump_user_versions(db, [user_id])
 
     await db.commit()
 
-    return build_response(session_obj.id)
+    start_story_job(session_id, computed.story_generator(), fallback_text=store_story_text)
+    return build_response(session_id, STORY_PENDING)
+
+
+def _compute_batch(
+    items: list[dict],
+) -> tuple[list[Optional[SimulationBatchItemResult]], dict[int, tuple[SubmitSimulationRequest, _ComputedSimulation]]]:
+    """一括送信の各項目を検証・計算する（項目ごとのエラーは results に入れる）"""
+    results: list[Optional[SimulationBatchItemResult]] = [None] * len(items)
+    computed: dict[int, tuple[SubmitSimulationRequest, _ComputedSimulation]] = {}
+    seen_tokens: set[str] = set()
+
+    for index, raw in enumerate(items):
+        try:
+            payload = SubmitSimulationRequest.model_validate(raw)
+        except ValidationError as e:
+            results[index] = SimulationBatchItemResult(index=index, ok=False, error=str(e))
+            continue
+        token = payload.guest_session_token
+        if token and token in seen_tokens:
+            results[index] = SimulationBatchItemResult(
+                index=index, ok=False, error="guest_session_token is duplicated in this batch"
+            )
+            continue
+        if token:
+            seen_tokens.add(token)
+        try:
+            computed[index] = (payload, _compute_simulation(payload))
+        except Exception as e:
+            logger.warning(f"Batch simulation item {index} failed: {e}")
+            results[index] = SimulationBatchItemResult(index=index, ok=False, error=str(e))
+    return results, computed
+
+
+async def process_simulation_batch(
+    db: AsyncSession,
+    items: list[dict],
+) -> list[SimulationBatchItemResult]:
+    """Process many guest submissions at once.
+
+    Scores and forecasts are computed for every item first; then sessions,
+    answers and results are written with multi-row INSERTs in a single
+    transaction, and story generation is queued behind a concurrency cap.
+    Invalid items get a per-item error instead of failing the batch.
+    """
+    # 1. 入力検証と計算（DBアクセスなし。モンテカルロを含むためスレッドで実行）
+    results, computed = await asyncio.to_thread(_compute_batch, items)
+
+    # トークンなしは単体送信と同じく保存せずに結果だけ返す
+    to_save = {i: v for i, v in computed.items() if v[0].guest_session_token}
+    for index, (_, item) in computed.items():
+        if index not in to_save:
+            results[index] = SimulationBatchItemResult(
+                index=index, ok=True, result=item.to_response(0, STORY_FALLBACK)
+            )
+
+    if to_save:
+        tokens = [payload.guest_session_token for payload, _ in to_save.values()]
+
+        # 2. 既存セッション（同じトークンでの再送信）を一括取得
+        existing_rows = await db.execute(
+            select(
+                SimpleSimulationSession.id,
+                SimpleSimulationSession.guest_session_token,
+                SimpleSimulationSession.user_id,
+            ).where(SimpleSimulationSession.guest_session_token.in_(tokens))
+        )
+        session_ids: dict[str, int] = {}
+        for session_id, token, owner_id in existing_rows.all():
+            if owner_id is not None:
+                # ログインユーザーに紐付け済みのセッションは上書きしない
+                index = next(i for i, (p, _) in to_save.items() if p.guest_session_token == token)
+                results[index] = SimulationBatchItemResult(
+                    index=index, ok=False, error="Session is already attached to a user"
+                )
+                del to_save[index]
+            else:
+                session_ids[token] = session_id
+
+        reused_ids = list(session_ids.values())
+        if reused_ids:
+            await db.execute(
+                delete(SimpleSimulationAnswer).where(SimpleSimulationAnswer.session_id.in_(reused_ids))
+            )
+            await db.execute(
+                update(SimpleSimulationSession)
+                .where(SimpleSimulationSession.id.in_(reused_ids))
+                .values(status=SimulationStatus.COMPLETED)
+            )
+
+        # 3. 新規セッションを複数行 INSERT し、トークンで ID を引き直す
+        new_tokens = [
+            p.guest_session_token for p, _ in to_save.values() if p.guest_session_token not in session_ids
+        ]
+        if new_tokens:
+            await db.execute(
+                insert(SimpleSimulationSession),
+                [
+                    {"user_id": None, "guest_session_token": token, "status": SimulationStatus.COMPLETED}
+                    for token in new_tokens
+                ],
+            )
+            inserted = await db.execute(
+                select(SimpleSimulationSession.id, SimpleSimulationSession.guest_session_token).where(
+                    SimpleSimulationSession.guest_session_token.in_(new_tokens)
+                )
+            )
+            session_ids.update({token: session_id for session_id, token in inserted.all()})
+
+        # 4. 回答・結果を複数行 INSERT
+        answer_rows = []
+        result_rows = []
+        for payload, item in to_save.values():
+            session_id = session_ids[payload.guest_session_token]
+            answer_rows.extend(
+                {
+                    "session_id": session_id,
+                    "question_code": answer.question_code,
+                    "answer_values": {"values": answer.values},
+                }
+                for answer in payload.answers
+            )
+            result_rows.append(
+                {
+                    "session_id": session_id,
+                    "axis_scores": item.axis_scores,
+                    "funds_comment_category": item.funds_category,
+                    "funds_comment_text": item.funds_text,
+                    "store_story_text": item.store_story_text,
+                    "created_at": datetime.utcnow(),
+                }
+            )
+        if answer_rows:
+            await db.execute(insert(SimpleSimulationAnswer), answer_rows)
+        # 再送信分の結果は session_id の一意制約で上書きする
+        await db.execute(
+            upsert_stmt(
+                db,
+                SimpleSimulationResult,
+                result_rows,
+                conflict_columns=["session_id"],
+                update_columns=_RESULT_UPSERT_COLUMNS,
+            )
+        )
+        await db.commit()
+
+        # 5. ストーリー生成を同時実行数の上限付きでキューに積む
+        for index, (payload, item) in to_save.items():
+            session_id = session_ids[payload.guest_session_token]
+            start_story_job(
+                session_id,
+                _throttled(item.story_generator(), _batch_story_semaphore()),
+                fallback_text=item.store_story_text,
+            )
+            results[index] = SimulationBatchItemResult(
+                index=index, ok=True, result=item.to_response(session_id, STORY_PENDING)
+            )
+
+    return [r for r in results if r is not None]
+
+
+_story_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def _batch_story_semaphore() -> asyncio.Semaphore:
+    global _story_semaphore
+    if _story_semaphore is None:
+        _story_semaphore = asyncio.Semaphore(get_settings().simulation_batch_story_concurrency)
+    return _story_semaphore
+
+
+def _throttled(
+    generate: Callable[[], Awaitable[str]], semaphore: asyncio.Semaphore
+) -> Callable[[], Awaitable[str]]:
+    async def run() -> str:
+        async with semaphore:
+            return await generate()
+
+    return run
 
 
 async def attach_session_to_user(
@@ -793,15 +1097,7 @@ async def attach_session_to_user(
     # ▲追加ここまで
 
 
-    axis_map = await _get_axis_id_map(db)
-    for axis_code, score in sim_result.axis_scores.items():
-        if axis_code in axis_map:
-            axis_score = AxisScore(
-                user_id=user_id,
-                axis_id=axis_map[axis_code],
-                score=score,
-            )
-            db.add(axis_score)
+    await _insert_axis_scores(db, user_id, sim_result.axis_scores)
 
     await db.commit()
 
@@ -0,0 +1,321 @@
+"""AI advice generation for the simple simulation result page.
+
+Two generation modes are available (``simulation_advice_mode``):
+
+- ``parallel``: the five advice categories are streamed as separate
+  completions running concurrently, multiplexed in arrival order.
+- ``combined``: one completion returns all five sections separated by
+  ``<<category>>`` markers; ``AdviceSectionParser`` splits the token stream
+  back into categories as it arrives.
+
+Both yield ``(category, chunk)`` pairs, so the SSE endpoint does not care
+which mode produced them. ``stream_profile_advice`` puts the profile cache in
+front: a hit replays the stored texts immediately, a miss generates and
+stores the completed texts.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import re
+from typing import AsyncGenerator, AsyncIterator, Optional
+
+from app.core.config import get_settings
+from app.services.ai_client import _chat_completion_stream
+from app.services.profile_cache import PRICE_BUCKETS, SEAT_BUCKETS, bucket_label, profile_cache
+from app.services.simulation import LOCATION_LABELS, MAIN_GENRE_LABELS, SUB_GENRE_LABELS
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+
+# AI advice generation prompts for each category
+ADVICE_PROMPTS = {
+    "location": {
+        "event_name": "advice_location_delta",
+        "system": """あなたは飲食店開業の立地選定の専門家です。
+ユーザーの店舗プロファイルに基づいて、立地に関する具体的なアドバイスを提供してください。
+200〜300文字程度で、実用的で前向きなアドバイスを日本語で回答してください。""",
+    },
+    "hr": {
+        "event_name": "advice_hr_delta",
+        "system": """あなたは飲食店開業の人材採用・オペレーションの専門家です。
+ユーザーの店舗プロファイルに基づいて、人材採用とオペレーションに関する具体的なアドバイスを提供してください。
+200〜300文字程度で、実用的で前向きなアドバイスを日本語で回答してください。""",
+    },
+    "menu": {
+        "event_name": "advice_menu_delta",
+        "system": """あなたは飲食店開業のメニュー開発の専門家です。
+ユーザーの店舗プロファイルに基づいて、メニュー構成や価格設定に関する具体的なアドバイスを提供してください。
+200〜300文字程度で、実用的で前向きなアドバイスを日本語で回答してください。""",
+    },
+    "marketing": {
+        "event_name": "advice_marketing_delta",
+        "system": """あなたは飲食店開業の販促・マーケティングの専門家です。
+ユーザーの店舗プロファイルに基づいて、集客やSNS運用に関する具体的なアドバイスを提供してください。
+200〜300文字程度で、実用的で前向きなアドバイスを日本語で回答してください。""",
+    },
+    "funds": {
+        "event_name": "advice_funds_delta",
+        "system": """あなたは飲食店開業の資金計画の専門家です。
+ユーザーの店舗プロファイルに基づいて、資金調達や収支計画に関する具体的なアドバイスを提供してください。
+200〜300文字程度で、実用的で前向きなアドバイスを日本語で回答してください。""",
+    },
+}
+
+
+# 1回の呼び出しで5項目をまとめて生成するためのプロンプト（combined モード）
+COMBINED_ADVICE_SYSTEM = """あなたは飲食店開業の立地・人材採用・メニュー開発・販促・資金計画の専門家チームです。
+ユーザーの店舗プロファイルに基づいて、以下の5項目それぞれについて具体的なアドバイスを提供してください。
+各項目は200〜300文字程度で、実用的で前向きなアドバイスを日本語で回答してください。
+
+出力形式: 各項目の先頭に見出し行を1行だけ、次の順番でそのまま出力してください。見出し行以外の前置きや締めの文は不要です。
+<<location>>
+（立地に関するアドバイス）
+<<hr>>
+（人材採用とオペレーションに関するアドバイス）
+<<menu>>
+（メニュー構成や価格設定に関するアドバイス）
+<<marketing>>
+（集客やSNS運用に関するアドバイス）
+<<funds>>
+（資金調達や収支計画に関するアドバイス）"""
+
+
+def build_profile_description(profile: dict) -> str:
+    """Build a human-readable profile description for AI prompts."""
+    parts = []
+
+    # Genre
+    main_genre = profile.get("main_genre", "")
+    sub_genre = profile.get("sub_genre", "")
+    genre_label = MAIN_GENRE_LABELS.get(main_genre, main_genre)
+    sub_label = SUB_GENRE_LABELS.get(sub_genre, "")
+    if sub_label:
+        parts.append(f"業態: {sub_label}{genre_label}")
+    elif genre_label:
+        parts.append(f"業態: {genre_label}")
+
+    # Location
+    location = profile.get("location", "")
+    location_label = LOCATION_LABELS.get(location, location)
+    if location_label:
+        parts.append(f"立地: {location_label}")
+
+    # 席数・客単価はキャッシュキーと同じバケットで伝える（生成文は同じバケットの他ユーザーにも再利用される）
+    seats = bucket_label(profile.get("seats"), SEAT_BUCKETS, "席")
+    if seats:
+        parts.append(f"席数: {seats}")
+
+    price = bucket_label(profile.get("price_point"), PRICE_BUCKETS, "円")
+    if price:
+        parts.append(f"客単価: {price}")
+
+    # Business hours
+    hours = profile.get("business_hours", "")
+    if hours:
+        parts.append(f"営業時間: {hours}")
+
+    return "\n".join(parts) if parts else "情報なし"
+
+
+async def generate_advice_stream(
+    category: str, profile_desc: str
+) -> AsyncGenerator[str, None]:
+    """Generate streaming advice for a specific category."""
+    prompt_config = ADVICE_PROMPTS.get(category)
+    if not prompt_config:
+        yield ""
+        return
+
+    messages = _advice_messages(prompt_config["system"], profile_desc)
+    async for chunk in _chat_completion_stream(messages, max_tokens=512):
+        yield chunk
+
+
+def _advice_messages(system_prompt: str, profile_desc: str) -> list[dict]:
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": f"以下の店舗プロファイルに基づいてアドバイスをください:\n\n{profile_desc}"},
+    ]
+
+
+class AdviceFormatError(ValueError):
+    """The combined advice stream ended without any ``<<category>>`` marker."""
+
+
+class AdviceSectionParser:
+    """Incrementally split a ``<<category>>``-delimited stream into sections.
+
+    ``feed`` returns the ``(category, text)`` pieces that are safe to emit so
+    far. Text that might be the start of a marker split across chunks is held
+    back until the next chunk (or ``flush``) decides it. Text before the
+    first marker is discarded (and logged); if no marker ever arrives,
+    ``flush`` raises ``AdviceFormatError``, e.g. for an upstream error text.
+    """
+
+    def __init__(self, categories) -> None:
+        self._markers = [f"<<{category}>>" for category in categories]
+        self._pattern = re.compile("|".join(re.escape(m) for m in self._markers))
+        self._buffer = ""
+        self._section_start = False
+        self._preamble = ""
+        self.current: Optional[str] = None
+
+    def _held_back_from(self) -> int:
+        # 末尾がマーカーの途中で切れている可能性がある位置
+        longest = max(len(m) for m in self._markers)
+        for i in range(max(0, len(self._buffer) - longest + 1), len(self._buffer)):
+            tail = self._buffer[i:]
+            if any(marker.startswith(tail) for marker in self._markers):
+                return i
+        return len(self._buffer)
+
+    def _emit(self, text: str, out: list[tuple[str, str]]) -> None:
+        # 最初のマーカーより前の前置きは送らない（最初のマーカーか flush でログに残す）
+        if self.current is None:
+            self._preamble += text
+            return
+        if self._section_start:
+            text = text.lstrip()
+            if not text:
+                return
+            self._section_start = False
+        if text:
+            out.append((self.current, text))
+
+    def feed(self, text: str) -> list[tuple[str, str]]:
+        self._buffer += text
+        out: list[tuple[str, str]] = []
+        while True:
+            match = self._pattern.search(self._buffer)
+            if match is None:
+                break
+            self._emit(self._buffer[: match.start()].rstrip(), out)
+            if self.current is None and self._preamble.strip():
+                logger.warning(f"アドバイスの最初の見出しより前の出力を破棄しました: {self._preamble[:200]!r}")
+            self.current = match.group(0)[2:-2]
+            self._section_start = True
+            self._buffer = self._buffer[match.end():]
+
+        # 末尾の空白もセクション区切りの直前かもしれないので次のチャンクまで保留
+        cut = len(self._buffer[: self._held_back_from()].rstrip())
+        self._emit(self._buffer[:cut], out)
+        self._buffer = self._buffer[cut:]
+        return out
+
+    def flush(self) -> list[tuple[str, str]]:
+        out: list[tuple[str, str]] = []
+        self._emit(self._buffer.rstrip(), out)
+        self._buffer = ""
+        if self.current is None:
+            logger.error(f"アドバイスの出力に見出しがありません: {self._preamble[:200]!r}")
+            raise AdviceFormatError("アドバイスの生成結果を読み取れませんでした")
+        return out
+
+
+# カテゴリのストリーム終了を知らせる番兵
+_CATEGORY_DONE = object()
+
+
+async def stream_advice(
+    profile_desc: str,
+    mode: Optional[str] = None,
+) -> AsyncIterator[tuple[str, str]]:
+    """Stream advice for every category as ``(category, chunk)`` pairs."""
+    if (mode or settings.simulation_advice_mode) == "combined":
+        stream = stream_advice_combined(profile_desc)
+    else:
+        stream = stream_advice_parallel(profile_desc)
+    async for item in stream:
+        yield item
+
+
+async def stream_profile_advice(profile: dict) -> AsyncIterator[tuple[str, str]]:
+    """Stream advice for a store profile, served from the profile cache on a hit."""
+    cached, key = await profile_cache.lookup("advice", profile)
+    if cached:
+        for category, text in json.loads(cached).items():
+            if category in ADVICE_PROMPTS and text:
+                yield category, text
+        return
+
+    collected: dict[str, list[str]] = {category: [] for category in ADVICE_PROMPTS}
+    async for category, chunk in stream_advice(build_profile_description(profile)):
+        collected[category].append(chunk)
+        yield category, chunk
+
+    texts = {category: "".join(chunks).strip() for category, chunks in collected.items()}
+    if is_cacheable_advice(texts):
+        await profile_cache.store_text(key, json.dumps(texts, ensure_ascii=False))
+
+
+def is_cacheable_advice(texts: dict[str, str]) -> bool:
+    # 空・エラー文を含む生成結果はキャッシュしない
+    return all(
+        texts.get(category) and "[エラー:" not in texts[category] for category in ADVICE_PROMPTS
+    )
+
+
+async def generate_advice_texts(profile: dict) -> dict[str, str]:
+    """Generate the full advice text of every category (used by batch jobs)."""
+    collected: dict[str, list[str]] = {category: [] for category in ADVICE_PROMPTS}
+    async for category, chunk in stream_advice(build_profile_description(profile)):
+        collected[category].append(chunk)
+    return {category: "".join(chunks).strip() for category, chunks in collected.items()}
+
+
+async def stream_advice_combined(profile_desc: str) -> AsyncIterator[tuple[str, str]]:
+    """Generate all categories with a single completion and split its stream."""
+    parser = AdviceSectionParser(ADVICE_PROMPTS)
+    messages = _advice_messages(COMBINED_ADVICE_SYSTEM, profile_desc)
+    async for chunk in _chat_completion_stream(messages, max_tokens=512 * len(ADVICE_PROMPTS)):
+        for item in parser.feed(chunk):
+            yield item
+    for item in parser.flush():
+        yield item
+
+
+async def stream_advice_parallel(
+    profile_desc: str,
+    concurrency: Optional[int] = None,
+) -> AsyncIterator[tuple[str, str]]:
+    """Stream all advice categories concurrently.
+
+    Yields ``(category, chunk)`` in arrival order and returns once every
+    category has finished. At most ``concurrency`` categories talk to the LLM
+    at the same time for this request. If a category fails, the remaining
+    ones are cancelled and the error is re-raised to the caller.
+    """
+    limit = concurrency or settings.simulation_advice_concurrency
+    semaphore = asyncio.Semaphore(max(1, limit))
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def _produce(category: str) -> None:
+        try:
+            async with semaphore:
+                async for chunk in generate_advice_stream(category, profile_desc):
+                    await queue.put((category, chunk))
+        except Exception as exc:
+            await queue.put((category, exc))
+        finally:
+            await queue.put((category, _CATEGORY_DONE))
+
+    tasks = [asyncio.create_task(_produce(category)) for category in ADVICE_PROMPTS]
+    remaining = len(tasks)
+    try:
+        while remaining:
+            category, item = await queue.get()
+            if item is _CATEGORY_DONE:
+                remaining -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield category, item
+    finally:
+        # クライアント切断・エラー時は残りの生成を止める
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
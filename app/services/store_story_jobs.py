@@ -0,0 +1,137 @@
+"""Background generation of the simple simulation store story.
+
+``POST /simulations/simple/result`` returns right after the DB commit with
+the template story and ``store_story_status="pending"``. The AI story is
+generated here in a background task, then written to
+``SimpleSimulationResult.store_story_text`` (and ``StoreStory`` when the
+session belongs to a user). Clients poll ``/simulations/simple/story`` or
+listen on ``/simulations/simple/story-stream``.
+
+Job state lives in an in-process registry (like the mindmap SSE tickets);
+once a job expires from it, the status is read back from the DB.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import select, update
+
+from app.core.db import AsyncSessionLocal
+from app.models.notes import StoreStory
+from app.models.simple_simulation import SimpleSimulationResult, SimpleSimulationSession
+
+logger = logging.getLogger(__name__)
+
+STORY_PENDING = "pending"
+STORY_READY = "ready"
+STORY_FALLBACK = "fallback"  # AI生成に失敗しテンプレ文のまま
+
+STORY_JOB_TTL_SECONDS = 600
+STORE_STORY_MAX_LENGTH = 4000
+
+
+@dataclass
+class StoryJob:
+    session_id: int
+    status: str = STORY_PENDING
+    text: str = ""
+    expires_at: datetime = field(
+        default_factory=lambda: datetime.utcnow() + timedelta(seconds=STORY_JOB_TTL_SECONDS)
+    )
+    finished: asyncio.Event = field(default_factory=asyncio.Event)
+    task: Optional[asyncio.Task] = None
+
+
+_jobs: dict[int, StoryJob] = {}
+
+
+def _cleanup_expired_jobs() -> None:
+    """期限切れ（完了済み）のジョブを削除"""
+    now = datetime.utcnow()
+    expired = [k for k, v in _jobs.items() if v.expires_at < now and v.finished.is_set()]
+    for k in expired:
+        del _jobs[k]
+
+
+def get_story_job(session_id: int) -> Optional[StoryJob]:
+    _cleanup_expired_jobs()
+    return _jobs.get(session_id)
+
+
+async def _save_story(session_id: int, text: str, ai_generated: bool) -> None:
+    async with AsyncSessionLocal() as db:
+        if ai_generated:
+            await db.execute(
+                update(SimpleSimulationResult)
+                .where(SimpleSimulationResult.session_id == session_id)
+                .values(store_story_text=text)
+            )
+        # 生成中にゲスト→ログイン移行された場合も拾えるよう、完了時点の user_id を参照する
+        result = await db.execute(
+            select(SimpleSimulationSession.user_id).where(SimpleSimulationSession.id == session_id)
+        )
+        user_id = result.scalar_one_or_none()
+        if user_id and text.strip():
+            db.add(StoreStory(user_id=user_id, source="simple_simulation", content=text.strip()))
+        await db.commit()
+
+
+async def _run_story_job(
+    job: StoryJob,
+    generate: Callable[[], Awaitable[str]],
+    fallback_text: str,
+) -> None:
+    try:
+        text = ""
+        try:
+            text = ((await generate()) or "")[:STORE_STORY_MAX_LENGTH]
+        except Exception as e:
+            logger.warning(f"Store story generation failed for session {job.session_id}: {e}")
+
+        ai_generated = bool(text)
+        final_text = text or fallback_text
+        try:
+            await _save_story(job.session_id, final_text, ai_generated)
+        except Exception as e:
+            logger.error(f"Failed to save store story for session {job.session_id}: {e}")
+            ai_generated = False
+            final_text = fallback_text
+
+        job.text = final_text
+        job.status = STORY_READY if ai_generated else STORY_FALLBACK
+    finally:
+        # キャンセル（再送信による置き換え）時も待機中のストリームを起こす
+        job.expires_at = datetime.utcnow() + timedelta(seconds=STORY_JOB_TTL_SECONDS)
+        job.finished.set()
+
+
+def start_story_job(
+    session_id: int,
+    generate: Callable[[], Awaitable[str]],
+    fallback_text: str,
+) -> StoryJob:
+    """ストーリー生成をバックグラウンドで開始（同じセッションの前回ジョブは置き換える）"""
+    _cleanup_expired_jobs()
+    previous = _jobs.get(session_id)
+    if previous and previous.task and not previous.task.done():
+        previous.task.cancel()
+
+    job = StoryJob(session_id=session_id, text=fallback_text)
+    job.task = asyncio.create_task(_run_story_job(job, generate, fallback_text))
+    _jobs[session_id] = job
+    return job
+
+
+async def wait_for_story(session_id: int) -> Optional[StoryJob]:
+    """ジョブの完了を待つ（待機中に置き換えられた場合は新しいジョブを待つ）"""
+    while True:
+        job = get_story_job(session_id)
+        if job is None:
+            return None
+        await job.finished.wait()
+        if _jobs.get(session_id) is job or job.status != STORY_PENDING:
+            return job
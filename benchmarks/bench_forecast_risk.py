@@ -0,0 +1,42 @@
+"""
+モンテカルロ法リスク評価のベンチマーク
+試行回数ごとの処理時間と 1秒あたりの試行数を表示します
+
+使い方:
+  python benchmarks/bench_forecast_risk.py
+  python benchmarks/bench_forecast_risk.py --trials 100000 1000000 --repeat 5
+"""
+import argparse
+import statistics
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from app.services.forecast_risk import simulate_forecast_risk  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="forecast_risk ベンチマーク")
+    parser.add_argument("--trials", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--genre", default="izakaya")
+    args = parser.parse_args()
+
+    print(f"{'trials':>10} {'median ms':>10} {'trials/sec':>14} {'P50 profit':>12} {'P(<BE)':>8}")
+    for trials in args.trials:
+        results = [
+            simulate_forecast_risk(seats=30, price_point=3500, main_genre=args.genre, trials=trials, seed=42)
+            for _ in range(args.repeat)
+        ]
+        median_sec = statistics.median(r.elapsed_sec for r in results)
+        last = results[-1]
+        print(
+            f"{trials:>10,} {median_sec * 1000:>10.1f} {trials / median_sec:>14,.0f}"
+            f" {last.profit_percentiles[1]:>12,.0f} {last.below_break_even_probability:>8.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+簡易シミュレーション送信1件あたりの SQL 発行数のベンチマーク
+旧実装（ORM で1行ずつ add・再送信は DELETE→INSERT・毎回 planning_axes を SELECT）と
+現在の process_simulation_submission を、インメモリ SQLite 上で比較します
+
+MySQL は RETURNING を持たないため、ORM の INSERT は1行ごとに発行されます。
+その挙動に合わせるため、エンジンは use_insertmanyvalues=False で作成します
+
+使い方:
+  python benchmarks/bench_simulation_statements.py
+  python benchmarks/bench_simulation_statements.py --answers 12 --repeat 50
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from sqlalchemy import BigInteger, delete, event, select  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine  # noqa: E402
+from sqlalchemy.ext.compiler import compiles  # noqa: E402
+
+import app.models.plan  # noqa: E402,F401  (PlanningPlan のマッパー解決に必要)
+from app.models.axis import AxisScore, AxisStep, PlanningAxis  # noqa: E402
+from app.models.base import Base  # noqa: E402
+from app.models.simple_simulation import (  # noqa: E402
+    SimpleSimulationAnswer,
+    SimpleSimulationResult,
+    SimpleSimulationSession,
+    SimulationStatus,
+)
+from app.schemas.simulation import SubmitSimulationRequest  # noqa: E402
+from app.services import simulation as sim  # noqa: E402
+
+AXIS_CODES = ["concept", "funds", "operation", "location", "compliance", "revenue_forecast", "marketing", "menu"]
+
+
+@compiles(BigInteger, "sqlite")
+def _bigint_as_integer(type_, compiler, **kw):
+    # SQLite の自動採番は INTEGER PRIMARY KEY のみ
+    return "INTEGER"
+
+
+async def legacy_submit(db: AsyncSession, payload: SubmitSimulationRequest, user_id) -> int:
+    """変更前の保存処理（比較用の再現）"""
+    computed = sim._compute_simulation(payload)
+    session_obj = None
+    if payload.guest_session_token:
+        result = await db.execute(
+            select(SimpleSimulationSession).where(
+                SimpleSimulationSession.guest_session_token == payload.guest_session_token
+            )
+        )
+        session_obj = result.scalar_one_or_none()
+    if session_obj:
+        await db.execute(delete(SimpleSimulationAnswer).where(SimpleSimulationAnswer.session_id == session_obj.id))
+        await db.execute(delete(SimpleSimulationResult).where(SimpleSimulationResult.session_id == session_obj.id))
+        session_obj.status = SimulationStatus.COMPLETED
+        session_obj.user_id = user_id
+    else:
+        session_obj = SimpleSimulationSession(
+            user_id=user_id,
+            guest_session_token=payload.guest_session_token if not user_id else None,
+            status=SimulationStatus.COMPLETED,
+        )
+        db.add(session_obj)
+        await db.flush()
+    for item in payload.answers:
+        db.add(
+            SimpleSimulationAnswer(
+                session_id=session_obj.id,
+                question_code=item.question_code,
+                answer_values={"values": item.values},
+            )
+        )
+    db.add(
+        SimpleSimulationResult(
+            session_id=session_obj.id,
+            axis_scores=computed.axis_scores,
+            funds_comment_category=computed.funds_category,
+            funds_comment_text=computed.funds_text,
+            store_story_text=computed.store_story_text,
+        )
+    )
+    if user_id:
+        result = await db.execute(select(PlanningAxis))
+        axis_map = {axis.code: axis.id for axis in result.scalars().all()}
+        for axis_code, score in computed.axis_scores.items():
+            if axis_code in axis_map:
+                db.add(AxisScore(user_id=user_id, axis_id=axis_map[axis_code], score=score))
+    await db.commit()
+    return session_obj.id
+
+
+async def current_submit(db: AsyncSession, payload: SubmitSimulationRequest, user_id) -> int:
+    response = await sim.process_simulation_submission(db, payload, user_id)
+    return response.session_id
+
+
+def _payload(token, answers: int) -> SubmitSimulationRequest:
+    base = [
+        {"question_code": "main_genre", "values": ["cafe"]},
+        {"question_code": "seats", "values": ["20"]},
+        {"question_code": "price_point", "values": ["1500"]},
+        {"question_code": "location", "values": ["office"]},
+    ]
+    extra = [{"question_code": f"q{i}", "values": ["x"]} for i in range(max(0, answers - len(base)))]
+    return SubmitSimulationRequest(answers=(base + extra)[:answers], guest_session_token=token)
+
+
+async def measure(submit, scenario: str, answers: int, repeat: int) -> tuple[float, float]:
+    engine = create_async_engine("sqlite+aiosqlite://", use_insertmanyvalues=False)
+    statements = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            Base.metadata.create_all,
+            tables=[
+                Base.metadata.tables["users"],
+                SimpleSimulationSession.__table__,
+                SimpleSimulationAnswer.__table__,
+                SimpleSimulationResult.__table__,
+                PlanningAxis.__table__,
+                AxisStep.__table__,
+                AxisScore.__table__,
+                # VersionedSession の flush フックが ETag 用に書き込む
+                Base.metadata.tables["user_data_versions"],
+            ],
+        )
+        await conn.execute(
+            PlanningAxis.__table__.insert(),
+            [{"id": i + 1, "code": code, "name": code, "display_order": i} for i, code in enumerate(AXIS_CODES)],
+        )
+
+    sim.master_data.invalidate()
+    total_statements = 0
+    started = time.perf_counter()
+    async with AsyncSession(engine, expire_on_commit=False) as db:
+        for i in range(repeat):
+            if scenario == "guest_new":
+                payload, user_id = _payload(f"guest-{i}", answers), None
+            elif scenario == "guest_resubmit":
+                payload, user_id = _payload("guest-same", answers), None
+            else:
+                payload, user_id = _payload(None, answers), 1
+            statements.clear()
+            await submit(db, payload, user_id)
+            total_statements += len(statements)
+    elapsed = time.perf_counter() - started
+    await engine.dispose()
+    return total_statements / repeat, elapsed / repeat * 1000
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="シミュレーション保存の SQL 発行数ベンチマーク")
+    parser.add_argument("--answers", type=int, default=8, help="1件あたりの回答数")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    # ストーリー生成（AI呼び出し）は対象外
+    sim.start_story_job = lambda *a, **kw: None
+
+    print(f"{'scenario':<16} {'before stmts':>12} {'after stmts':>12} {'before ms':>10} {'after ms':>10}")
+    for scenario in ("guest_new", "guest_resubmit", "logged_in"):
+        before_stmts, before_ms = await measure(legacy_submit, scenario, args.answers, args.repeat)
+        after_stmts, after_ms = await measure(current_submit, scenario, args.answers, args.repeat)
+        print(f"{scenario:<16} {before_stmts:>12.1f} {after_stmts:>12.1f} {before_ms:>10.2f} {after_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -51,6 +51,10 @@ try:
         SimpleSimulationSession,
         SimpleSimulationAnswer,
         SimpleSimulationResult,
+        UserAxisProgress,
+        UserDataVersion,
+        CardChatMessage,
+        CardChatSummary,
     )
 except ImportError as e:
     logger.error(f"❌ モジュールのインポートに失敗しました: {e}")
@@ -0,0 +1,73 @@
+"""
+トークナイザファイルを取得するスクリプト
+チャットのトークン数計算に使う o200k_base の BPE ファイルを chat_tokenizer_path に保存します
+（ビルド時・イメージ作成時に一度実行する。アプリ本体はダウンロードしない）
+
+使い方:
+  python download_tokenizer.py                  # 公開 URL から取得
+  python download_tokenizer.py --source <path>  # 手元のファイル（社内ミラー等）からコピー
+"""
+import argparse
+import logging
+import sys
+import urllib.request
+from pathlib import Path
+from typing import Optional
+
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE_DIR))
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+try:
+    from app.core.config import get_settings
+    from app.services.chat_context import TOKENIZER_URL, read_tokenizer_ranks
+except ImportError as e:
+    logger.error(f"❌ モジュールのインポートに失敗しました: {e}")
+    logger.error("")
+    logger.error("仮想環境をアクティブにしてください:")
+    logger.error("  .venv\\Scripts\\Activate.ps1  (Windows)")
+    logger.error("  source .venv/bin/activate  (Linux/Mac)")
+    sys.exit(1)
+
+
+def download_tokenizer(source: Optional[str] = None) -> None:
+    """BPE ファイルを取得し、ハッシュを確かめてから保存する"""
+    settings = get_settings()
+    dest = Path(settings.chat_tokenizer_path)
+    if not dest.is_absolute():
+        dest = BASE_DIR / dest
+
+    if source:
+        logger.info(f"📄 {source} から読み込みます")
+        contents = Path(source).read_bytes()
+    else:
+        logger.info(f"🌐 {TOKENIZER_URL} から取得します")
+        with urllib.request.urlopen(TOKENIZER_URL, timeout=60) as response:
+            contents = response.read()
+
+    ranks = read_tokenizer_ranks(contents)
+
+    # 途中で失敗しても壊れたファイルが残らないよう一時ファイル経由で置き換える
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_suffix(dest.suffix + ".tmp")
+    tmp.write_bytes(contents)
+    tmp.replace(dest)
+    logger.info(f"🎉 トークナイザファイルを保存しました: {dest}（{len(ranks)} トークン）")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="o200k_base のトークナイザファイルを取得します")
+    parser.add_argument("--source", help="URL の代わりに読み込むローカルファイル")
+    args = parser.parse_args()
+    try:
+        download_tokenizer(args.source)
+    except KeyboardInterrupt:
+        logger.info("\n中断されました")
+    except Exception as e:
+        logger.error(f"\nエラーが発生しました: {e}")
+        sys.exit(1)
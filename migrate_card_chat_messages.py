@@ -0,0 +1,52 @@
+"""
+*_answers.chat_history（JSON）の会話履歴を card_chat_messages に移すスクリプト
+移行済みのカードは飛ばすため、何度実行しても構いません
+テーブルが存在しない場合は作成します
+
+使い方:
+  python migrate_card_chat_messages.py
+  python migrate_card_chat_messages.py --batch-size 200
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE_DIR))
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+try:
+    import app.models.plan  # noqa: F401  (PlanningPlan のマッパー解決に必要)
+    from app.core.db import AsyncSessionLocal, engine
+    from app.models.card_chat_message import CardChatMessage
+    from app.services.card_chat import backfill_card_messages
+except ImportError as e:
+    logger.error(f"❌ モジュールのインポートに失敗しました: {e}")
+    logger.error("")
+    logger.error("仮想環境をアクティブにしてください:")
+    logger.error("  .venv\\Scripts\\Activate.ps1  (Windows)")
+    logger.error("  source .venv/bin/activate  (Linux/Mac)")
+    sys.exit(1)
+
+
+async def main(args: argparse.Namespace) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: CardChatMessage.__table__.create(sync_conn, checkfirst=True))
+
+    async with AsyncSessionLocal() as db:
+        count = await backfill_card_messages(db, batch_size=args.batch_size)
+    logger.info(f"✅ card_chat_messages に {count} 件のメッセージを移行しました")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="会話履歴を card_chat_messages に移行")
+    parser.add_argument("--batch-size", type=int, default=500)
+    asyncio.run(main(parser.parse_args()))
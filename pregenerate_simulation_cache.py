@@ -0,0 +1,257 @@
+"""
+簡易シミュレーションのAI生成文を事前生成するスクリプト
+業態 × サブジャンル × 立地 × 営業時間 × 席数帯 × 客単価帯 のグリッド
+（= プロファイルキャッシュの指紋に使う全項目）から上位N件を選び、
+ストーリー文とアドバイス文をプロファイルキャッシュ（SQLite）に書き込みます
+
+使い方:
+  python pregenerate_simulation_cache.py --top 50 --workers 4
+  python pregenerate_simulation_cache.py --top 200 --no-db --business-hours lunch,dinner   # 過去の回答件数を使わずグリッド順
+営業時間の選択肢は --business-hours で指定します（省略時は過去の回答に現れた値）
+中断しても、同じコマンドを再実行すればチェックポイントから再開します
+"""
+import argparse
+import asyncio
+import json
+import itertools
+import logging
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE_DIR))
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+try:
+    from sqlalchemy import select
+    from app.core.config import get_settings
+    from app.services.llm_cache import SQLiteResponseCache
+    from app.services.profile_cache import ProfileCache, normalize_profile, profile_fingerprint
+    from app.services.simulation import (
+        LOCATION_LABELS,
+        MAIN_GENRE_LABELS,
+        REQUIRED_FIELDS,
+        SUB_GENRE_LABELS,
+        _generate_store_story_ai,
+    )
+    from app.services.simulation_advice import generate_advice_texts, is_cacheable_advice
+except ImportError as e:
+    logger.error(f"❌ モジュールのインポートに失敗しました: {e}")
+    logger.error("")
+    logger.error("仮想環境をアクティブにしてください:")
+    logger.error("  .venv\\Scripts\\Activate.ps1  (Windows)")
+    logger.error("  source .venv/bin/activate  (Linux/Mac)")
+    sys.exit(1)
+
+
+# 席数・客単価バケットごとの代表値（profile_cache.SEAT_BUCKETS / PRICE_BUCKETS の各区間に1つずつ）
+SEAT_POINTS = [5, 15, 25, 40, 65, 100]
+PRICE_POINTS = [800, 1500, 2500, 4000, 6500, 10000, 15000]
+# サブジャンルのない業態、またはサブジャンル未定の場合の値
+UNDECIDED_SUB_GENRE = "undecided_sub"
+DEFAULT_CHECKPOINT = ".cache/pregenerate_checkpoint.jsonl"
+
+
+def sub_genres_for(genre: str) -> list[str]:
+    """業態ごとのサブジャンル（未定を含む）"""
+    codes = [code for code in SUB_GENRE_LABELS if code.startswith(f"{genre}_")]
+    return codes + [UNDECIDED_SUB_GENRE]
+
+
+def build_grid(business_hours: list[str]) -> list[dict]:
+    """指紋に使う全項目の組み合わせ（業態 × サブジャンル × 立地 × 営業時間 × 席数帯 × 客単価帯）"""
+    return [
+        {
+            "main_genre": genre,
+            "sub_genre": sub_genre,
+            "location": location,
+            "business_hours": hours,
+            "seats": str(seats),
+            "price_point": str(price),
+        }
+        for genre in MAIN_GENRE_LABELS
+        for sub_genre in sub_genres_for(genre)
+        for location, hours, seats, price in itertools.product(
+            LOCATION_LABELS, business_hours, SEAT_POINTS, PRICE_POINTS
+        )
+    ]
+
+
+def _grid_key(profile: dict) -> tuple:
+    # profile_fingerprint と同じ正規化結果をキーにする
+    return tuple(sorted(normalize_profile(profile).items()))
+
+
+async def load_popularity() -> tuple[Counter, dict[tuple, dict]]:
+    """過去のシミュレーション回答（必須項目がそろったもの）から組み合わせごとの件数と代表プロファイルを集計"""
+    from app.core.db import AsyncSessionLocal
+    from app.models.simple_simulation import SimpleSimulationAnswer
+
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(
+                SimpleSimulationAnswer.session_id,
+                SimpleSimulationAnswer.question_code,
+                SimpleSimulationAnswer.answer_values,
+            ).where(SimpleSimulationAnswer.question_code.in_(REQUIRED_FIELDS))
+        )
+        profiles: dict[int, dict] = {}
+        for session_id, question_code, answer_values in result.all():
+            values = (answer_values or {}).get("values", [])
+            if values:
+                profiles.setdefault(session_id, {})[question_code] = values[0]
+
+    popularity: Counter = Counter()
+    observed: dict[tuple, dict] = {}
+    for profile in profiles.values():
+        # 未完了のセッションは AI 生成まで進まないので数えない
+        if not all(profile.get(field) for field in REQUIRED_FIELDS):
+            continue
+        key = _grid_key(profile)
+        popularity[key] += 1
+        observed.setdefault(key, profile)
+    return popularity, observed
+
+
+def rank_grid(grid: list[dict], popularity: Counter, observed: Optional[dict[tuple, dict]] = None) -> list[dict]:
+    # グリッドにない値の組み合わせも、実際の回答にあれば候補に加える
+    candidates = {_grid_key(profile): profile for profile in grid}
+    for key, profile in (observed or {}).items():
+        candidates.setdefault(key, profile)
+    # 件数の多い順（同数ならグリッド順のまま）
+    return sorted(candidates.values(), key=lambda profile: -popularity.get(_grid_key(profile), 0))
+
+
+def load_checkpoint(path: Path) -> set[str]:
+    if not path.exists():
+        return set()
+    with path.open(encoding="utf-8") as f:
+        return {json.loads(line)["key"] for line in f if line.strip()}
+
+
+async def pregenerate(args: argparse.Namespace) -> None:
+    settings = get_settings()
+    if settings.profile_cache_backend != "sqlite":
+        logger.warning(
+            "⚠️ PROFILE_CACHE_BACKEND が sqlite ではありません。"
+            "アプリから事前生成結果を参照するには sqlite に設定してください"
+        )
+
+    cache = ProfileCache(
+        store=SQLiteResponseCache(
+            settings.profile_cache_path,
+            ttl_sec=settings.profile_cache_ttl_sec,
+            max_entries=settings.profile_cache_max_entries,
+        ),
+        variants=settings.profile_cache_variants,
+    )
+
+    popularity: Counter = Counter()
+    observed: dict[tuple, dict] = {}
+    if not args.no_db:
+        try:
+            popularity, observed = await load_popularity()
+            logger.info(f"過去の回答から {len(popularity)} 通りの組み合わせを集計しました")
+        except Exception as e:
+            logger.warning(f"⚠️ 回答件数の集計に失敗したためグリッド順で生成します: {e}")
+
+    if args.business_hours:
+        business_hours = [value.strip() for value in args.business_hours.split(",") if value.strip()]
+    else:
+        business_hours = sorted({profile["business_hours"] for profile in observed.values()})
+    if not business_hours and not observed:
+        logger.error("❌ 営業時間の選択肢がありません。--business-hours で指定してください")
+        return
+
+    grid = build_grid(business_hours)
+    targets = rank_grid(grid, popularity, observed)[: args.top]
+
+    checkpoint_path = Path(args.checkpoint)
+    checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+    done = load_checkpoint(checkpoint_path)
+
+    # アプリが参照するスロット数を超えて生成しても使われない
+    variants = min(args.variants, cache.variants) if args.variants else cache.variants
+
+    # (種類, キャッシュキー, プロファイル) の作業リスト
+    jobs: asyncio.Queue = asyncio.Queue()
+    skipped = 0
+    for profile in targets:
+        fingerprint = profile_fingerprint(profile)
+        for kind in ("story", "advice"):
+            for slot in range(variants):
+                key = cache.slot_key(kind, fingerprint, slot)
+                if key in done or await cache.store.get(key) is not None:
+                    skipped += 1
+                    continue
+                jobs.put_nowait((kind, key, profile))
+
+    total = jobs.qsize()
+    logger.info(f"対象 {len(targets)} プロファイル / 生成 {total} 件 / スキップ {skipped} 件")
+    if total == 0:
+        logger.info("🎉 すべて生成済みです")
+        return
+
+    counts = Counter()
+    checkpoint_lock = asyncio.Lock()
+
+    async def worker() -> None:
+        while True:
+            try:
+                kind, key, profile = jobs.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                if kind == "story":
+                    text = await _generate_store_story_ai(profile, "")
+                    value = text or None
+                else:
+                    texts = await generate_advice_texts(profile)
+                    value = json.dumps(texts, ensure_ascii=False) if is_cacheable_advice(texts) else None
+
+                if value is None:
+                    counts["failed"] += 1
+                    logger.warning(f"生成結果が空のためスキップ: {kind} {profile}")
+                    continue
+
+                await cache.store_text(key, value)
+                async with checkpoint_lock:
+                    with checkpoint_path.open("a", encoding="utf-8") as f:
+                        f.write(json.dumps({"key": key}) + "\n")
+                counts["generated"] += 1
+                if counts["generated"] % 10 == 0:
+                    logger.info(f"  進捗: {counts['generated']}/{total}")
+            except Exception as e:
+                counts["failed"] += 1
+                logger.error(f"❌ 生成に失敗しました: {kind} {profile}: {e}")
+
+    await asyncio.gather(*(worker() for _ in range(max(1, args.workers))))
+    logger.info(f"\n🎉 事前生成が完了しました（生成 {counts['generated']} 件 / 失敗 {counts['failed']} 件）")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="簡易シミュレーションのAI生成文を事前生成します")
+    parser.add_argument("--top", type=int, default=50, help="生成するプロファイル数（上位N件）")
+    parser.add_argument("--workers", type=int, default=4, help="同時に生成するワーカー数")
+    parser.add_argument("--variants", type=int, default=0, help="1プロファイルあたりの生成数（上限・既定: PROFILE_CACHE_VARIANTS）")
+    parser.add_argument("--business-hours", default="", help="グリッドに使う営業時間の選択肢（カンマ区切り・既定: 過去の回答に現れた値）")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="再開用チェックポイントファイル")
+    parser.add_argument("--no-db", action="store_true", help="DBの回答件数を使わずグリッド順で選ぶ")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(pregenerate(parse_args()))
+    except KeyboardInterrupt:
+        logger.info("\n中断されました（再実行すると続きから生成します）")
+    except Exception as e:
+        logger.error(f"\nエラーが発生しました: {e}")
+        sys.exit(1)
@@ -0,0 +1,53 @@
+"""
+user_axis_progress（軸ごとの回答進捗）を回答テーブルから作り直すスクリプト
+導入時のバックフィルや、集計値と回答テーブルのずれの修復に使います
+テーブルが存在しない場合は作成します
+
+使い方:
+  python rebuild_axis_progress.py                 # 全ユーザー
+  python rebuild_axis_progress.py --user-id 1 --user-id 2
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE_DIR))
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+try:
+    import app.models.plan  # noqa: F401  (PlanningPlan のマッパー解決に必要)
+    from app.core.db import AsyncSessionLocal, engine
+    from app.models.user_axis_progress import UserAxisProgress
+    from app.services.answer_progress import rebuild_axis_progress
+except ImportError as e:
+    logger.error(f"❌ モジュールのインポートに失敗しました: {e}")
+    logger.error("")
+    logger.error("仮想環境をアクティブにしてください:")
+    logger.error("  .venv\\Scripts\\Activate.ps1  (Windows)")
+    logger.error("  source .venv/bin/activate  (Linux/Mac)")
+    sys.exit(1)
+
+
+async def main(args: argparse.Namespace) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: UserAxisProgress.__table__.create(sync_conn, checkfirst=True))
+
+    async with AsyncSessionLocal() as db:
+        count = await rebuild_axis_progress(db, user_ids=args.user_id, batch_size=args.batch_size)
+    logger.info(f"✅ user_axis_progress を {count} 行書き込みました")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="user_axis_progress の再構築")
+    parser.add_argument("--user-id", type=int, action="append", help="対象ユーザー（複数指定可・省略時は全ユーザー）")
+    parser.add_argument("--batch-size", type=int, default=500)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,266 @@
+import asyncio
+
+import pytest
+
+from app.services.llm_scheduler import LLMQueueFullError, LLMScheduler
+
+
+def _scheduler(**overrides) -> LLMScheduler:
+    params = dict(
+        max_concurrency=2,
+        max_concurrency_per_deployment=2,
+        max_queue=10,
+        queue_timeout_sec=1.0,
+        retry_after_sec=3,
+    )
+    params.update(overrides)
+    return LLMScheduler(**params)
+
+
+@pytest.mark.asyncio
+async def test_scheduler_caps_in_flight_calls():
+    scheduler = _scheduler(max_concurrency=2, max_concurrency_per_deployment=5)
+    peak = 0
+    running = 0
+
+    async def call():
+        nonlocal peak, running
+        async with scheduler.slot("gpt"):
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    await asyncio.gather(*(call() for _ in range(6)))
+
+    assert peak == 2
+    assert scheduler.stats.admitted == 6
+    assert scheduler.stats.completed == 6
+    assert scheduler.stats.in_flight == 0
+    assert scheduler.stats.max_queue_ms > 0
+
+
+@pytest.mark.asyncio
+async def test_scheduler_per_deployment_cap():
+    scheduler = _scheduler(max_concurrency=10, max_concurrency_per_deployment=1)
+    peak = {"a": 0, "b": 0}
+    running = {"a": 0, "b": 0}
+
+    async def call(deployment):
+        async with scheduler.slot(deployment):
+            running[deployment] += 1
+            peak[deployment] = max(peak[deployment], running[deployment])
+            await asyncio.sleep(0.01)
+            running[deployment] -= 1
+
+    await asyncio.gather(*(call(d) for d in ["a", "b", "a", "b"]))
+
+    assert peak == {"a": 1, "b": 1}
+
+
+@pytest.mark.asyncio
+async def test_scheduler_rejects_when_queue_full():
+    scheduler = _scheduler(max_concurrency=1, max_queue=1)
+    release = asyncio.Event()
+
+    async def holder():
+        async with scheduler.slot("gpt"):
+            await release.wait()
+
+    async def waiter():
+        async with scheduler.slot("gpt"):
+            pass
+
+    holder_task = asyncio.create_task(holder())
+    await asyncio.sleep(0)
+    waiter_task = asyncio.create_task(waiter())
+    await asyncio.sleep(0)
+
+    with pytest.raises(LLMQueueFullError) as exc_info:
+        async with scheduler.slot("gpt"):
+            pass
+
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.headers["Retry-After"] == "3"
+    assert scheduler.stats.rejected == 1
+
+    release.set()
+    await asyncio.gather(holder_task, waiter_task)
+
+
+@pytest.mark.asyncio
+async def test_scheduler_times_out_waiting_callers():
+    scheduler = _scheduler(max_concurrency=1, queue_timeout_sec=0.02)
+    release = asyncio.Event()
+
+    async def holder():
+        async with scheduler.slot("gpt"):
+            await release.wait()
+
+    holder_task = asyncio.create_task(holder())
+    await asyncio.sleep(0)
+
+    with pytest.raises(LLMQueueFullError):
+        async with scheduler.slot("gpt"):
+            pass
+
+    assert scheduler.stats.timed_out == 1
+    assert scheduler.stats.waiting == 0
+
+    release.set()
+    await holder_task
+    # タイムアウトした呼び出しが枠を取りこぼしていないこと
+    async with scheduler.slot("gpt"):
+        assert scheduler.stats.in_flight == 1
+
+
+def test_cache_key_depends_on_all_request_parameters():
+    from app.services.llm_cache import make_cache_key
+
+    messages = [{"role": "user", "content": "要約して"}]
+    base = make_cache_key("gpt", messages, 512, 0.7)
+    assert base == make_cache_key("gpt", [dict(m) for m in messages], 512, 0.7)
+    assert base != make_cache_key("gpt-mini", messages, 512, 0.7)
+    assert base != make_cache_key("gpt", messages, 1024, 0.7)
+    assert base != make_cache_key("gpt", messages, 512, 0.2)
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_lru_and_ttl(monkeypatch):
+    from app.services import llm_cache
+
+    cache = llm_cache.MemoryResponseCache(ttl_sec=60, max_entries=2)
+    await cache.set("a", "A")
+    await cache.set("b", "B")
+    assert await cache.get("a") == "A"  # a becomes most recently used
+    await cache.set("c", "C")  # evicts b
+
+    assert await cache.get("b") is None
+    assert await cache.get("c") == "C"
+    assert cache.stats.evictions == 1
+
+    now = llm_cache.time.time()
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now + 61)
+    assert await cache.get("a") is None
+    assert cache.stats.hits == 2
+    assert cache.stats.misses == 2
+
+
+@pytest.mark.asyncio
+async def test_sqlite_cache_survives_new_instance(tmp_path):
+    from app.services.llm_cache import SQLiteResponseCache
+
+    path = str(tmp_path / "cache" / "llm.sqlite3")
+    first = SQLiteResponseCache(path, ttl_sec=60, max_entries=2)
+    await first.set("k1", "v1")
+    await first.set("k2", "v2")
+    await first.set("k3", "v3")
+    assert first.stats.evictions == 1
+
+    second = SQLiteResponseCache(path, ttl_sec=60, max_entries=2)
+    assert await second.get("k1") is None
+    assert await second.get("k3") == "v3"
+    assert second.snapshot()["hit_ratio"] == 0.5
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_one_upstream_call():
+    from app.services.llm_singleflight import SingleFlight
+
+    flight = SingleFlight()
+    calls = 0
+
+    async def upstream():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "summary"
+
+    results = await asyncio.gather(*(flight.do("k", upstream) for _ in range(3)))
+
+    assert results == ["summary"] * 3
+    assert calls == 1
+    assert flight.stats.coalesced == 2
+    assert flight.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_stream_flight_replays_chunks_to_late_joiner():
+    from app.services.llm_singleflight import StreamFlight
+
+    flight = StreamFlight()
+    calls = 0
+    first_chunks_sent = asyncio.Event()
+    resume = asyncio.Event()
+
+    async def upstream():
+        nonlocal calls
+        calls += 1
+        yield "a"
+        yield "b"
+        first_chunks_sent.set()
+        await resume.wait()
+        yield "c"
+
+    async def collect():
+        return [chunk async for chunk in flight.subscribe("k", upstream)]
+
+    early = asyncio.create_task(collect())
+    await first_chunks_sent.wait()
+    late = asyncio.create_task(collect())
+    await asyncio.sleep(0)
+    resume.set()
+
+    assert await early == ["a", "b", "c"]
+    assert await late == ["a", "b", "c"]
+    assert calls == 1
+    assert flight.stats.coalesced == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_flight_cancels_upstream_when_all_subscribers_leave():
+    from app.services.llm_singleflight import StreamFlight
+
+    flight = StreamFlight()
+    closed = asyncio.Event()
+
+    async def upstream():
+        try:
+            yield "a"
+            await asyncio.sleep(10)
+            yield "b"
+        finally:
+            closed.set()
+
+    stream = flight.subscribe("k", upstream)
+    assert await stream.__anext__() == "a"
+    await stream.aclose()
+
+    await asyncio.wait_for(closed.wait(), timeout=1)
+    assert flight.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_chat_completion_caches_only_when_requested(monkeypatch):
+    from app.services import ai_client, llm_cache
+
+    calls = 0
+
+    async def fake_request(messages, max_tokens, temperature):
+        nonlocal calls
+        calls += 1
+        return f"応答{calls}"
+
+    monkeypatch.setattr(ai_client.settings, "azure_openai_api_key", "key")
+    monkeypatch.setattr(ai_client.settings, "azure_openai_endpoint", "https://example")
+    monkeypatch.setattr(ai_client, "_request_completion", fake_request)
+    monkeypatch.setattr(ai_client, "response_cache", llm_cache.MemoryResponseCache(ttl_sec=60, max_entries=8))
+    messages = [{"role": "user", "content": "こんにちは"}]
+
+    # 会話の応答は同じ入力でも毎回生成する
+    assert await ai_client._chat_completion(messages) == "応答1"
+    assert await ai_client._chat_completion(messages) == "応答2"
+    # 要約など決定的な呼び出しだけがキャッシュを使う
+    assert await ai_client._chat_completion(messages, use_cache=True) == "応答3"
+    assert await ai_client._chat_completion(messages, use_cache=True) == "応答3"
+    assert calls == 3
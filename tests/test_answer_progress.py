@@ -0,0 +1,132 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy import BigInteger, event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+
+import app.models.plan  # noqa: F401  (PlanningPlan のマッパー解決に必要)
+from app.models.base import Base
+from app.models.card_chat_message import CardChatMessage
+from app.models.concept_answer import ConceptAnswer
+from app.models.menu_answer import MenuAnswer
+from app.models.user_axis_progress import UserAxisProgress
+from app.services import answer_progress as ap
+
+
+@compiles(BigInteger, "sqlite")
+def _bigint_as_integer(type_, compiler, **kw):
+    # SQLite の自動採番は INTEGER PRIMARY KEY のみ
+    return "INTEGER"
+
+
+@pytest_asyncio.fixture
+async def db():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    statements = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            Base.metadata.create_all,
+            tables=[Base.metadata.tables["users"], UserAxisProgress.__table__, CardChatMessage.__table__]
+            + [m.__table__ for m in ap.AXIS_ANSWER_MODELS.values()],
+        )
+        history = [{"role": "user", "content": "x" * 1000}]
+        await conn.execute(
+            ConceptAnswer.__table__.insert(),
+            [
+                {"user_id": 1, "card_id": "1-1", "chat_history": history, "summary": None, "is_completed": False},
+                {"user_id": 1, "card_id": "1-2", "chat_history": [], "summary": "要約", "is_completed": False},
+                {"user_id": 1, "card_id": "1-3", "chat_history": history, "summary": "要約", "is_completed": True},
+                {"user_id": 1, "card_id": "2-1", "chat_history": [], "summary": "", "is_completed": False},
+                {"user_id": 2, "card_id": "1-1", "chat_history": history, "summary": None, "is_completed": True},
+            ],
+        )
+        await conn.execute(
+            MenuAnswer.__table__.insert(),
+            [{"user_id": 1, "card_id": "1", "chat_history": [], "is_completed": True}],
+        )
+    statements.clear()
+    async with AsyncSession(engine) as session:
+        session.statements = statements
+        yield session
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_axis_progress_counts_all_axes_in_one_query(db):
+    progress = await ap.fetch_axis_progress(db, user_id=1)
+
+    assert len(db.statements) == 1
+    assert "UNION ALL" in db.statements[0]
+    concept = progress["concept"]
+    assert (concept.answered, concept.completed, concept.summarized) == (3, 1, 2)
+    assert concept.total == len(ap.AXIS_CONFIG["concept"]["questions"])
+    assert concept.score == round(3 / concept.total * 10, 1)
+    assert progress["menu"].answered == 1
+    assert progress["funds"].answered == 0
+
+
+@pytest.mark.asyncio
+async def test_card_progress_returns_flags_without_chat_history(db):
+    progress = await ap.fetch_card_progress(db, user_id=1)
+
+    assert len(db.statements) == 1
+    cards = progress["concept"]
+    assert cards["1-1"].has_history and not cards["1-1"].is_completed
+    assert cards["1-2"].summary == "要約" and not cards["1-2"].has_history
+    assert cards["1-3"].is_completed
+    assert not cards["2-1"].answered
+    assert progress["menu"]["1"].answered
+
+
+@pytest.mark.asyncio
+async def test_load_axis_progress_falls_back_until_materialized(db):
+    progress = await ap.load_axis_progress(db, user_id=1)
+    assert progress["concept"].answered == 3
+
+    # 集計済みの行があれば回答テーブルは読まない
+    await ap.rebuild_axis_progress(db)
+    db.statements.clear()
+    progress = await ap.load_axis_progress(db, user_id=1)
+
+    assert len(db.statements) == 1
+    assert "UNION ALL" not in db.statements[0]
+    assert (progress["concept"].answered, progress["concept"].completed) == (3, 1)
+    assert progress["menu"].answered == 1
+    assert progress["funds"].answered == 0
+
+
+@pytest.mark.asyncio
+async def test_refresh_axis_progress_follows_writes_in_same_transaction(db):
+    db.add(ConceptAnswer(user_id=1, card_id="2-2", chat_history=[], summary="要約", is_completed=True))
+    await ap.refresh_axis_progress(db, 1, "concept")
+    await db.commit()
+
+    db.statements.clear()
+    progress = await ap.load_axis_progress(db, user_id=1)
+    assert (progress["concept"].answered, progress["concept"].completed) == (4, 2)
+    # 集計行のない軸（バックフィル前）は回答テーブルから数える
+    assert progress["menu"].answered == 1
+    assert "concept_answers" not in db.statements[-1] and "menu_answers" in db.statements[-1]
+
+    rows = (await db.execute(ap.select(UserAxisProgress))).scalars().all()
+    assert [(r.user_id, r.axis_code) for r in rows] == [(1, "concept")]
+
+
+@pytest.mark.asyncio
+async def test_rebuild_axis_progress_repairs_drift(db):
+    count = await ap.rebuild_axis_progress(db)
+    assert count == 2 * len(ap.AXIS_ANSWER_MODELS)
+
+    await db.execute(
+        UserAxisProgress.__table__.update().values(answered=0, completed=0, score=0)
+    )
+    await db.commit()
+    await ap.rebuild_axis_progress(db, user_ids=[2])
+
+    assert (await ap.load_axis_progress(db, user_id=2))["concept"].completed == 1
+    assert (await ap.load_axis_progress(db, user_id=1))["concept"].answered == 0
@@ -0,0 +1,191 @@
+import asyncio
+import json
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import BigInteger
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+
+import app.models.plan  # noqa: F401  (PlanningPlan のマッパー解決に必要)
+from app.api import axis_cards
+from app.models.base import Base
+from app.schemas.auth import UserInfo
+from app.schemas.axis_card import CardChatRequest, CardSummaryRequest
+from app.services.ai_client import STREAM_ERROR_PREFIX
+from app.services.card_chat import load_history
+
+
+@compiles(BigInteger, "sqlite")
+def _bigint_as_integer(type_, compiler, **kw):
+    # SQLite の自動採番は INTEGER PRIMARY KEY のみ
+    return "INTEGER"
+
+
+USER = UserInfo(id=1, email="owner@example.com", display_name="owner")
+
+
+@pytest_asyncio.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
+
+
+def test_routes_match_previous_per_axis_routers():
+    paths = {route.path for router in axis_cards.routers for route in router.routes}
+    for api_path in (
+        "concept", "revenue-forecast", "funding-plan", "operation",
+        "location", "interior-exterior", "marketing", "menu",
+    ):
+        for action in ("status", "chat", "chat/ticket", "chat/stream", "summary"):
+            assert f"/api/{api_path}/{action}" in paths
+    assert len(paths) == 8 * 5
+
+
+def test_summary_prompt_keeps_axis_specific_notes():
+    concept = axis_cards.AXIS_CARDS["concept"].summary_prompt("ターゲット")
+    funds = axis_cards.AXIS_CARDS["funds"].summary_prompt("自己資金")
+    assert concept.startswith("あなたは飲食店開業のコンセプトメイカーです。")
+    assert "『ターゲット』" in concept and "決定した" not in concept
+    assert "【重要】・決定した数値や選択肢を明確に記載してください。" in funds
+
+
+@pytest.mark.asyncio
+async def test_chat_status_and_summary_share_one_engine(session, monkeypatch):
+    prompts = []
+
+    async def fake_completion(messages, **kwargs):
+        prompts.append(messages)
+        return "AIの応答"
+
+    monkeypatch.setattr(axis_cards, "_chat_completion", fake_completion)
+    axis = axis_cards.AXIS_CARDS["funds"]
+    card_id = next(iter(axis.questions))
+
+    chat = await axis_cards.card_chat(
+        axis, CardChatRequest(card_id=card_id, user_message="500万円です"), USER, session
+    )
+    assert chat.assistant_message == "AIの応答" and len(chat.history) == 2
+    assert prompts[0][0]["content"] == axis.chat_prompt
+
+    request = Request({"type": "http", "method": "GET", "path": "/api/funding-plan/status", "headers": []})
+    statuses = await axis_cards.card_status(axis, request, Response(), USER, session)
+    card = next(s for s in statuses.statuses if s.card_id == card_id)
+    assert not card.is_completed and card.chat_history[0].content == "500万円です"
+
+    summary = await axis_cards.card_summary(axis, CardSummaryRequest(card_id=card_id), USER, session)
+    assert summary.summary == "AIの応答"
+    # 送信がなければ保存済みの会話を要約する
+    assert "500万円です" in prompts[1][1]["content"]
+    statuses = await axis_cards.card_status(axis, request, Response(), USER, session)
+    assert next(s for s in statuses.statuses if s.card_id == card_id).is_completed
+
+    with pytest.raises(HTTPException) as exc:
+        await axis_cards.card_chat(axis, CardChatRequest(card_id="unknown", user_message="x"), USER, session)
+    assert exc.value.status_code == 404
+
+
+def _fake_stream(chunks):
+    async def stream(messages, **kwargs):
+        for chunk in chunks:
+            yield chunk
+    return stream
+
+
+def _events(raw: list[str]) -> list[tuple[str, dict]]:
+    events = []
+    for item in raw:
+        event, data = item.strip().split("\n")
+        events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_saves_once_at_end(session, monkeypatch):
+    monkeypatch.setattr(axis_cards, "_chat_completion_stream", _fake_stream(["こんに", "ちは"]))
+    axis = axis_cards.AXIS_CARDS["concept"]
+    request = CardChatRequest(card_id="1-1", user_message="カフェです", last_message_id=0)
+
+    events = _events([e async for e in axis_cards.card_chat_events(axis, request, USER.id, session)])
+
+    assert [name for name, _ in events] == ["delta", "delta", "done"]
+    done = events[-1][1]
+    assert done["assistant_message"] == "こんにちは" and done["history"] is None
+    assert [m["content"] for m in done["messages"]] == ["カフェです", "こんにちは"]
+    stored = await load_history(session, USER.id, "concept", "1-1")
+    assert [(m["content"], m["truncated"]) for m in stored] == [("カフェです", False), ("こんにちは", False)]
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_saves_partial_reply_on_disconnect(session, monkeypatch):
+    monkeypatch.setattr(axis_cards, "_chat_completion_stream", _fake_stream(["途中", "まで", "の応答"]))
+    axis = axis_cards.AXIS_CARDS["concept"]
+    events = axis_cards.card_chat_events(
+        axis, CardChatRequest(card_id="1-1", user_message="質問"), USER.id, session
+    )
+
+    await events.__anext__()
+    await events.__anext__()
+    # クライアント切断（StreamingResponse がジェネレータを閉じる）
+    await events.aclose()
+
+    stored = await load_history(session, USER.id, "concept", "1-1")
+    assert [(m["role"], m["content"], m["truncated"]) for m in stored] == [
+        ("user", "質問", False),
+        ("assistant", "途中まで", True),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_error_is_not_saved(session, monkeypatch):
+    # 上流の失敗は最後のチャンクとして届く（ai_client._request_completion_stream）
+    monkeypatch.setattr(
+        axis_cards, "_chat_completion_stream", _fake_stream(["途中", f"{STREAM_ERROR_PREFIX}timeout]"])
+    )
+    axis = axis_cards.AXIS_CARDS["concept"]
+    request = CardChatRequest(card_id="1-1", user_message="質問")
+
+    events = _events([e async for e in axis_cards.card_chat_events(axis, request, USER.id, session)])
+
+    assert [name for name, _ in events] == ["delta", "error"]
+    assert events[-1][1]["code"] == "INTERNAL_ERROR"
+    assert await load_history(session, USER.id, "concept", "1-1") == []
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_disconnect_before_first_chunk_saves_nothing(session, monkeypatch):
+    started = asyncio.Event()
+
+    async def stalled_stream(messages, **kwargs):
+        started.set()
+        await asyncio.Event().wait()
+        yield "届かない"
+
+    monkeypatch.setattr(axis_cards, "_chat_completion_stream", stalled_stream)
+    axis = axis_cards.AXIS_CARDS["concept"]
+    events = axis_cards.card_chat_events(
+        axis, CardChatRequest(card_id="1-1", user_message="質問"), USER.id, session
+    )
+
+    task = asyncio.create_task(events.__anext__())
+    await started.wait()
+    # 最初のチャンクを待っている間にクライアントが切断
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert await load_history(session, USER.id, "concept", "1-1") == []
+
+
+def test_chat_ticket_is_one_time_and_scoped():
+    request = CardChatRequest(card_id="1-1", user_message="x")
+    ticket = axis_cards.chat_tickets.issue(USER.id, "concept", payload=request)
+    assert axis_cards.chat_tickets.redeem(ticket, "menu") is None
+    ticket = axis_cards.chat_tickets.issue(USER.id, "concept", payload=request)
+    assert axis_cards.chat_tickets.redeem(ticket, "concept") == {"user_id": USER.id, "payload": request}
+    assert axis_cards.chat_tickets.redeem(ticket, "concept") is None
@@ -0,0 +1,113 @@
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import BigInteger, event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+
+import app.models.plan  # noqa: F401  (PlanningPlan のマッパー解決に必要)
+from app.api import bootstrap as bootstrap_api
+from app.api import dashboard as dashboard_api
+from app.core.db import ReadOnlySession
+from app.models.axis import PlanningAxis
+from app.models.base import Base
+from app.models.concept_answer import ConceptAnswer
+from app.schemas.auth import UserInfo
+from app.services import detail_questions as dq
+from app.services import master_data as md
+
+
+@compiles(BigInteger, "sqlite")
+def _bigint_as_integer(type_, compiler, **kw):
+    # SQLite の自動採番は INTEGER PRIMARY KEY のみ
+    return "INTEGER"
+
+
+USER = UserInfo(id=1, email="owner@example.com", display_name="owner")
+
+
+def _request() -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/bootstrap", "headers": []})
+
+
+@pytest_asyncio.fixture
+async def engine(monkeypatch):
+    cache = md.MasterDataCache(check_interval_sec=0)
+    monkeypatch.setattr(dq, "master_data", cache)
+    monkeypatch.setattr(dashboard_api, "master_data", cache)
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            PlanningAxis.__table__.insert(),
+            [
+                {"id": i + 1, "code": code, "name": dq.AXIS_DEFAULTS.get(code, code), "display_order": i}
+                for i, code in enumerate(dq.AXIS_ORDER)
+            ],
+        )
+        await conn.execute(
+            ConceptAnswer.__table__.insert(),
+            [
+                {
+                    "user_id": 1,
+                    "card_id": "1-1",
+                    "chat_history": [{"role": "user", "content": "カフェを開きたい"}],
+                    "summary": "要約",
+                    "is_completed": True,
+                },
+                {
+                    "user_id": 1,
+                    "card_id": "1-2",
+                    "chat_history": [{"role": "user", "content": "x"}],
+                    "summary": None,
+                    "is_completed": False,
+                },
+            ],
+        )
+    yield engine
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_bootstrap_reads_answer_tables_once(engine):
+    statements = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    async with AsyncSession(engine, sync_session_class=ReadOnlySession) as session:
+        result = await bootstrap_api.get_bootstrap(
+            _request(), Response(), fields=None, session=session, current_user=USER
+        )
+        bootstrap_statements = list(statements)
+        standalone = await dashboard_api.get_dashboard(
+            _request(), Response(), session=session, current_user=USER
+        )
+
+    # 3つの応答で *_answers の読み込みを共用する
+    assert sum("concept_answers" in s for s in bootstrap_statements) == 1
+    assert not any("user_axis_progress" in s for s in bootstrap_statements)
+
+    concept = result.statuses["concept"]
+    assert len(concept) == len(bootstrap_api.AXIS_CONFIG["concept"]["questions"])
+    assert concept[0].is_completed and concept[0].summary == "要約"
+    assert concept[0].chat_history[0].content == "カフェを開きたい"
+    assert [a.score for a in result.dashboard.axes] == [a.score for a in standalone.axes]
+    concept_axis = next(a for a in result.mindmap.axis_scores if a.axis_code == "concept")
+    assert concept_axis.completed == 2
+
+
+@pytest.mark.asyncio
+async def test_bootstrap_sparse_fields(engine):
+    async with AsyncSession(engine, sync_session_class=ReadOnlySession) as session:
+        result = await bootstrap_api.get_bootstrap(
+            _request(), Response(), fields="mindmap,statuses", session=session, current_user=USER
+        )
+    assert result.dashboard is None and result.mindmap is not None
+    assert all(card.chat_history is None for card in result.statuses["concept"])
+    assert result.statuses["concept"][0].summary == "要約"
+
+    with pytest.raises(HTTPException) as exc:
+        bootstrap_api.parse_fields("dashboard,unknown")
+    assert exc.value.status_code == 400
@@ -0,0 +1,120 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy import BigInteger, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+
+import app.models.plan  # noqa: F401  (PlanningPlan のマッパー解決に必要)
+from app.models.base import Base
+from app.models.card_chat_message import CardChatMessage
+from app.models.concept_answer import ConceptAnswer
+from app.schemas.axis_card import ChatMessage
+from app.services import answer_progress as ap
+from app.services import card_chat as cc
+
+
+@compiles(BigInteger, "sqlite")
+def _bigint_as_integer(type_, compiler, **kw):
+    # SQLite の自動採番は INTEGER PRIMARY KEY のみ
+    return "INTEGER"
+
+
+LEGACY = [{"role": "user", "content": "カフェを開きたい"}, {"role": "assistant", "content": "いいですね"}]
+
+
+@pytest_asyncio.fixture
+async def db():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            ConceptAnswer.__table__.insert(),
+            [{"user_id": 1, "card_id": "1-1", "chat_history": LEGACY, "summary": None, "is_completed": False}],
+        )
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
+
+
+async def _message_count(db) -> int:
+    return (await db.execute(select(func.count()).select_from(CardChatMessage))).scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_append_returns_only_delta(db):
+    history = await cc.load_history(db, 1, "concept", "1-2")
+    assert history == []
+
+    turn = history + [
+        {"id": None, "role": "user", "content": "質問1"},
+        {"id": None, "role": "assistant", "content": "回答1"},
+    ]
+    saved = await cc.append_messages(db, 1, "concept", "1-2", turn)
+    await db.commit()
+    first = cc.chat_response_fields(saved, last_message_id=None)
+    # 旧クライアントには全履歴も返す
+    assert first["history"] == saved and len(first["messages"]) == 2
+
+    history = await cc.load_history(db, 1, "concept", "1-2")
+    turn = history + [
+        {"id": None, "role": "user", "content": "質問2"},
+        {"id": None, "role": "assistant", "content": "回答2"},
+    ]
+    saved = await cc.append_messages(db, 1, "concept", "1-2", turn)
+    await db.commit()
+    second = cc.chat_response_fields(saved, last_message_id=first["last_message_id"])
+
+    assert second["history"] is None
+    assert [m["content"] for m in second["messages"]] == ["質問2", "回答2"]
+    assert second["last_message_id"] == saved[-1]["id"]
+    # 2ターン目は追記のみ（1ターン目の行は書き換えない）
+    assert await _message_count(db) == 4
+    answer = (
+        await db.execute(select(ConceptAnswer).where(ConceptAnswer.card_id == "1-2"))
+    ).scalar_one()
+    assert answer.chat_history == []
+
+
+@pytest.mark.asyncio
+async def test_legacy_history_is_read_then_backfilled(db):
+    history = await cc.load_history(db, 1, "concept", "1-1")
+    assert [m["content"] for m in history] == ["カフェを開きたい", "いいですね"]
+    assert all(m["id"] is None for m in history)
+
+    # 保存先も JSON も空なら、旧クライアントが送ってきた履歴を使う
+    client = [ChatMessage(role="user", content="送信分")]
+    assert (await cc.load_history(db, 1, "concept", "1-3", client))[0]["content"] == "送信分"
+
+    assert await cc.backfill_card_messages(db, batch_size=1) == 2
+    assert await cc.backfill_card_messages(db) == 0
+    assert await _message_count(db) == 2
+
+    stored = await cc.load_history(db, 1, "concept", "1-1")
+    assert [m["content"] for m in stored] == ["カフェを開きたい", "いいですね"]
+    assert all(m["id"] is not None for m in stored)
+    histories = await cc.load_axis_histories(db, 1)
+    assert histories["concept"]["1-1"] == stored and histories["menu"] == {}
+
+
+@pytest.mark.asyncio
+async def test_progress_counts_stored_messages(db):
+    await cc.append_messages(db, 1, "concept", "1-2", [{"id": None, "role": "user", "content": "x"}])
+    await db.commit()
+
+    progress = await ap.fetch_axis_progress(db, user_id=1)
+    assert progress["concept"].answered == 2
+
+
+@pytest.mark.asyncio
+async def test_upsert_answer_inserts_then_updates_same_row(db):
+    created = await cc.upsert_answer(db, 1, "concept", "1-4", summary="初回", is_completed=True)
+    updated = await cc.upsert_answer(db, 1, "concept", "1-4", summary="更新")
+    await db.commit()
+
+    assert updated.id == created.id
+    assert (updated.summary, updated.is_completed) == ("更新", True)
+    # 値なしの呼び出しは行の確保のみ（既存の値は変えない）
+    ensured = await cc.upsert_answer(db, 1, "concept", "1-4")
+    assert (ensured.id, ensured.summary) == (created.id, "更新")
+    rows = (await db.execute(select(ConceptAnswer).where(ConceptAnswer.card_id == "1-4"))).scalars().all()
+    assert len(rows) == 1
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from app.services.cashflow import (
+    assumptions_from_profile,
+    format_cashflow_for_prompt,
+    loan_schedule,
+    project_cashflow,
+)
+
+
+def test_equal_installment_has_constant_payment_and_repays_in_full():
+    interest, principal, balance = loan_schedule(
+        10_000_000, annual_rate=2.0, term_months=60, method="equal_installment", grace_months=0, months=60
+    )
+    payments = interest + principal
+
+    assert np.allclose(payments, payments[0])
+    assert principal.sum() == pytest.approx(10_000_000)
+    assert balance[-1] == pytest.approx(0, abs=1e-6)
+    # 毎月返済額の公式値
+    r = 0.02 / 12
+    assert payments[0] == pytest.approx(10_000_000 * r / (1 - (1 + r) ** -60))
+
+
+def test_equal_principal_with_grace_period():
+    interest, principal, balance = loan_schedule(
+        1_200_000, annual_rate=3.0, term_months=15, method="equal_principal", grace_months=3, months=18
+    )
+
+    # 据置期間は利息のみ
+    assert np.all(principal[:3] == 0)
+    assert interest[0] == pytest.approx(1_200_000 * 0.03 / 12)
+    assert np.allclose(principal[3:15], 100_000)
+    assert np.all(np.diff(interest[3:15]) < 0)
+    assert np.all(balance[14:] == 0)
+    assert np.all(principal[15:] == 0)
+
+
+def test_projection_from_simulation_profile():
+    assumptions = assumptions_from_profile(
+        {"main_genre": "izakaya", "seats": "30", "price_point": "3500"}, ramp_months=4
+    )
+    projection = project_cashflow(assumptions)
+
+    assert len(projection.sales) == 36
+    assert projection.sales[0] == pytest.approx(assumptions.monthly_sales_target * 0.6)
+    assert projection.sales[4] == pytest.approx(assumptions.monthly_sales_target)
+    expected_cash = (
+        assumptions.own_funds + assumptions.loan_amount - assumptions.initial_investment
+        + projection.net_cashflow.sum()
+    )
+    assert projection.cumulative_cash[-1] == pytest.approx(expected_cash)
+    assert [row["year"] for row in projection.yearly()] == [1, 2, 3]
+    assert projection.summary["first_profitable_month"] is not None
+    assert "3年目" in format_cashflow_for_prompt(projection)
@@ -0,0 +1,150 @@
+import os
+
+import pytest
+import tiktoken
+import pytest_asyncio
+from sqlalchemy import BigInteger, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+
+import app.models.plan  # noqa: F401  (PlanningPlan のマッパー解決に必要)
+from app.models.base import Base
+from app.models.card_chat_summary import CardChatSummary
+from app.services import card_chat
+from app.services import chat_context as cc
+
+
+@compiles(BigInteger, "sqlite")
+def _bigint_as_integer(type_, compiler, **kw):
+    # SQLite の自動採番は INTEGER PRIMARY KEY のみ
+    return "INTEGER"
+
+
+def _turns(start: int, count: int) -> list[dict]:
+    history = []
+    for i in range(start, start + count):
+        history.append({"id": None, "role": "user", "content": f"質問{i}"})
+        history.append({"id": None, "role": "assistant", "content": f"回答{i}"})
+    return history
+
+
+@pytest_asyncio.fixture
+async def db(monkeypatch):
+    # トークン数は文字数で数える（トークナイザの語彙に依存させない）
+    monkeypatch.setattr(cc, "count_tokens", len)
+    monkeypatch.setattr(cc.settings, "chat_context_keep_turns", 2)
+    monkeypatch.setattr(cc.settings, "chat_context_max_tokens", 10_000)
+    monkeypatch.setattr(cc.settings, "chat_summary_batch_turns", 2)
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
+
+
+async def _save(db, history: list[dict]) -> list[dict]:
+    saved = await card_chat.append_messages(db, 1, "concept", "1-1", history)
+    await db.commit()
+    return saved
+
+
+async def _context(db, history: list[dict]) -> cc.ChatContext:
+    return await cc.build_chat_context(
+        db, 1, "concept", "1-1",
+        system_prompt="system",
+        history=history,
+        user_message="新しい質問",
+        initial_question="最初の質問",
+    )
+
+
+@pytest.mark.asyncio
+async def test_context_replaces_summarized_turns(db):
+    saved = await _save(db, _turns(1, 6))
+    db.add(CardChatSummary(
+        user_id=1, axis_code="concept", card_id="1-1", summary="1〜3往復目の要約",
+        covered_message_id=saved[5]["id"],
+    ))
+    await db.commit()
+
+    context = await _context(db, saved)
+    contents = [m["content"] for m in context.messages]
+    # 要約済み（1〜3往復目）は要約に置き換え、要約が追いついていない4往復目はそのまま送る
+    assert contents == [
+        "system",
+        "これまでの会話の要約:\n1〜3往復目の要約",
+        "質問4", "回答4", "質問5", "回答5", "質問6", "回答6",
+        "新しい質問",
+    ]
+    assert context.prompt_tokens == cc.count_message_tokens(context.messages)
+
+    first = await _context(db, [])
+    assert [m["content"] for m in first.messages] == ["system", "最初の質問", "新しい質問"]
+
+
+@pytest.mark.asyncio
+async def test_context_drops_oldest_messages_over_budget(db, monkeypatch):
+    history = _turns(1, 2)
+    history[0]["content"] = "長い" * 200
+    monkeypatch.setattr(cc.settings, "chat_context_max_tokens", 100)
+
+    context = await _context(db, history)
+
+    assert context.dropped == 1
+    assert [m["content"] for m in context.messages][1:] == ["回答1", "質問2", "回答2", "新しい質問"]
+    assert context.prompt_tokens <= 100
+
+
+@pytest.mark.asyncio
+async def test_rolling_summary_is_extended_incrementally(db, monkeypatch):
+    prompts = []
+
+    async def fake_completion(messages, **kwargs):
+        prompts.append(messages[-1]["content"])
+        return f"要約{len(prompts)}"
+
+    monkeypatch.setattr(cc, "_chat_completion", fake_completion)
+    saved = await _save(db, _turns(1, 4))
+
+    assert await cc.refresh_rolling_summary(db, 1, "concept", "1-1")
+    row = (await db.execute(select(CardChatSummary))).scalar_one()
+    assert (row.summary, row.covered_message_id) == ("要約1", saved[3]["id"])
+    assert "質問2" in prompts[0] and "質問3" not in prompts[0]
+
+    # 新しく古くなった分（3往復目）だけを前回の要約に足す
+    saved = await _save(db, saved + _turns(5, 1))
+    assert await cc.refresh_rolling_summary(db, 1, "concept", "1-1")
+    assert "要約1" in prompts[1] and "質問3" in prompts[1] and "質問2" not in prompts[1]
+    await db.refresh(row)
+    assert (row.summary, row.covered_message_id) == ("要約2", saved[5]["id"])
+
+    assert not await cc.refresh_rolling_summary(db, 1, "concept", "1-1")
+    assert len(prompts) == 2
+
+
+@pytest.mark.asyncio
+async def test_summary_refresh_waits_for_batch(db):
+    saved = await _save(db, _turns(1, 4))
+    context = await _context(db, saved[:-2])
+    # 要約されていない古いやり取りが1往復だけなら要約しない
+    assert cc.schedule_summary_refresh(context, saved[:-2]) is None
+
+
+def test_count_tokens_uses_downloaded_encoder():
+    # ビルド時に取得したファイルから実際のトークナイザを組み立てる（推定値に落ちない・環境変数を書き換えない）
+    cache_dir = os.environ.get("TIKTOKEN_CACHE_DIR")
+    encoding = cc.get_encoding()
+    assert isinstance(encoding, tiktoken.Encoding)
+    assert encoding.name == cc.TOKENIZER_NAME
+    assert os.environ.get("TIKTOKEN_CACHE_DIR") == cache_dir
+
+    text = "自己資金は500万円で、駅近にカフェを開きたいです"
+    assert cc.count_tokens(text) == len(encoding.encode(text))
+    # バイト数での推定（日本語は約3倍）とは大きく異なる
+    assert cc.count_tokens(text) * 2 < len(text.encode("utf-8"))
+
+
+def test_tokenizer_file_is_hash_checked():
+    with pytest.raises(ValueError):
+        cc.read_tokenizer_ranks(b"aGVsbG8= 0\n")
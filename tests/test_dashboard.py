@@ -0,0 +1,124 @@
+import pytest
+import pytest_asyncio
+from fastapi import Request, Response
+from sqlalchemy import BigInteger, event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+
+import app.models.plan  # noqa: F401  (PlanningPlan のマッパー解決に必要)
+from app.api import dashboard as dashboard_api
+from app.core.db import ReadOnlySession
+from app.core.user_version import VersionedSession
+from app.models.axis import AxisScore, PlanningAxis
+from app.models.base import Base
+from app.models.detail_question import DetailQuestionAnswer
+from app.models.notes import OwnerNote
+from app.schemas.auth import UserInfo
+from app.services import detail_questions as dq
+from app.services import master_data as md
+
+@compiles(BigInteger, "sqlite")
+def _bigint_as_integer(type_, compiler, **kw):
+    # SQLite の自動採番は INTEGER PRIMARY KEY のみ
+    return "INTEGER"
+
+
+WRITE_PREFIXES = ("INSERT", "UPDATE", "DELETE")
+
+
+def _request(headers: dict | None = None) -> Request:
+    raw = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    return Request({"type": "http", "method": "GET", "path": "/dashboard", "headers": raw})
+
+
+@pytest_asyncio.fixture
+async def engine():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            PlanningAxis.__table__.insert(),
+            [
+                {"id": i + 1, "code": code, "name": dq.AXIS_DEFAULTS.get(code, code), "display_order": i}
+                for i, code in enumerate(dq.AXIS_ORDER)
+            ],
+        )
+        await conn.execute(
+            DetailQuestionAnswer.__table__.insert(),
+            [
+                {"user_id": 1, "axis_code": q["axis_code"], "question_code": q["code"], "answer": True}
+                for q in dq.DETAIL_QUESTION_DEFINITIONS
+            ],
+        )
+    yield engine
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_dashboard_get_issues_no_writes(engine, monkeypatch):
+    cache = md.MasterDataCache(check_interval_sec=0)
+    monkeypatch.setattr(dq, "master_data", cache)
+    monkeypatch.setattr(dashboard_api, "master_data", cache)
+    statements = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    user = UserInfo(id=1, email="owner@example.com", display_name="owner")
+    async with AsyncSession(engine, sync_session_class=ReadOnlySession) as session:
+        first = await dashboard_api.get_dashboard(_request(), Response(), session=session, current_user=user)
+        second = await dashboard_api.get_dashboard(_request(), Response(), session=session, current_user=user)
+
+    assert first.detail_progress.answered == len(dq.DETAIL_QUESTION_DEFINITIONS)
+    assert [a.score for a in first.axes] == [a.score for a in second.axes]
+    assert statements
+    assert not [s for s in statements if s.lstrip().upper().startswith(WRITE_PREFIXES)]
+
+
+@pytest.mark.asyncio
+async def test_read_only_session_rejects_orm_writes(engine):
+    async with AsyncSession(engine, sync_session_class=ReadOnlySession) as session:
+        session.add(AxisScore(user_id=1, axis_id=1, score=5.0))
+        with pytest.raises(RuntimeError):
+            await session.flush()
+
+
+@pytest.mark.asyncio
+async def test_dashboard_returns_304_until_user_data_changes(engine, monkeypatch):
+    cache = md.MasterDataCache(check_interval_sec=0)
+    monkeypatch.setattr(dq, "master_data", cache)
+    monkeypatch.setattr(dashboard_api, "master_data", cache)
+    user = UserInfo(id=1, email="owner@example.com", display_name="owner")
+
+    async with AsyncSession(engine, sync_session_class=ReadOnlySession) as session:
+        response = Response()
+        await dashboard_api.get_dashboard(_request(), response, session=session, current_user=user)
+        etag = response.headers["etag"]
+
+        statements = []
+
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def _record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        cached = await dashboard_api.get_dashboard(
+            _request({"If-None-Match": etag}), Response(), session=session, current_user=user
+        )
+        assert cached.status_code == 304
+        assert cached.headers["etag"] == etag
+        # 変更カウンタの主キー検索のみ
+        assert len(statements) == 1
+
+    # ORM での書き込みがカウンタを進める
+    async with AsyncSession(engine, sync_session_class=VersionedSession) as session:
+        session.add(OwnerNote(user_id=1, content="メモ"))
+        await session.commit()
+
+    async with AsyncSession(engine, sync_session_class=ReadOnlySession) as session:
+        response = Response()
+        fresh = await dashboard_api.get_dashboard(
+            _request({"If-None-Match": etag}), response, session=session, current_user=user
+        )
+    assert fresh.owner_note == "メモ"
+    assert response.headers["etag"] != etag
@@ -0,0 +1,104 @@
+import pytest
+import pytest_asyncio
+from fastapi import Request, Response
+from sqlalchemy import BigInteger
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+
+import app.models.plan  # noqa: F401  (PlanningPlan のマッパー解決に必要)
+from app.core.etag import not_modified, user_etag
+from app.core.user_version import VersionedSession, bump_user_versions, get_user_version
+from app.models.base import Base
+from app.models.plan import PlanningPlan
+from app.models.user_data_version import UserDataVersion
+
+
+@compiles(BigInteger, "sqlite")
+def _bigint_as_integer(type_, compiler, **kw):
+    # SQLite の自動採番は INTEGER PRIMARY KEY のみ
+    return "INTEGER"
+
+
+def _request(if_none_match: str | None = None) -> Request:
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/plans", "headers": headers})
+
+
+@pytest_asyncio.fixture
+async def engine():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            Base.metadata.create_all,
+            tables=[Base.metadata.tables["users"], PlanningPlan.__table__, UserDataVersion.__table__],
+        )
+    yield engine
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_orm_writes_bump_only_the_owning_user(engine):
+    async with AsyncSession(engine, sync_session_class=VersionedSession, expire_on_commit=False) as db:
+        assert await get_user_version(db, 1) == 0
+
+        plan = PlanningPlan(user_id=1, name="A")
+        db.add_all([plan, PlanningPlan(user_id=2, name="B")])
+        await db.commit()
+        assert (await get_user_version(db, 1), await get_user_version(db, 2)) == (1, 1)
+
+        plan.name = "A2"
+        await db.commit()
+        # 値の変わらない代入ではバージョンを進めない
+        plan.name = "A2"
+        await db.commit()
+        assert (await get_user_version(db, 1), await get_user_version(db, 2)) == (2, 1)
+
+        await bump_user_versions(db, [2])
+        await db.commit()
+        assert await get_user_version(db, 2) == 2
+
+
+@pytest.mark.asyncio
+async def test_not_modified_matches_if_none_match(engine):
+    async with AsyncSession(engine, sync_session_class=VersionedSession) as db:
+        etag = await user_etag(db, 1)
+        assert etag.startswith('W/"') and await user_etag(db, 1, "fields=a") != etag
+
+        response = Response()
+        assert not_modified(_request(), response, etag) is None
+        assert response.headers["etag"] == etag
+
+        cached = not_modified(_request(f'"other", {etag.removeprefix("W/")}'), Response(), etag)
+        assert cached.status_code == 304 and cached.headers["etag"] == etag
+        assert not_modified(_request('"other"'), Response(), etag) is None
+        # テーブルがない場合は ETag を付けない
+        assert not_modified(_request("*"), Response(), None) is None
+
+
+@pytest.mark.asyncio
+async def test_etag_changes_on_master_data_reload_and_user_row_update(engine, monkeypatch):
+    from app.core import etag as etag_module
+    from app.models.user import User
+    from app.services.master_data import AxisInfo, MasterData, MasterDataCache
+
+    cache = MasterDataCache(check_interval_sec=0)
+    monkeypatch.setattr(etag_module, "master_data", cache)
+
+    def load(name):
+        cache._data = MasterData.build(1, (1, 1, 0, None), [AxisInfo(1, "concept", name, "", 1)], [])
+
+    async with AsyncSession(engine, sync_session_class=VersionedSession, expire_on_commit=False) as db:
+        load("コンセプト")
+        before = await user_etag(db, 1)
+        # 管理APIで軸名を直して再読み込み（ユーザーのデータは変わらない）
+        load("コンセプト設計")
+        after = await user_etag(db, 1)
+        assert after != before
+
+        user = User(google_sub="g", email="a@example.com", display_name="A")
+        db.add(user)
+        await db.commit()
+        etag = await user_etag(db, user.id)
+        user.email = "b@example.com"
+        await db.commit()
+        assert await user_etag(db, user.id) != etag
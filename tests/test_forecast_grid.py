@@ -0,0 +1,80 @@
+import time
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+from app.schemas.simulation import ForecastGridRequest
+from app.services.forecast_grid import build_forecast_grid, evaluate_forecast_grid, GRID_AXES
+from app.services.simulation import calculate_financial_forecast
+
+
+def test_grid_matches_scalar_forecast():
+    response = build_forecast_grid(
+        ForecastGridRequest(
+            main_genre="izakaya",
+            seats={"values": [12, 25, 40]},
+            price_point={"start": 1000, "stop": 5000, "step": 1000},
+        )
+    )
+
+    assert response.shape == [3, 5, 1, 1, 1, 1]
+    for i, seats in enumerate(response.axes["seats"]):
+        for j, price in enumerate(response.axes["price_point"]):
+            forecast, _, _ = calculate_financial_forecast(
+                {"seats": str(int(seats)), "price_point": str(int(price)), "main_genre": "izakaya"}
+            )
+            assert response.surfaces["monthly_sales"][i][j][0][0][0][0] == forecast.monthly_sales
+            assert response.surfaces["estimated_rent"][i][j][0][0][0][0] == forecast.estimated_rent
+            assert response.surfaces["break_even_sales"][i][j][0][0][0][0] == forecast.break_even_sales
+
+
+def test_grid_evaluates_100k_scenarios_quickly():
+    axes = {
+        "seats": np.arange(10, 60, 2, dtype=float),  # 25
+        "price_point": np.arange(800, 8800, 400, dtype=float),  # 20
+        "occupancy_rate": np.linspace(0.4, 0.9, 10),
+        "operating_days": np.array([22.0, 26.0, 30.0, 31.0]),
+        "cost_ratio": np.array([28.0, 32.0, 36.0]),
+        "labor_cost_ratio": np.array([25.0, 30.0]),
+    }
+    started = time.perf_counter()
+    surfaces = evaluate_forecast_grid(axes, target_profit_ratio=10.0)
+    elapsed = time.perf_counter() - started
+
+    assert surfaces["monthly_sales"].size == 120_000
+    assert surfaces["monthly_sales"].shape == tuple(len(axes[name]) for name in GRID_AXES)
+    assert elapsed < 1.0
+
+
+def test_grid_rejects_oversized_request_before_allocating():
+    request = ForecastGridRequest(
+        seats={"start": 0, "stop": 1e10, "step": 1},
+        price_point={"values": [1000]},
+    )
+    with pytest.raises(HTTPException) as exc:
+        build_forecast_grid(request)
+    assert exc.value.status_code == 400
+
+
+def test_grid_range_stays_within_stop():
+    response = build_forecast_grid(
+        ForecastGridRequest(
+            seats={"start": 0, "stop": 1.7, "step": 1},
+            price_point={"start": 0.5, "stop": 0.9, "step": 0.1},
+            include_surfaces=False,
+        )
+    )
+    assert response.axes["seats"] == [0.0, 1.0]
+    assert len(response.axes["price_point"]) == 5
+
+
+@pytest.mark.parametrize("spec", [
+    {"start": 0, "stop": 10, "step": 0},
+    {"start": 0, "stop": 10, "step": -1},
+    {"start": 10, "stop": 0, "step": 1},
+])
+def test_grid_range_rejects_invalid_spec(spec):
+    with pytest.raises(ValidationError):
+        ForecastGridRequest(seats=spec, price_point={"values": [1000]})
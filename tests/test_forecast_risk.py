@@ -0,0 +1,69 @@
+import pytest
+from pydantic import ValidationError
+
+from app.schemas.simulation import FinancialForecast, ForecastRiskRequest, RiskDistribution
+from app.services.forecast_risk import (
+    attach_risk_to_forecast,
+    run_forecast_risk,
+    simulate_forecast_risk,
+)
+from app.services.simulation import calculate_financial_forecast
+
+
+def test_seeded_simulation_is_reproducible():
+    first = simulate_forecast_risk(30, 3500, "izakaya", trials=20_000, seed=7)
+    second = simulate_forecast_risk(30, 3500, "izakaya", trials=20_000, seed=7)
+    other = simulate_forecast_risk(30, 3500, "izakaya", trials=20_000, seed=8)
+
+    assert first.profit_percentiles == second.profit_percentiles
+    assert first.profit_percentiles != other.profit_percentiles
+    p10, p50, p90 = first.profit_percentiles
+    assert p10 < p50 < p90
+    assert 0.0 < first.below_break_even_probability < 0.5
+
+
+def test_fixed_distributions_collapse_to_deterministic_forecast():
+    forecast, _, _ = calculate_financial_forecast(
+        {"seats": "30", "price_point": "3500", "main_genre": "izakaya"}
+    )
+    response = run_forecast_risk(
+        ForecastRiskRequest(
+            main_genre="izakaya",
+            seats=30,
+            price_point=3500,
+            trials=100,
+            occupancy_rate=RiskDistribution(kind="fixed", value=0.7),
+            customer_spend=RiskDistribution(kind="fixed", value=3500),
+            cost_ratio=RiskDistribution(kind="fixed", value=32.0),
+            rent=RiskDistribution(kind="fixed", value=forecast.estimated_rent),
+        )
+    )
+
+    assert response.monthly_sales.p10 == response.monthly_sales.p90 == forecast.monthly_sales
+    # 家賃上限で借りた場合の利益 ≒ 目標利益率
+    assert abs(response.monthly_profit.p50 - forecast.monthly_sales * 0.10) < 2
+    assert response.below_break_even_probability == 0.0
+
+
+def test_attach_risk_sets_optional_fields():
+    forecast = FinancialForecast(funds_comment_category="x", funds_comment_text="y")
+    enriched = attach_risk_to_forecast(forecast, {"seats": "20", "price_point": "1000", "main_genre": "ramen"})
+
+    assert enriched.profit_p10 < enriched.profit_p50 < enriched.profit_p90
+    assert enriched.below_break_even_probability is not None
+    assert forecast.profit_p50 is None
+
+
+@pytest.mark.parametrize("params", [
+    {"kind": "triangular", "low": 10, "mode": 5, "high": 20},
+    {"kind": "triangular", "low": 10, "mode": 30, "high": 20},
+    {"kind": "uniform", "low": 20, "high": 10},
+    {"kind": "uniform", "low": 10, "high": 10},
+    {"kind": "normal", "mean": 10, "std": 1, "low": 20, "high": 5},
+])
+def test_invalid_distribution_params_are_rejected(params):
+    with pytest.raises(ValidationError):
+        RiskDistribution(**params)
+    # 分布の指定ミスは 500 ではなく 422 になる
+    with pytest.raises(ValidationError):
+        ForecastRiskRequest(seats=20, price_point=3000, rent=params)
@@ -0,0 +1,61 @@
+import logging
+
+from app.core import logging_config as lc
+
+
+def _record(name: str, level: int = logging.DEBUG) -> logging.LogRecord:
+    return logging.LogRecord(name, level, __file__, 1, "msg", None, None)
+
+
+def test_parse_module_levels_ignores_invalid_items():
+    levels = lc.parse_module_levels("app.api.dashboard=debug, sqlalchemy.engine=WARNING,broken,x=NOPE")
+    assert levels == {"app.api.dashboard": logging.DEBUG, "sqlalchemy.engine": logging.WARNING}
+
+
+def test_debug_gate_passes_only_debug_modules_and_debug_users():
+    gate = lc.DebugGate(max_per_sec=0)
+    gate.module_levels = {"app.api": logging.DEBUG}
+    gate.debug_user_ids = {7}
+
+    assert gate.filter(_record("app.services.qa", logging.INFO))
+    assert gate.filter(_record("app.api.dashboard"))
+    assert not gate.filter(_record("app.services.qa"))
+
+    token = lc.current_user_id.set(7)
+    try:
+        assert gate.filter(_record("app.services.qa"))
+    finally:
+        lc.current_user_id.reset(token)
+    assert gate.dropped == 1
+
+
+def test_debug_gate_samples_and_rate_limits_per_logger(monkeypatch):
+    monkeypatch.setattr(lc.time, "monotonic", lambda: 100.0)
+    gate = lc.DebugGate(sample_rate=0.0, max_per_sec=0)
+    gate.module_levels = {"app": logging.DEBUG}
+    assert not any(gate.filter(_record("app.x")) for _ in range(10))
+
+    gate = lc.DebugGate(max_per_sec=3)
+    gate.module_levels = {"app": logging.DEBUG}
+    passed = [gate.filter(_record("app.x")) for _ in range(5)]
+    assert passed == [True, True, True, False, False]
+    assert gate.filter(_record("app.y"))
+
+    monkeypatch.setattr(lc.time, "monotonic", lambda: 101.0)
+    assert gate.filter(_record("app.x"))
+
+
+def test_debug_gate_passes_everything_when_root_level_is_debug(monkeypatch):
+    root = logging.getLogger()
+    monkeypatch.setattr(root, "level", logging.DEBUG)
+    # モジュール単位の設定がなくても LOG_LEVEL=DEBUG なら間引かない
+    gate = lc.DebugGate(sample_rate=0.0, max_per_sec=1)
+    assert all(gate.filter(_record("app.services.qa")) for _ in range(5))
+    assert gate.dropped == 0
+
+    # モジュール単位で DEBUG にしたものは従来どおり間引く
+    gate.module_levels = {"app.api": logging.DEBUG}
+    assert not gate.filter(_record("app.api.dashboard"))
+
+    monkeypatch.setattr(root, "level", logging.INFO)
+    assert not gate.filter(_record("app.services.qa"))
@@ -0,0 +1,84 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.models.axis import AxisStep, PlanningAxis
+from app.services import master_data as md
+
+
+@pytest_asyncio.fixture
+async def db():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    statements = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            PlanningAxis.metadata.create_all,
+            tables=[PlanningAxis.__table__, AxisStep.__table__],
+        )
+        await conn.execute(
+            PlanningAxis.__table__.insert(),
+            [
+                {"id": 1, "code": "funds", "name": "収支予測", "display_order": 2},
+                {"id": 2, "code": "concept", "name": "コンセプト", "display_order": 1},
+            ],
+        )
+        await conn.execute(
+            AxisStep.__table__.insert(),
+            [
+                {"id": 1, "axis_id": 2, "level": 2, "code": "c2", "title": "二", "display_order": 2},
+                {"id": 2, "axis_id": 2, "level": 1, "code": "c1", "title": "一", "display_order": 1},
+            ],
+        )
+    statements.clear()
+    async with AsyncSession(engine) as session:
+        session.statements = statements
+        yield session
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_master_data_loads_once_with_typed_lookups(db):
+    cache = md.MasterDataCache(check_interval_sec=0)
+
+    data = await cache.get(db)
+    queries = len(db.statements)
+    assert await cache.get(db) is data
+    assert len(db.statements) == queries
+
+    assert [a.code for a in data.axes] == ["concept", "funds"]
+    assert data.axis_by_code("funds").id == 1
+    assert data.axis_by_id(2).name == "コンセプト"
+    assert data.axis_by_code("missing") is None
+    assert [s.code for s in data.steps_for(2)] == ["c1", "c2"]
+    assert data.axis_id_map() == {"concept": 2, "funds": 1}
+
+
+@pytest.mark.asyncio
+async def test_master_data_reloads_when_marker_changes(db, monkeypatch):
+    cache = md.MasterDataCache(check_interval_sec=60)
+    now = [1000.0]
+    monkeypatch.setattr(md.time, "monotonic", lambda: now[0])
+
+    first = await cache.get(db)
+    now[0] += 61
+    # 目印が変わらなければ確認クエリのみで同じデータを返す
+    assert await cache.get(db) is first
+    assert cache.checks == 2 and cache.loads == 1
+
+    await db.execute(
+        PlanningAxis.__table__.insert().values(id=3, code="menu", name="メニュー", display_order=3)
+    )
+    assert (await cache.get(db)) is first  # 確認間隔内
+    now[0] += 61
+    second = await cache.get(db)
+    assert second.version == first.version + 1
+    assert second.axis_by_code("menu").id == 3
+
+    reloaded = await cache.reload(db)
+    assert reloaded.version == second.version + 1
@@ -0,0 +1,34 @@
+from collections import Counter
+
+import pregenerate_simulation_cache as pregen
+from app.services.profile_cache import profile_fingerprint
+
+
+def test_grid_covers_fingerprints_of_complete_profiles():
+    keys = {profile_fingerprint(profile) for profile in pregen.build_grid(["lunch", "dinner"])}
+
+    # 回答画面から送られる完全なプロファイル（必須項目すべて）
+    izakaya = {"main_genre": "izakaya", "sub_genre": "izakaya_taishu", "location": "near_station",
+               "business_hours": "dinner", "seats": "24", "price_point": "3500"}
+    curry = {"main_genre": "curry", "sub_genre": "undecided_sub", "location": "office_area",
+             "business_hours": "lunch", "seats": "120", "price_point": "900"}
+    assert profile_fingerprint(izakaya) in keys
+    assert profile_fingerprint(curry) in keys
+    assert profile_fingerprint({**izakaya, "business_hours": "late_night"}) not in keys
+
+
+def test_rank_grid_puts_observed_profiles_first():
+    grid = pregen.build_grid(["dinner"])
+    popular = {"main_genre": "cafe", "sub_genre": "cafe_casual", "location": "residential",
+               "business_hours": "dinner", "seats": "18", "price_point": "1200"}
+    # グリッドにない値でも実際の回答にあれば対象になる
+    unseen = {**popular, "sub_genre": "cafe_kissa"}
+    popularity = Counter({pregen._grid_key(popular): 5, pregen._grid_key(unseen): 2})
+    observed = {pregen._grid_key(p): p for p in (popular, unseen)}
+
+    ranked = pregen.rank_grid(grid, popularity, observed)
+
+    assert [profile_fingerprint(p) for p in ranked[:2]] == [
+        profile_fingerprint(popular), profile_fingerprint(unseen),
+    ]
+    assert len(ranked) == len(grid) + 1
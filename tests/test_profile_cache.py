@@ -0,0 +1,49 @@
+import pytest
+
+from app.services.llm_cache import MemoryResponseCache
+from app.services.profile_cache import ProfileCache, profile_fingerprint
+
+
+def test_fingerprint_buckets_seats_and_price():
+    base = {"main_genre": "cafe", "sub_genre": "cafe_casual", "location": "near_station",
+            "business_hours": "day", "seats": "22", "price_point": "1200"}
+
+    assert profile_fingerprint(base) == profile_fingerprint({**base, "seats": 28, "price_point": "1500"})
+    assert profile_fingerprint(base) != profile_fingerprint({**base, "seats": "35"})
+    assert profile_fingerprint(base) != profile_fingerprint({**base, "location": "residential"})
+
+
+@pytest.mark.asyncio
+async def test_profile_cache_fills_variant_slots(monkeypatch):
+    from app.services import profile_cache as module
+
+    cache = ProfileCache(MemoryResponseCache(ttl_sec=60, max_entries=10), variants=2)
+    profile = {"main_genre": "ramen", "seats": "12"}
+
+    monkeypatch.setattr(module.random, "randrange", lambda n: 0)
+    cached, key = await cache.lookup("story", profile)
+    assert cached is None
+    await cache.store_text(key, "A")
+    assert (await cache.lookup("story", {**profile, "seats": "15"}))[0] == "A"
+
+    # 別スロットは未生成なのでミス（バリエーションを増やす）
+    monkeypatch.setattr(module.random, "randrange", lambda n: 1)
+    cached, key = await cache.lookup("story", profile)
+    assert cached is None
+    assert key.endswith(":1")
+
+
+def test_advice_prompt_matches_cache_key_granularity():
+    from app.services.simulation_advice import build_profile_description
+
+    base = {"main_genre": "cafe", "sub_genre": "cafe_casual", "location": "near_station",
+            "business_hours": "day", "seats": "22", "price_point": "1200"}
+    same_bucket = {**base, "seats": "28", "price_point": "1900"}
+
+    # 同じキーに保存される生成文には、どちらのユーザーの実数値も入れない
+    assert profile_fingerprint(base) == profile_fingerprint(same_bucket)
+    assert build_profile_description(base) == build_profile_description(same_bucket)
+    description = build_profile_description(base)
+    assert "席数: 20〜29席" in description and "客単価: 1,000〜1,999円" in description
+    assert "22" not in description and "1200" not in description
+    assert "80席以上" in build_profile_description({**base, "seats": "120"})
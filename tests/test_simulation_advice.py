@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+
+from app.services import simulation_advice
+
+
+@pytest.mark.asyncio
+async def test_stream_advice_interleaves_categories_under_cap(monkeypatch):
+    running = 0
+    peak = 0
+
+    async def fake_stream(category, profile_desc):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        try:
+            for i in range(2):
+                await asyncio.sleep(0.005)
+                yield f"{category}-{i}"
+        finally:
+            running -= 1
+
+    monkeypatch.setattr(simulation_advice, "generate_advice_stream", fake_stream)
+
+    received = [item async for item in simulation_advice.stream_advice_parallel("desc", concurrency=3)]
+
+    assert peak == 3
+    assert len(received) == 2 * len(simulation_advice.ADVICE_PROMPTS)
+    for category in simulation_advice.ADVICE_PROMPTS:
+        assert [c for cat, c in received if cat == category] == [f"{category}-0", f"{category}-1"]
+    # 逐次実行ではなく、カテゴリのチャンクが混在して届く
+    assert received[0][0] != received[1][0]
+
+
+@pytest.mark.asyncio
+async def test_stream_advice_propagates_error_and_cancels_others(monkeypatch):
+    cancelled = []
+
+    async def fake_stream(category, profile_desc):
+        if category == "hr":
+            raise RuntimeError("boom")
+        try:
+            yield "x"
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(category)
+            raise
+
+    monkeypatch.setattr(simulation_advice, "generate_advice_stream", fake_stream)
+
+    with pytest.raises(RuntimeError):
+        async for _ in simulation_advice.stream_advice_parallel("desc"):
+            pass
+
+    assert set(cancelled) == set(simulation_advice.ADVICE_PROMPTS) - {"hr"}
+
+
+def test_section_parser_handles_markers_split_across_chunks():
+    parser = simulation_advice.AdviceSectionParser(simulation_advice.ADVICE_PROMPTS)
+    chunks = ["前置き\n<<loc", "ation>>\n駅前は", "家賃が高め。\n<", "<h", "r>>\n採用は早めに", "。\n<<fu", "nds>>\n融資を", "検討。"]
+
+    pieces = []
+    for chunk in chunks:
+        pieces.extend(parser.feed(chunk))
+    pieces.extend(parser.flush())
+
+    joined: dict[str, str] = {}
+    for category, text in pieces:
+        joined[category] = joined.get(category, "") + text
+    assert joined == {
+        "location": "駅前は家賃が高め。",
+        "hr": "採用は早めに。",
+        "funds": "融資を検討。",
+    }
+    # マーカーの断片がデルタとして漏れない
+    assert all("<" not in text and ">" not in text for _, text in pieces)
+
+
+def test_section_parser_rejects_stream_without_markers(caplog):
+    parser = simulation_advice.AdviceSectionParser(simulation_advice.ADVICE_PROMPTS)
+    assert parser.feed("[エラー: upstream timeout]") == []
+
+    with pytest.raises(simulation_advice.AdviceFormatError):
+        parser.flush()
+    assert "upstream timeout" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_combined_mode_uses_single_completion(monkeypatch):
+    calls = []
+
+    async def fake_completion_stream(messages, max_tokens=1024, temperature=0.7):
+        calls.append(messages)
+        for chunk in ["<<location>>立地", "の話<<menu>>", "メニューの話"]:
+            yield chunk
+
+    monkeypatch.setattr(simulation_advice, "_chat_completion_stream", fake_completion_stream)
+
+    received = [item async for item in simulation_advice.stream_advice("desc", mode="combined")]
+
+    assert len(calls) == 1
+    assert received == [("location", "立地"), ("location", "の話"), ("menu", "メニューの話")]
+
+
+@pytest.mark.asyncio
+async def test_profile_advice_replays_cached_texts(monkeypatch):
+    from app.services.llm_cache import MemoryResponseCache
+    from app.services.profile_cache import ProfileCache
+
+    cache = ProfileCache(MemoryResponseCache(ttl_sec=60, max_entries=10), variants=1)
+    monkeypatch.setattr(simulation_advice, "profile_cache", cache)
+    calls = 0
+
+    async def fake_stream_advice(profile_desc, mode=None):
+        nonlocal calls
+        calls += 1
+        for category in simulation_advice.ADVICE_PROMPTS:
+            yield category, f"{category}の"
+            yield category, "助言"
+
+    monkeypatch.setattr(simulation_advice, "stream_advice", fake_stream_advice)
+    profile = {"main_genre": "cafe", "seats": "20"}
+
+    first = [item async for item in simulation_advice.stream_profile_advice(profile)]
+    second = [item async for item in simulation_advice.stream_profile_advice(profile)]
+
+    assert calls == 1
+    assert len(first) == 2 * len(simulation_advice.ADVICE_PROMPTS)
+    assert second == [(c, f"{c}の助言") for c in simulation_advice.ADVICE_PROMPTS]
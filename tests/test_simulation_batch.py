@@ -0,0 +1,238 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy import BigInteger, event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+
+import app.models.plan  # noqa: F401  (PlanningPlan のマッパー解決に必要)
+from app.models.axis import AxisScore, AxisStep, PlanningAxis
+from app.models.base import Base
+from app.models.simple_simulation import (
+    SimpleSimulationAnswer,
+    SimpleSimulationResult,
+    SimpleSimulationSession,
+)
+from app.services import simulation as sim
+
+
+@compiles(BigInteger, "sqlite")
+def _bigint_as_integer(type_, compiler, **kw):
+    # SQLite の自動採番は INTEGER PRIMARY KEY のみ
+    return "INTEGER"
+
+
+@pytest_asyncio.fixture
+async def db():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    statements = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            Base.metadata.create_all,
+            tables=[
+                Base.metadata.tables["users"],
+                SimpleSimulationSession.__table__,
+                SimpleSimulationAnswer.__table__,
+                SimpleSimulationResult.__table__,
+                PlanningAxis.__table__,
+                AxisStep.__table__,
+                AxisScore.__table__,
+            ],
+        )
+    statements.clear()
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        session.statements = statements
+        yield session
+    await engine.dispose()
+
+
+def _item(token, genre="cafe"):
+    return {
+        "guest_session_token": token,
+        "answers": [
+            {"question_code": "main_genre", "values": [genre]},
+            {"question_code": "seats", "values": ["20"]},
+            {"question_code": "price_point", "values": ["1500"]},
+        ],
+    }
+
+
+@pytest.mark.asyncio
+async def test_batch_persists_with_bulk_inserts_and_reports_item_errors(db, monkeypatch):
+    jobs = []
+    monkeypatch.setattr(sim, "start_story_job", lambda session_id, generate, fallback_text: jobs.append(session_id))
+
+    items = [_item(f"t{i}") for i in range(20)]
+    items.append({"answers": []})  # 検証エラー
+    items.append(_item("t0"))  # バッチ内のトークン重複
+
+    results = await sim.process_simulation_batch(db, items)
+
+    assert [r.index for r in results] == list(range(22))
+    assert all(r.ok for r in results[:20])
+    assert not results[20].ok and not results[21].ok
+    assert len({r.result.session_id for r in results[:20]}) == 20
+    assert sorted(jobs) == sorted(r.result.session_id for r in results[:20])
+
+    inserts = [s for s in db.statements if s.lstrip().upper().startswith("INSERT")]
+    # セッション・回答・結果をそれぞれ件数に依存しない回数で INSERT する
+    assert len(inserts) <= 3
+    assert (await db.execute(select(func.count(SimpleSimulationAnswer.id)))).scalar() == 60
+    assert (await db.execute(select(func.count(SimpleSimulationResult.id)))).scalar() == 20
+
+
+@pytest.mark.asyncio
+async def test_batch_resubmission_replaces_answers(db, monkeypatch):
+    monkeypatch.setattr(sim, "start_story_job", lambda *args, **kwargs: None)
+
+    first = await sim.process_simulation_batch(db, [_item("same", "cafe")])
+    second = await sim.process_simulation_batch(db, [_item("same", "ramen")])
+
+    assert first[0].result.session_id == second[0].result.session_id
+    genres = (
+        await db.execute(
+            select(SimpleSimulationAnswer.answer_values).where(
+                SimpleSimulationAnswer.question_code == "main_genre"
+            )
+        )
+    ).scalars().all()
+    assert genres == [{"values": ["ramen"]}]
+
+
+@pytest.mark.asyncio
+async def test_guest_resubmission_upserts_session_and_result(db, monkeypatch):
+    from app.schemas.simulation import SubmitSimulationRequest
+
+    monkeypatch.setattr(sim, "start_story_job", lambda *args, **kwargs: None)
+
+    first = await sim.process_simulation_submission(db, SubmitSimulationRequest(**_item("g1", "cafe")), None)
+    db.statements.clear()
+    second = await sim.process_simulation_submission(db, SubmitSimulationRequest(**_item("g1", "ramen")), None)
+
+    # セッション UPSERT・ID取得・回答削除・回答INSERT・結果UPSERT（回答数に依存しない）
+    assert len(db.statements) == 5
+    assert first.session_id == second.session_id
+    assert (await db.execute(select(func.count(SimpleSimulationResult.id)))).scalar() == 1
+    assert (await db.execute(select(func.count(SimpleSimulationAnswer.id)))).scalar() == 3
+
+
+@pytest.mark.asyncio
+async def test_logged_in_submission_bulk_inserts_axis_scores_with_cached_axis_map(db, monkeypatch):
+    from app.schemas.simulation import SubmitSimulationRequest
+
+    monkeypatch.setattr(sim, "start_story_job", lambda *args, **kwargs: None)
+    from app.services.master_data import MasterDataCache
+
+    monkeypatch.setattr(sim, "master_data", MasterDataCache(check_interval_sec=300))
+    codes = ["concept", "funds", "operation", "location", "compliance"]
+    await db.execute(
+        PlanningAxis.__table__.insert(),
+        [{"id": i + 1, "code": code, "name": code, "display_order": i} for i, code in enumerate(codes)],
+    )
+    await db.commit()
+
+    await sim.process_simulation_submission(db, SubmitSimulationRequest(**_item(None)), 1)
+    db.statements.clear()
+    await sim.process_simulation_submission(db, SubmitSimulationRequest(**_item(None)), 1)
+
+    assert not any("planning_axes" in s for s in db.statements)
+    axis_inserts = [s for s in db.statements if s.lstrip().upper().startswith("INSERT INTO AXIS_SCORES")]
+    assert len(axis_inserts) == 1
+    assert (await db.execute(select(func.count(AxisScore.id)))).scalar() == 2 * len(codes)
+
+
+@pytest.mark.asyncio
+async def test_risk_simulation_runs_off_the_event_loop(db, monkeypatch):
+    import threading
+
+    from app.schemas.simulation import SubmitSimulationRequest
+    from app.services import forecast_risk
+
+    threads = []
+    original = forecast_risk.attach_risk_to_forecast
+
+    def recording_attach(forecast, profile):
+        threads.append(threading.current_thread())
+        return original(forecast, profile)
+
+    monkeypatch.setattr(forecast_risk, "attach_risk_to_forecast", recording_attach)
+    monkeypatch.setattr(sim, "start_story_job", lambda *args, **kwargs: None)
+
+    await sim.process_simulation_submission(db, SubmitSimulationRequest(**_item(None)), None)
+    await sim.process_simulation_batch(db, [_item("r1"), _item("r2")])
+
+    # 単体送信・一括送信とも、モンテカルロはイベントループのスレッドで実行しない
+    assert len(threads) == 3
+    assert threading.main_thread() not in threads
+
+
+def test_batch_endpoint_requires_partner_token(monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.api import simulations_simple
+    from app.api.auth import get_current_user
+    from app.core.db import get_session
+    from app.schemas.auth import UserInfo
+
+    async def fake_batch(db, items):
+        return []
+
+    async def no_session():
+        yield None
+
+    monkeypatch.setattr(simulations_simple, "process_simulation_batch", fake_batch)
+    app = FastAPI()
+    app.include_router(simulations_simple.router)
+    # ログイン済みの一般ユーザーとして呼ぶ
+    app.dependency_overrides[get_current_user] = lambda: UserInfo(id=1, email="user@example.com", display_name="user")
+    app.dependency_overrides[get_session] = no_session
+    client = TestClient(app)
+    url = next(r.path for r in simulations_simple.router.routes if r.path.endswith("/result/batch"))
+    body = {"items": [_item("p1")]}
+
+    settings = simulations_simple.get_settings()
+    monkeypatch.setattr(settings, "simulation_batch_partner_token", "")
+    assert client.post(url, json=body, headers={"Authorization": "Bearer x"}).status_code == 404
+
+    monkeypatch.setattr(settings, "simulation_batch_partner_token", "partner-secret")
+    assert client.post(url, json=body, headers={"Authorization": "Bearer x"}).status_code == 403
+    assert client.post(url, json=body, headers={"X-Partner-Token": "wrong"}).status_code == 403
+    response = client.post(url, json=body, headers={"X-Partner-Token": "partner-secret"})
+    assert response.status_code == 200 and response.json()["total"] == 0
+
+
+@pytest.mark.asyncio
+async def test_guest_resubmission_does_not_detach_owned_session(db, monkeypatch):
+    from fastapi import HTTPException
+
+    from app.schemas.simulation import SubmitSimulationRequest
+
+    monkeypatch.setattr(sim, "start_story_job", lambda *args, **kwargs: None)
+    first = await sim.process_simulation_submission(db, SubmitSimulationRequest(**_item("owned", "cafe")), None)
+    # ログイン後にユーザーへ紐づいたセッション
+    await db.execute(
+        SimpleSimulationSession.__table__.update()
+        .where(SimpleSimulationSession.id == first.session_id)
+        .values(user_id=1)
+    )
+    await db.commit()
+
+    with pytest.raises(HTTPException) as exc:
+        await sim.process_simulation_submission(db, SubmitSimulationRequest(**_item("owned", "ramen")), None)
+
+    assert exc.value.status_code == 409
+    owner = (
+        await db.execute(select(SimpleSimulationSession.user_id).where(SimpleSimulationSession.id == first.session_id))
+    ).scalar_one()
+    assert owner == 1
+    genres = (
+        await db.execute(
+            select(SimpleSimulationAnswer.answer_values).where(SimpleSimulationAnswer.question_code == "main_genre")
+        )
+    ).scalars().all()
+    assert genres == [{"values": ["cafe"]}]
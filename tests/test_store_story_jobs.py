@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from app.services import store_story_jobs
+
+
+@pytest.fixture(autouse=True)
+def _isolated_jobs(monkeypatch):
+    saved = []
+
+    async def fake_save(session_id, text, ai_generated):
+        saved.append((session_id, text, ai_generated))
+
+    monkeypatch.setattr(store_story_jobs, "_jobs", {})
+    monkeypatch.setattr(store_story_jobs, "_save_story", fake_save)
+    return saved
+
+
+@pytest.mark.asyncio
+async def test_story_job_saves_ai_text_in_background(_isolated_jobs):
+    release = asyncio.Event()
+
+    async def generate():
+        await release.wait()
+        return "AIのストーリー"
+
+    job = store_story_jobs.start_story_job(1, generate, fallback_text="テンプレ")
+    assert job.status == store_story_jobs.STORY_PENDING
+    assert job.text == "テンプレ"
+
+    release.set()
+    finished = await store_story_jobs.wait_for_story(1)
+
+    assert finished.status == store_story_jobs.STORY_READY
+    assert finished.text == "AIのストーリー"
+    assert _isolated_jobs == [(1, "AIのストーリー", True)]
+
+
+@pytest.mark.asyncio
+async def test_story_job_keeps_fallback_when_generation_fails(_isolated_jobs):
+    async def generate():
+        raise RuntimeError("azure down")
+
+    store_story_jobs.start_story_job(2, generate, fallback_text="テンプレ")
+    finished = await store_story_jobs.wait_for_story(2)
+
+    assert finished.status == store_story_jobs.STORY_FALLBACK
+    assert finished.text == "テンプレ"
+    assert _isolated_jobs == [(2, "テンプレ", False)]
+
+
+@pytest.mark.asyncio
+async def test_resubmission_replaces_running_job(_isolated_jobs):
+    async def slow():
+        await asyncio.sleep(10)
+        return "古い"
+
+    async def fast():
+        return "新しい"
+
+    store_story_jobs.start_story_job(3, slow, fallback_text="")
+    waiter = asyncio.create_task(store_story_jobs.wait_for_story(3))
+    await asyncio.sleep(0)
+    store_story_jobs.start_story_job(3, fast, fallback_text="")
+
+    assert (await waiter).text == "新しい"
+    assert _isolated_jobs == [(3, "新しい", True)]